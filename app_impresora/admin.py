@@ -4,20 +4,20 @@ from .models import PrinterConfiguration, PrintJob
 
 @admin.register(PrinterConfiguration)
 class PrinterConfigurationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'model', 'printer_type', 'is_active', 'created_at']
+    list_display = ['name', 'model', 'printer_type', 'qr_mode', 'simulation_mode', 'is_active', 'created_at']
     list_filter = ['printer_type', 'is_active', 'model']
     search_fields = ['name', 'model', 'connection_string']
     list_editable = ['is_active']
     
     fieldsets = (
         ('Información General', {
-            'fields': ('name', 'model', 'is_active')
+            'fields': ('name', 'model', 'is_active', 'simulation_mode')
         }),
         ('Configuración de Conexión', {
             'fields': ('printer_type', 'connection_string')
         }),
         ('Configuración de Papel', {
-            'fields': ('paper_width', 'chars_per_line')
+            'fields': ('paper_width', 'chars_per_line', 'qr_mode')
         }),
     )
 
@@ -26,7 +26,7 @@ class PrintJobAdmin(admin.ModelAdmin):
     list_display = ['id', 'client_id', 'printer', 'content_type', 'status', 'created_at', 'completed_at']
     list_filter = ['status', 'content_type', 'printer', 'created_at']
     search_fields = ['client_id', 'printer__name']
-    readonly_fields = ['created_at', 'completed_at']
+    readonly_fields = ['created_at', 'started_at', 'completed_at']
     
     fieldsets = (
         ('Información del Trabajo', {
@@ -36,6 +36,6 @@ class PrintJobAdmin(admin.ModelAdmin):
             'fields': ('status', 'error_message')
         }),
         ('Tiempos', {
-            'fields': ('created_at', 'completed_at')
+            'fields': ('created_at', 'started_at', 'completed_at')
         }),
     )
@@ -3,7 +3,6 @@ Comando simplificado para agregar impresoras
 """
 
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 from app_impresora.models import PrinterConfiguration
 import subprocess
 import json
@@ -121,7 +120,7 @@ class Command(BaseCommand):
             self.stdout.write(f'   Conexión: {printer["name"]}')
             
             # Desactivar simulación
-            cache.set('printer_simulation_mode', False, 86400)
+            PrinterConfiguration.objects.update(simulation_mode=False)
             self.stdout.write(self.style.SUCCESS('🖨️  Modo real activado'))
             
         except Exception as e:
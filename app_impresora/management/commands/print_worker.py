@@ -0,0 +1,91 @@
+"""
+Worker de la cola de impresión.
+
+Procesa los PrintJob en estado PENDING en orden de llegada. Debe correr un
+único worker por impresora física (``--printer``; por defecto la impresora
+activa al arrancar): es el único proceso que abre la conexión con la impresora, de modo
+que las peticiones web solo encolan el trabajo. Cada worker toma solo los
+trabajos de su impresora y al arrancar devuelve a la cola los que llevan más
+de ``--recover-after`` segundos en PRINTING (un worker anterior que se detuvo
+a medias), sin tocar los que otro worker está imprimiendo.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from app_impresora.models import PrinterConfiguration
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de trabajos de impresión (PrintJob pendientes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar los trabajos pendientes y terminar',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Segundos de espera cuando la cola está vacía (por defecto 1.0)',
+        )
+        parser.add_argument(
+            '--printer',
+            help='ID o nombre de la impresora que atiende este worker (por defecto la activa)',
+        )
+        parser.add_argument(
+            '--recover-after',
+            type=int,
+            default=300,
+            help='Segundos en PRINTING tras los que un trabajo se considera abandonado (por defecto 300)',
+        )
+
+    def handle(self, *args, **options):
+        from app_impresora.printer_service import printer_service
+
+        printer = self._printer(options['printer'])
+        if printer is None:
+            printer_service.reload_printer_config()
+            printer = printer_service.printer_config
+        if printer is None:
+            raise CommandError('No hay impresora activa; indique una con --printer')
+
+        # Trabajos que quedaron a medias si el worker anterior se detuvo
+        recuperados = printer_service.recover_stale_jobs(printer, options['recover_after'])
+        if recuperados:
+            self.stdout.write(self.style.WARNING(f'{recuperados} trabajos interrumpidos devueltos a la cola'))
+
+        self.stdout.write(f'Worker de impresión iniciado para {printer.name}')
+        procesados = 0
+        try:
+            while True:
+                close_old_connections()
+                print_job = printer_service.claim_next_job(printer)
+                if print_job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                # El trabajo se imprime en su impresora, leída de la base de datos al tomarlo
+                # (incluido el modo simulación que se cambia desde la web)
+                exito = printer_service.process_job(print_job)
+                procesados += 1
+                estado = self.style.SUCCESS('OK') if exito else self.style.ERROR('FALLÓ')
+                self.stdout.write(f'Trabajo {print_job.id} (cliente {print_job.client_id}): {estado}')
+        except KeyboardInterrupt:
+            self.stdout.write('\nWorker detenido')
+
+        self.stdout.write(f'{procesados} trabajos procesados')
+
+    def _printer(self, valor):
+        if not valor:
+            return None
+        printers = PrinterConfiguration.objects.all()
+        printer = (printers.filter(id=valor).first() if valor.isdigit() else None) or printers.filter(name=valor).first()
+        if printer is None:
+            raise CommandError(f'No existe la impresora {valor!r}')
+        return printer
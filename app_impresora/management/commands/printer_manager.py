@@ -3,7 +3,6 @@ Comando maestro para gestión completa de impresoras
 """
 
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 from app_impresora.models import PrinterConfiguration, PrintJob
 
 
@@ -63,7 +62,7 @@ class Command(BaseCommand):
             self.stdout.write('   ❌ No hay impresoras configuradas')
         
         # Modo simulación
-        simulation_mode = cache.get('printer_simulation_mode', True)
+        simulation_mode = active_printer is not None and active_printer.simulation_mode
         mode_text = "🎭 SIMULACIÓN" if simulation_mode else "🖨️  REAL"
         self.stdout.write(f'\n🔄 MODO ACTUAL: {mode_text}')
         
@@ -113,10 +112,6 @@ class Command(BaseCommand):
             PrinterConfiguration.objects.all().delete()
             self.stdout.write(f'✅ Eliminadas {printers_count} configuraciones de impresora')
             
-            # Limpiar cache
-            cache.delete('printer_simulation_mode')
-            self.stdout.write('✅ Cache limpiado')
-            
             self.stdout.write('\n🎉 LIMPIEZA COMPLETADA')
             self.stdout.write('💡 Usa: python manage.py add_simple_printer --auto para empezar')
             
@@ -133,16 +128,14 @@ class Command(BaseCommand):
             PrinterConfiguration.objects.all().delete()
             PrintJob.objects.all().delete()
             
-            # Establecer modo simulación
-            cache.set('printer_simulation_mode', True, 86400)
-            
             # Crear impresora por defecto
             default_printer = PrinterConfiguration.objects.create(
                 name='Impresora por Defecto',
                 model='Epson Thermal',
                 printer_type='USB',
                 connection_string='default',
-                is_active=True
+                is_active=True,
+                simulation_mode=True
             )
             
             self.stdout.write('✅ Configuración por defecto creada')
@@ -3,8 +3,7 @@ Comando para gestionar el modo simulación del sistema de impresión
 """
 
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
-from app_impresora.printer_service import PrinterService
+from app_impresora.printer_service import printer_service
 
 
 class Command(BaseCommand):
@@ -29,28 +28,21 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         if options['enable']:
-            cache.set('printer_simulation_mode', True, 86400)
-            # Recargar instancia global
-            from app_impresora.printer_service import printer_service
-            printer_service.reload_simulation_mode()
+            printer_service.enable_simulation_mode(True)
             self.stdout.write(
                 self.style.SUCCESS('✅ Modo simulación HABILITADO')
             )
             self.stdout.write('   Las impresiones se simularán (no se enviará a hardware)')
             
         elif options['disable']:
-            cache.set('printer_simulation_mode', False, 86400)
-            # Recargar instancia global
-            from app_impresora.printer_service import printer_service
-            printer_service.reload_simulation_mode()
+            printer_service.enable_simulation_mode(False)
             self.stdout.write(
                 self.style.SUCCESS('🖨️  Modo simulación DESHABILITADO')
             )
             self.stdout.write('   Las impresiones se enviarán a la impresora física')
             
         elif options['status']:
-            service = PrinterService()
-            mode = cache.get('printer_simulation_mode', True)
+            mode = printer_service.simulation_mode
             if mode:
                 self.stdout.write(
                     self.style.WARNING('🎭 Modo simulación: ACTIVO')
@@ -62,8 +54,7 @@ class Command(BaseCommand):
                 
         else:
             # Mostrar estado actual por defecto
-            service = PrinterService()
-            mode = cache.get('printer_simulation_mode', True)
+            mode = printer_service.simulation_mode
             
             self.stdout.write('📊 ESTADO DEL MODO SIMULACIÓN')
             self.stdout.write('=' * 40)
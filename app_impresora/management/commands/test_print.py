@@ -23,7 +23,7 @@ class Command(BaseCommand):
             printer_service.enable_simulation_mode(True)
             self.stdout.write(self.style.SUCCESS('Modo simulación habilitado'))
         else:
-            # Recargar configuración de simulación desde cache
+            # Modo simulación guardado en la base de datos
             printer_service.reload_simulation_mode()
 
         # Crear cliente de prueba
@@ -4,7 +4,6 @@ Comando para probar impresión real (sin simulación)
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.core.cache import cache
 from app_page.models import Cliente
 from app_impresora.printer_service import PrinterService
 
@@ -13,12 +12,12 @@ class Command(BaseCommand):
     help = 'Prueba la impresión real en la impresora física'
 
     def handle(self, *args, **options):
-        # Forzar modo real
-        cache.set('printer_simulation_mode', False, 86400)
-        
         # Crear nueva instancia del servicio (no usar la global)
         printer_service = PrinterService()
         
+        # Forzar modo real
+        printer_service.enable_simulation_mode(False)
+        
         self.stdout.write(f'Modo simulación: {"Activo" if printer_service.simulation_mode else "INACTIVO (modo real)"}')
         
         # Crear cliente de prueba
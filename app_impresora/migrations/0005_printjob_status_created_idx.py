@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_impresora', '0004_auto_20250825_1325'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='printjob',
+            index=models.Index(fields=['status', 'created_at'], name='printjob_status_created_idx'),
+        ),
+    ]
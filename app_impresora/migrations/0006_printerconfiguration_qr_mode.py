@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_impresora', '0005_printjob_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printerconfiguration',
+            name='qr_mode',
+            field=models.CharField(choices=[('NATIVE', 'Nativo de la impresora'), ('RASTER', 'Imagen (raster)')], default='NATIVE', help_text='Nativo envía el comando GS ( k y la impresora dibuja el QR; Imagen es para modelos sin QR integrado', max_length=10, verbose_name='Impresión del QR'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_impresora', '0006_printerconfiguration_qr_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Tomado por el worker'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_impresora', '0007_printjob_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printerconfiguration',
+            name='simulation_mode',
+            field=models.BooleanField(default=False, help_text='Los trabajos se marcan como impresos sin enviarlos a la impresora', verbose_name='Modo simulación'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 import json
 
+from .ticket_templates import invalidate_ticket_template
+
 class PrinterConfiguration(models.Model):
     """Configuración de la impresora"""
     PRINTER_TYPES = [
@@ -9,6 +11,10 @@ class PrinterConfiguration(models.Model):
         ('SERIAL', 'Serial'),
         ('NETWORK', 'Red'),
     ]
+    QR_MODES = [
+        ('NATIVE', 'Nativo de la impresora'),
+        ('RASTER', 'Imagen (raster)'),
+    ]
     
     name = models.CharField(max_length=100, verbose_name="Nombre de la impresora")
     printer_type = models.CharField(
@@ -28,6 +34,19 @@ class PrinterConfiguration(models.Model):
     # Configuraciones específicas de impresión
     paper_width = models.IntegerField(default=80, verbose_name="Ancho del papel (mm)")
     chars_per_line = models.IntegerField(default=48, verbose_name="Caracteres por línea")
+    qr_mode = models.CharField(
+        max_length=10,
+        choices=QR_MODES,
+        default='NATIVE',
+        verbose_name="Impresión del QR",
+        help_text="Nativo envía el comando GS ( k y la impresora dibuja el QR; Imagen es para modelos sin QR integrado"
+    )
+    # En la base de datos y no en el cache: el worker de impresión es otro proceso
+    simulation_mode = models.BooleanField(
+        default=False,
+        verbose_name="Modo simulación",
+        help_text="Los trabajos se marcan como impresos sin enviarlos a la impresora"
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -91,6 +110,13 @@ class TicketDesignConfiguration(models.Model):
         if self.is_active:
             TicketDesignConfiguration.objects.filter(is_active=True).update(is_active=False)
         super().save(*args, **kwargs)
+        # El diseño cambió: recompilar la plantilla ESC/POS en el próximo ticket
+        invalidate_ticket_template()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_ticket_template()
+        return result
     
     def to_dict(self):
         """Convierte la configuración a diccionario para usar en el servicio de impresión"""
@@ -134,12 +160,16 @@ class PrintJob(models.Model):
     error_message = models.TextField(blank=True, null=True, verbose_name="Mensaje de error")
     
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Tomado por el worker")
     completed_at = models.DateTimeField(blank=True, null=True)
     
     class Meta:
         verbose_name = "Trabajo de Impresión"
         verbose_name_plural = "Trabajos de Impresión"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='printjob_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"Print Job {self.id} - Cliente {self.client_id} - {self.status}"
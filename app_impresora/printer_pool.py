@@ -0,0 +1,205 @@
+"""
+Conexiones persistentes con las impresoras.
+
+Abrir un ``Usb``/``Serial``/``Network`` cuesta más que imprimir un ticket, así
+que se mantiene una conexión abierta por ``PrinterConfiguration`` y se reutiliza
+entre trabajos. Cada conexión tiene su propio lock (las impresoras no aceptan
+escrituras intercaladas), se descarta ante cualquier error de escritura y se
+vuelve a abrir con espera exponencial para no insistir contra una impresora
+desconectada. Una conexión reutilizada puede haberse caído mientras estaba
+inactiva (la impresora se reinició, el router cerró el socket): ``send``
+reconecta y reintenta una vez antes de darla por fallida.
+
+El estado de cada conexión se publica en el cache de Django: el proceso web
+puede informar si la impresora del worker está conectada sin abrir otro socket
+(muchas impresoras de red aceptan una sola conexión en el puerto 9100).
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Espera inicial y máxima (segundos) antes de reintentar una conexión fallida
+BACKOFF_INICIAL = getattr(settings, 'IMPRESORA_BACKOFF_INICIAL', 1.0)
+BACKOFF_MAXIMO = getattr(settings, 'IMPRESORA_BACKOFF_MAXIMO', 60.0)
+
+
+class PrinterUnavailable(Exception):
+    """La impresora falló hace poco y todavía no toca reintentar la conexión"""
+
+
+def _clave_estado(config_id):
+    return f"printer_connection_state_{config_id}"
+
+
+def _firma(config):
+    """Datos de la configuración que obligan a reconectar si cambian"""
+    return (config.printer_type, config.connection_string)
+
+
+class _Conexion:
+    """Conexión abierta (o pendiente de reintento) de una configuración"""
+
+    def __init__(self, firma):
+        self.firma = firma
+        self.lock = threading.RLock()
+        self.printer = None
+        self.fallos = 0
+        self.reintentar_en = 0.0
+        self.ultimo_error = ''
+
+
+class PrinterConnectionPool:
+    """Mantiene una conexión por impresora, serializa su uso y reconecta con backoff"""
+
+    def __init__(self, factory):
+        # factory(config) construye el objeto escpos sin reutilizar nada
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._conexiones = {}
+
+    def _get(self, config):
+        with self._lock:
+            conexion = self._conexiones.get(config.id)
+            if conexion is None or conexion.firma != _firma(config):
+                if conexion is not None:
+                    self._cerrar(conexion)
+                conexion = _Conexion(_firma(config))
+                self._conexiones[config.id] = conexion
+            return conexion
+
+    @contextmanager
+    def acquire(self, config):
+        """Entrega la conexión de ``config`` con uso exclusivo; la descarta si algo falla"""
+        conexion = self._get(config)
+        with conexion.lock:
+            printer = self._conectar(conexion, config)
+            try:
+                yield printer
+            except Exception as e:
+                self._registrar_fallo(conexion, config, e)
+                raise
+
+    def send(self, config, datos):
+        """Escribe ``datos`` en la impresora; si la conexión reutilizada estaba caída reconecta y reintenta una vez"""
+        conexion = self._get(config)
+        with conexion.lock:
+            reutilizada = conexion.printer is not None
+            printer = self._conectar(conexion, config)
+            try:
+                printer._raw(datos)
+                return
+            except Exception as e:
+                if not reutilizada:
+                    self._registrar_fallo(conexion, config, e)
+                    raise
+                logger.info(f"Conexión con {config.name} caída mientras estaba inactiva, reconectando: {e}")
+                self._cerrar(conexion)
+
+            printer = self._conectar(conexion, config)
+            try:
+                printer._raw(datos)
+            except Exception as e:
+                self._registrar_fallo(conexion, config, e)
+                raise
+
+    def _conectar(self, conexion, config):
+        if conexion.printer is not None:
+            return conexion.printer
+
+        espera = conexion.reintentar_en - time.monotonic()
+        if espera > 0:
+            raise PrinterUnavailable(
+                f"Impresora {config.name} no disponible, reintento en {espera:.0f}s: {conexion.ultimo_error}"
+            )
+
+        try:
+            printer = self._factory(config)
+            # La propiedad device de escpos abre la conexión la primera vez que se usa
+            if printer.device is None:
+                raise PrinterUnavailable(f"No se pudo abrir la conexión con {config.name}")
+        except Exception as e:
+            self._registrar_fallo(conexion, config, e)
+            raise
+
+        conexion.printer = printer
+        conexion.fallos = 0
+        conexion.ultimo_error = ''
+        logger.info(f"Conexión abierta con la impresora {config.name}")
+        self._publicar_estado(conexion, config)
+        return printer
+
+    def _registrar_fallo(self, conexion, config, error):
+        self._cerrar(conexion)
+        conexion.fallos += 1
+        espera = min(BACKOFF_MAXIMO, BACKOFF_INICIAL * 2 ** (conexion.fallos - 1))
+        conexion.reintentar_en = time.monotonic() + espera
+        conexion.ultimo_error = str(error)
+        logger.warning(
+            f"Conexión con {config.name} descartada ({conexion.fallos} fallos seguidos, "
+            f"reintento en {espera:.0f}s): {error}"
+        )
+        self._publicar_estado(conexion, config)
+
+    def _cerrar(self, conexion):
+        if conexion.printer is None:
+            return
+        try:
+            conexion.printer.close()
+        except Exception as e:
+            logger.debug(f"Error cerrando conexión de impresora: {e}")
+        conexion.printer = None
+
+    def _publicar_estado(self, conexion, config):
+        cache.set(_clave_estado(config.id), {
+            'connected': conexion.printer is not None,
+            'failures': conexion.fallos,
+            'last_error': conexion.ultimo_error,
+            'retry_at': time.time() + max(0.0, conexion.reintentar_en - time.monotonic()),
+        }, None)
+
+    def state(self, config):
+        """
+        Estado conocido de la conexión sin tocar la impresora.
+
+        Devuelve None si ningún proceso ha intentado conectarse todavía.
+        """
+        with self._lock:
+            conexion = self._conexiones.get(config.id)
+        if conexion is not None and conexion.firma == _firma(config):
+            if conexion.printer is not None or conexion.fallos:
+                return {
+                    'connected': conexion.printer is not None,
+                    'failures': conexion.fallos,
+                    'last_error': conexion.ultimo_error,
+                    'retry_in': max(0.0, conexion.reintentar_en - time.monotonic()),
+                }
+        estado = cache.get(_clave_estado(config.id))
+        if estado is None:
+            return None
+        return {
+            'connected': estado['connected'],
+            'failures': estado['failures'],
+            'last_error': estado['last_error'],
+            'retry_in': max(0.0, estado['retry_at'] - time.time()),
+        }
+
+    def close(self, config_id=None):
+        """Cierra la conexión de una impresora (o todas) p. ej. al eliminarla o desactivarla"""
+        with self._lock:
+            if config_id is None:
+                conexiones = list(self._conexiones.items())
+                self._conexiones.clear()
+            else:
+                conexion = self._conexiones.pop(config_id, None)
+                conexiones = [(config_id, conexion)] if conexion else []
+        for id_config, conexion in conexiones:
+            with conexion.lock:
+                self._cerrar(conexion)
+            cache.delete(_clave_estado(id_config))
@@ -3,17 +3,20 @@ Servicio de impresión para integración con impresoras térmicas Epson
 Especialmente configurado para el modelo M244A
 """
 
-import os
 import logging
+import time
+from datetime import timedelta
 from io import BytesIO
-from PIL import Image
 import pytz
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
-from django.core.cache import cache
 from escpos.printer import Usb, Serial, Network
 from escpos.exceptions import Error as EscposError
+from app_page import metricas
 from .models import PrinterConfiguration, PrintJob
+from .printer_pool import PrinterConnectionPool
+from .ticket_templates import DEFAULT_DESIGN, get_ticket_template, load_design_config
 
 logger = logging.getLogger(__name__)
 
@@ -31,15 +34,20 @@ class PrinterService:
     def __init__(self):
         self.active_printer = None
         self.printer_config = None
-        # Cargar modo simulación desde cache/configuración
-        self.simulation_mode = cache.get('printer_simulation_mode', True)  # Por defecto True para demos
+        # Conexiones abiertas reutilizadas entre tickets
+        self.connections = PrinterConnectionPool(self._get_printer_instance)
         self._load_active_printer()
-        logger.info(f"PrinterService inicializado - Modo simulación: {self.simulation_mode}")
+        simulation_mode = bool(self.printer_config and self.printer_config.simulation_mode)
+        logger.info(f"PrinterService inicializado - Modo simulación: {simulation_mode}")
     
     def _load_active_printer(self):
         """Carga la configuración de la impresora activa"""
         try:
+            anterior = self.printer_config
             self.printer_config = PrinterConfiguration.objects.filter(is_active=True).first()
+            # Si cambió la impresora activa, liberar la conexión de la anterior
+            if anterior and (not self.printer_config or anterior.id != self.printer_config.id):
+                self.connections.close(anterior.id)
             if not self.printer_config:
                 logger.warning("No hay impresoras configuradas como activas")
                 return False
@@ -54,30 +62,37 @@ class PrinterService:
         """Recarga la configuración de la impresora"""
         return self._load_active_printer()
     
+    @property
+    def simulation_mode(self):
+        """Modo simulación de la impresora activa, leído de la base de datos para que lo vean todos los procesos"""
+        modo = PrinterConfiguration.objects.filter(is_active=True).values_list('simulation_mode', flat=True).first()
+        return bool(modo)
+
     def enable_simulation_mode(self, enable=True):
-        """Habilita o deshabilita el modo simulación"""
-        self.simulation_mode = enable
-        # Guardar en cache para persistir entre reinicios
-        cache.set('printer_simulation_mode', enable, 86400)  # 24 horas
+        """Habilita o deshabilita el modo simulación de todas las impresoras"""
+        PrinterConfiguration.objects.update(simulation_mode=enable)
+        if self.printer_config:
+            self.printer_config.simulation_mode = enable
         if enable:
             logger.info("Modo simulación HABILITADO - Las impresiones se simularán")
         else:
             logger.info("Modo simulación DESHABILITADO - Se intentará imprimir en hardware real")
     
     def reload_simulation_mode(self):
-        """Recarga el modo simulación desde el cache"""
-        self.simulation_mode = cache.get('printer_simulation_mode', True)
-        logger.info(f"Modo simulación recargado: {self.simulation_mode}")
-        return self.simulation_mode
+        """Devuelve el modo simulación actual (siempre se lee de la base de datos)"""
+        simulation_mode = self.simulation_mode
+        logger.info(f"Modo simulación recargado: {simulation_mode}")
+        return simulation_mode
     
-    def _get_printer_instance(self):
-        """Obtiene una instancia de la impresora basada en la configuración"""
-        if not self.printer_config:
+    def _get_printer_instance(self, printer_config=None):
+        """Crea una instancia nueva de la impresora (usar ``self.connections`` para imprimir)"""
+        printer_config = printer_config or self.printer_config
+        if not printer_config:
             raise Exception("No hay impresora configurada")
         
         try:
-            if self.printer_config.printer_type == 'USB':
-                connection = self.printer_config.connection_string
+            if printer_config.printer_type == 'USB':
+                connection = printer_config.connection_string
                 
                 # Si tenemos un nombre de impresora de Windows, usar Win32Raw directamente
                 if connection and ("Receipt" in connection or "EPSON" in connection):
@@ -96,18 +111,18 @@ class PrinterService:
                         except:
                             raise Exception("No se pudo conectar por USB directo")
                             
-            elif self.printer_config.printer_type == 'SERIAL':
-                port = self.printer_config.connection_string
+            elif printer_config.printer_type == 'SERIAL':
+                port = printer_config.connection_string
                 printer = Serial(port, baudrate=9600, timeout=1)
                 
-            elif self.printer_config.printer_type == 'NETWORK':
-                host_port = self.printer_config.connection_string.split(':')
+            elif printer_config.printer_type == 'NETWORK':
+                host_port = printer_config.connection_string.split(':')
                 host = host_port[0]
                 port = int(host_port[1]) if len(host_port) > 1 else 9100
                 printer = Network(host, port)
                 
             else:
-                raise Exception(f"Tipo de impresora no soportado: {self.printer_config.printer_type}")
+                raise Exception(f"Tipo de impresora no soportado: {printer_config.printer_type}")
                 
             return printer
             
@@ -115,38 +130,98 @@ class PrinterService:
             logger.error(f"Error conectando con la impresora: {e}")
             raise
     
-    def print_qr_ticket(self, cliente):
-        """Imprime un ticket con código QR para el cliente usando configuración personalizada"""
-        # Recargar configuración antes de cada impresión
+    def enqueue_qr_ticket(self, cliente):
+        """
+        Encola el ticket del cliente y devuelve el PrintJob (None si no hay impresora).
+
+        El trabajo queda en PENDING hasta que lo tome el worker
+        (``python manage.py print_worker``), así la petición que registra al
+        cliente no espera a la impresora. Con ``IMPRESION_EN_COLA = False`` se
+        imprime en el momento, como antes.
+        """
         self.reload_printer_config()
-        
+
         if not self.printer_config:
             logger.error("No hay impresora configurada")
-            return False
-        
-        # Cargar configuración de diseño personalizada desde BD o cache
-        design_config = self._load_design_config()
-        logger.info(f"Usando configuración de diseño: {design_config}")
-            
-        # Crear registro de trabajo de impresión
+            return None
+
         print_job = PrintJob.objects.create(
             printer=self.printer_config,
             client_id=cliente.id,
             content_type='QR_CODE',
             status='PENDING'
         )
-        
+        metricas.contar_impresion('PENDING', self.printer_config.name)
+
+        if not getattr(settings, 'IMPRESION_EN_COLA', True):
+            self.process_job(print_job, cliente)
+        return print_job
+
+    def print_qr_ticket(self, cliente):
+        """Imprime un ticket con código QR para el cliente sin pasar por la cola"""
+        print_job = self.enqueue_qr_ticket(cliente)
+        if print_job is None:
+            return False
+        if print_job.status == 'PENDING':
+            self.process_job(print_job, cliente)
+        return print_job.status == 'SUCCESS'
+
+    def claim_next_job(self, printer=None):
+        """Toma el trabajo pendiente más antiguo (de ``printer`` si se indica) y lo marca como PRINTING"""
+        pendientes = PrintJob.objects.filter(status='PENDING').select_related('printer')
+        if printer is not None:
+            pendientes = pendientes.filter(printer=printer)
+        while True:
+            print_job = pendientes.order_by('created_at', 'id').first()
+            if print_job is None:
+                return None
+            # UPDATE condicional: si otro worker lo tomó primero se pasa al siguiente
+            ahora = timezone.now()
+            if PrintJob.objects.filter(id=print_job.id, status='PENDING').update(status='PRINTING', started_at=ahora):
+                print_job.status = 'PRINTING'
+                print_job.started_at = ahora
+                return print_job
+
+    def recover_stale_jobs(self, printer=None, seconds=300):
+        """Devuelve a PENDING los trabajos en PRINTING hace más de ``seconds`` (worker detenido a medias)"""
+        limite = timezone.now() - timedelta(seconds=seconds)
+        atascados = PrintJob.objects.filter(status='PRINTING').filter(
+            Q(started_at__lt=limite) | Q(started_at__isnull=True)
+        )
+        if printer is not None:
+            atascados = atascados.filter(printer=printer)
+        return atascados.update(status='PENDING', started_at=None)
+
+    def process_job(self, print_job, cliente=None):
+        """Imprime un trabajo de la cola y registra su resultado y duración en las métricas"""
+        inicio = time.perf_counter()
         try:
-            print_job.status = 'PRINTING'
-            print_job.save()
-            
-            # Modo simulación para pruebas sin hardware
-            if self.simulation_mode:
+            return self._process_job(print_job, cliente)
+        finally:
+            metricas.contar_impresion(print_job.status, print_job.printer.name, time.perf_counter() - inicio)
+
+    def _process_job(self, print_job, cliente=None):
+        """Imprime un trabajo en su impresora usando configuración personalizada y registra el resultado"""
+        # Plantilla precompilada del diseño activo (sin consultar la BD en estado estable)
+        template = get_ticket_template()
+        logger.info(f"Usando configuración de diseño: {template.config}")
+
+        try:
+            if cliente is None:
+                from app_page.models import Cliente
+                cliente = Cliente.objects.get(id=print_job.client_id)
+
+            if print_job.status != 'PRINTING':
+                print_job.status = 'PRINTING'
+                print_job.save(update_fields=['status'])
+
+            # Modo simulación para pruebas sin hardware; la impresora del trabajo se leyó al tomarlo
+            if print_job.printer.simulation_mode:
                 logger.info(f"🎭 SIMULACIÓN: Imprimiendo ticket para cliente {cliente.id}")
                 logger.info(f"   - Datos: {cliente.get_display_name()} - {cliente.matricula}")
-                logger.info(f"   - QR: {cliente.qr_image.url if cliente.qr_image else 'No disponible'}")
-                logger.info(f"   - Impresora: {self.printer_config.name}")
-                logger.info(f"   - Configuración de diseño aplicada: {design_config}")
+                logger.info(f"   - QR ({print_job.printer.qr_mode}): {cliente.id}")
+                logger.info(f"   - Impresora: {print_job.printer.name}")
+                logger.info(f"   - Configuración de diseño aplicada: {template.config}")
                 
                 print_job.status = 'SUCCESS'
                 print_job.completed_at = timezone.now()
@@ -156,7 +231,7 @@ class PrinterService:
                 return True
 
             # Imprimir con configuración personalizada
-            return self._print_with_custom_design(cliente, print_job, design_config)
+            return self._print_with_custom_design(cliente, print_job, template)
             
         except Exception as e:
             error_msg = f"Error imprimiendo ticket: {str(e)}"
@@ -171,132 +246,19 @@ class PrinterService:
 
     def _load_design_config(self):
         """Carga la configuración de diseño desde BD o cache"""
-        try:
-            from .models import TicketDesignConfiguration
-            
-            # Intentar cargar desde la base de datos
-            active_config = TicketDesignConfiguration.objects.filter(is_active=True).first()
-            
-            if active_config:
-                config = active_config.to_dict()
-                logger.info(f"Configuración cargada desde BD: {active_config.name}")
-                return config
-            else:
-                # Fallback al cache
-                config = cache.get('printer_design_config', {})
-                if config:
-                    logger.info("Configuración cargada desde cache")
-                    return config
-                else:
-                    logger.info("Usando configuración por defecto")
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"Error cargando configuración de diseño: {e}, usando por defecto")
-            return {}
+        return load_design_config()
 
-    def _print_with_custom_design(self, cliente, print_job, design_config=None):
-        """Imprime el ticket aplicando la configuración de diseño personalizada"""
-        if not design_config:
-            design_config = {}
-            
-        # Configuración por defecto
-        default_config = {
-            'font': 'courier',
-            'fontSize': 12,
-            'ticketWidth': 80,
-            'showLogo': True,
-            'showFecha': True,
-            'showQr': True,
-            'showFooter': True,
-            'headerText': 'SISTEMA DE PARKING\nControl de Acceso',
-            'footerText': 'Conserve este ticket\nGracias por su visita'
-        }
-        
-        # Combinar configuración por defecto con la personalizada
-        config = {**default_config, **design_config}
+    def _print_with_custom_design(self, cliente, print_job, template=None):
+        """Imprime el ticket con la plantilla precompilada del diseño en una sola escritura"""
+        if template is None:
+            template = get_ticket_template()
         
         try:
-            printer = self._get_printer_instance()
-            
-            # Configurar codificación
-            printer.charcode('CP437')
-            
-            # Encabezado personalizado
-            if config.get('showLogo', True):
-                printer.set(align='center', bold=True, double_width=True, double_height=True)
-                header_lines = config.get('headerText', 'SISTEMA DE PARKING').split('\n')
-                for line in header_lines:
-                    printer.text(line + '\n')
-                    
-                printer.text('=' * 32 + '\n')
-                printer.text('\n')
+            # Solo los datos del cliente y el QR se generan por ticket; se imprime
+            # en la impresora del trabajo aunque la activa haya cambiado
+            ticket = template.render(cliente, print_job.printer.qr_mode)
             
-            # Información del cliente con formato personalizado
-            printer.set(align='left', bold=False, double_width=False, double_height=False)
-            
-            if config.get('showFecha', True):
-                fecha_actual = get_bogota_time()
-                printer.text(f"Fecha: {fecha_actual.strftime('%d/%m/%Y %H:%M')}\n")
-            
-            printer.text(f"ID: {cliente.id}\n")
-            printer.text(f"Cedula: {cliente.cedula or 'N/A'}\n")
-            printer.text(f"Nombre: {cliente.nombre or 'N/A'}\n")
-            
-            # Información de ubicación (torre y apartamento)
-            if cliente.torre or cliente.apartamento:
-                if cliente.torre and cliente.apartamento:
-                    printer.text(f"Ubicacion: Torre {cliente.torre} - Apt {cliente.apartamento}\n")
-                elif cliente.torre:
-                    printer.text(f"Torre: {cliente.torre}\n")
-                elif cliente.apartamento:
-                    printer.text(f"Apartamento: {cliente.apartamento}\n")
-            
-            printer.text(f"Vehiculo: {cliente.get_tipo_vehiculo_display()}\n")
-            printer.text(f"Matricula: {cliente.matricula}\n")
-            
-            if cliente.fecha_entrada:
-                fecha_entrada_bogota = get_bogota_time(cliente.fecha_entrada)
-                fecha_entrada = fecha_entrada_bogota.strftime('%d/%m/%Y %H:%M')
-                printer.text(f"Entrada: {fecha_entrada}\n")
-            
-            printer.text('\n')
-            
-            # Código QR personalizado
-            if config.get('showQr', True) and cliente.qr_image:
-                try:
-                    if os.path.exists(cliente.qr_image.path):
-                        qr_image = Image.open(cliente.qr_image.path)
-                        
-                        # Redimensionar según la configuración
-                        qr_size = min(200, int(config.get('ticketWidth', 80)) * 2)
-                        qr_image = qr_image.resize((qr_size, qr_size), Image.Resampling.LANCZOS)
-                        
-                        if qr_image.mode != 'RGB':
-                            qr_image = qr_image.convert('RGB')
-                        
-                        printer.set(align='center')
-                        printer.image(qr_image, center=True)
-                        printer.text('\n')
-                        
-                except Exception as qr_error:
-                    logger.warning(f"Error procesando QR: {qr_error}")
-                    # En caso de error, no imprimir nada para mantener el QR limpio
-                    pass
-            
-            # Pie de página personalizado
-            if config.get('showFooter', True):
-                printer.set(align='center', bold=False)
-                printer.text('-' * 32 + '\n')
-                footer_lines = config.get('footerText', 'Gracias por su visita').split('\n')
-                for line in footer_lines:
-                    printer.text(line + '\n')
-            
-            # Cortar papel
-            printer.text('\n' * 3)
-            printer.cut()
-            
-            printer.close()
+            self.connections.send(print_job.printer, ticket)
             
             # Actualizar estado del trabajo
             print_job.status = 'SUCCESS'
@@ -323,26 +285,25 @@ class PrinterService:
             return False, "No hay impresora configurada"
             
         try:
-            printer = self._get_printer_instance()
+            with self.connections.acquire(self.printer_config) as printer:
             
-            # Imprimir página de prueba
-            printer.set(align='center', font='a', bold=True, double_height=True)
-            printer.text("PRUEBA DE IMPRESORA\n")
-            printer.text("=" * self.printer_config.chars_per_line + "\n")
+                # Imprimir página de prueba
+                printer.set(align='center', font='a', bold=True, double_height=True)
+                printer.text("PRUEBA DE IMPRESORA\n")
+                printer.text("=" * self.printer_config.chars_per_line + "\n")
             
-            printer.set(align='left', font='a', bold=False, double_height=False)
-            printer.text(f"Modelo: {self.printer_config.model}\n")
-            printer.text(f"Conexion: {self.printer_config.printer_type}\n")
-            fecha_bogota = get_bogota_time()
-            printer.text(f"Fecha: {fecha_bogota.strftime('%d/%m/%Y %H:%M')}\n")
+                printer.set(align='left', font='a', bold=False, double_height=False)
+                printer.text(f"Modelo: {self.printer_config.model}\n")
+                printer.text(f"Conexion: {self.printer_config.printer_type}\n")
+                fecha_bogota = get_bogota_time()
+                printer.text(f"Fecha: {fecha_bogota.strftime('%d/%m/%Y %H:%M')}\n")
             
-            printer.text("-" * self.printer_config.chars_per_line + "\n")
-            printer.text("Si puede leer este texto,\n")
-            printer.text("la impresora funciona correctamente.\n")
-            printer.text("=" * self.printer_config.chars_per_line + "\n")
+                printer.text("-" * self.printer_config.chars_per_line + "\n")
+                printer.text("Si puede leer este texto,\n")
+                printer.text("la impresora funciona correctamente.\n")
+                printer.text("=" * self.printer_config.chars_per_line + "\n")
             
-            printer.cut()
-            printer.close()
+                printer.cut()
             
             logger.info("Prueba de impresora exitosa")
             return True, "Impresora funcionando correctamente"
@@ -361,28 +322,40 @@ class PrinterService:
                 'message': 'No hay impresora configurada'
             }
         
-        try:
-            printer = self._get_printer_instance()
-            printer.close()  # Solo probamos la conexión
-            
-            return {
-                'configured': True,
-                'connected': True,
-                'printer_name': self.printer_config.name,
-                'printer_model': self.printer_config.model,
-                'connection_type': self.printer_config.printer_type,
-                'message': 'Impresora conectada y lista'
-            }
-            
-        except Exception as e:
-            return {
-                'configured': True,
-                'connected': False,
-                'printer_name': self.printer_config.name,
-                'printer_model': self.printer_config.model,
-                'connection_type': self.printer_config.printer_type,
-                'message': f'Error de conexión: {str(e)}'
-            }
+        status = {
+            'configured': True,
+            'printer_name': self.printer_config.name,
+            'printer_model': self.printer_config.model,
+            'connection_type': self.printer_config.printer_type,
+        }
+
+        # Estado de la conexión persistente (de este proceso o del worker, vía cache).
+        # Nunca se abre una conexión desde aquí: muchas impresoras de red aceptan
+        # una sola en el puerto 9100 y le pertenece al worker de impresión
+        state = self.connections.state(self.printer_config)
+        if state is None:
+            return {**status, 'connected': None, 'message': self._ultimo_resultado(self.printer_config)}
+
+        if state['connected']:
+            return {**status, 'connected': True, 'message': 'Impresora conectada y lista'}
+        return {
+            **status,
+            'connected': False,
+            'retry_in': round(state['retry_in']),
+            'message': f"Error de conexión: {state['last_error']}",
+        }
+
+    def _ultimo_resultado(self, printer_config):
+        """Mensaje con el último trabajo terminado de la impresora cuando no se conoce el estado de la conexión"""
+        ultimo = PrintJob.objects.filter(
+            printer=printer_config, status__in=['SUCCESS', 'FAILED']
+        ).order_by('-completed_at').only('status', 'completed_at', 'error_message').first()
+        if ultimo is None:
+            return 'Estado desconocido: el worker de impresión todavía no ha impreso'
+        fecha = get_bogota_time(ultimo.completed_at).strftime('%d/%m/%Y %H:%M') if ultimo.completed_at else ''
+        if ultimo.status == 'SUCCESS':
+            return f'Estado desconocido; último ticket impreso el {fecha}'
+        return f'Estado desconocido; el último ticket falló el {fecha}: {ultimo.error_message}'
 
     def print_preview_ticket(self, cliente_data, design_config=None):
         """
@@ -394,9 +367,7 @@ class PrinterService:
         """
         try:
             # Verificar modo simulación
-            simulation_mode = cache.get('printer_simulation_mode', False)
-            
-            if simulation_mode:
+            if self.simulation_mode:
                 logger.info("=== MODO SIMULACIÓN ACTIVO ===")
                 logger.info(f"Simulando impresión de ticket de previsualización para: {cliente_data.get('nombre', 'Cliente')}")
                 logger.info(f"Configuración de diseño aplicada: {design_config}")
@@ -406,21 +377,8 @@ class PrinterService:
             if not design_config:
                 design_config = self._load_design_config()
                 
-            # Configuración por defecto si no hay ninguna
-            default_config = {
-                'font': 'courier',
-                'fontSize': 12,
-                'ticketWidth': 80,
-                'showLogo': True,
-                'showFecha': True,
-                'showQr': True,
-                'showFooter': True,
-                'headerText': 'SISTEMA DE PARKING\nControl de Acceso',
-                'footerText': 'Conserve este ticket\nGracias por su visita'
-            }
-            
             # Combinar configuración por defecto con la personalizada
-            config = {**default_config, **design_config}
+            config = {**DEFAULT_DESIGN, **design_config}
             
             logger.info(f"Imprimiendo ticket de previsualización con configuración: {config}")
             
@@ -429,75 +387,74 @@ class PrinterService:
                 logger.error("No hay impresora configurada")
                 return False
                 
-            printer = self._get_printer_instance()
+            with self.connections.acquire(self.printer_config) as printer:
             
-            # Configurar codificación
-            printer.charcode('CP437')
+                # Configurar codificación
+                printer.charcode('CP437')
             
-            # Encabezado personalizado
-            if config.get('showLogo', True):
-                printer.set(align='center', bold=True, double_width=True, double_height=True)
-                header_lines = config.get('headerText', 'SISTEMA DE PARKING').split('\n')
-                for line in header_lines:
-                    printer.text(line + '\n')
+                # Encabezado personalizado
+                if config.get('showLogo', True):
+                    printer.set(align='center', bold=True, double_width=True, double_height=True)
+                    header_lines = config.get('headerText', 'SISTEMA DE PARKING').split('\n')
+                    for line in header_lines:
+                        printer.text(line + '\n')
                     
-                printer.text('=' * 32 + '\n')
-                printer.text('\n')
+                    printer.text('=' * 32 + '\n')
+                    printer.text('\n')
             
-            # Información del cliente con formato personalizado
-            printer.set(align='left', bold=False)
+                # Información del cliente con formato personalizado
+                printer.set(align='left', bold=False)
             
-            if config.get('showFecha', True):
-                fecha_actual = get_bogota_time()
-                printer.text(f"Fecha: {fecha_actual.strftime('%d/%m/%Y %H:%M')}\n")
-                
-            printer.text(f"Cedula: {cliente_data.get('cedula', 'N/A')}\n")
-            printer.text(f"Nombre: {cliente_data.get('nombre', 'N/A')}\n")
-            
-            # Información de ubicación (torre y apartamento)
-            torre = cliente_data.get('torre', '')
-            apartamento = cliente_data.get('apartamento', '')
-            if torre or apartamento:
-                if torre and apartamento:
-                    printer.text(f"Ubicacion: Torre {torre} - Apt {apartamento}\n")
-                elif torre:
-                    printer.text(f"Torre: {torre}\n")
-                elif apartamento:
-                    printer.text(f"Apartamento: {apartamento}\n")
-            
-            printer.text(f"Vehiculo: {cliente_data.get('tipo_vehiculo', 'auto').upper()}\n")
-            printer.text(f"Placa: {cliente_data.get('placa', 'N/A')}\n")
-            
-            printer.text('\n')
-            
-            # Código QR personalizado
-            if config.get('showQr', True):
-                qr_data = f"PREVIEW_{cliente_data.get('cedula', '000000')}_{fecha_actual.strftime('%Y%m%d%H%M')}"
-                printer.set(align='center')
-                try:
-                    printer.qr(qr_data, size=6)
-                except Exception as qr_error:
-                    logger.warning(f"Error generando QR: {qr_error}")
-                    # En caso de error, no imprimir nada para mantener el QR limpio
-                    pass
+                if config.get('showFecha', True):
+                    fecha_actual = get_bogota_time()
+                    printer.text(f"Fecha: {fecha_actual.strftime('%d/%m/%Y %H:%M')}\n")
                 
+                printer.text(f"Cedula: {cliente_data.get('cedula', 'N/A')}\n")
+                printer.text(f"Nombre: {cliente_data.get('nombre', 'N/A')}\n")
+            
+                # Información de ubicación (torre y apartamento)
+                torre = cliente_data.get('torre', '')
+                apartamento = cliente_data.get('apartamento', '')
+                if torre or apartamento:
+                    if torre and apartamento:
+                        printer.text(f"Ubicacion: Torre {torre} - Apt {apartamento}\n")
+                    elif torre:
+                        printer.text(f"Torre: {torre}\n")
+                    elif apartamento:
+                        printer.text(f"Apartamento: {apartamento}\n")
+            
+                printer.text(f"Vehiculo: {cliente_data.get('tipo_vehiculo', 'auto').upper()}\n")
+                printer.text(f"Placa: {cliente_data.get('placa', 'N/A')}\n")
+            
                 printer.text('\n')
             
-            # Pie de página personalizado
-            if config.get('showFooter', True):
-                printer.set(align='center', bold=False)
-                printer.text('-' * 32 + '\n')
-                footer_lines = config.get('footerText', 'Gracias por su visita').split('\n')
-                for line in footer_lines:
-                    printer.text(line + '\n')
+                # Código QR personalizado
+                if config.get('showQr', True):
+                    qr_data = f"PREVIEW_{cliente_data.get('cedula', '000000')}_{fecha_actual.strftime('%Y%m%d%H%M')}"
+                    printer.set(align='center')
+                    try:
+                        printer.qr(qr_data, size=6, native=self.printer_config.qr_mode == 'NATIVE')
+                    except Exception as qr_error:
+                        logger.warning(f"Error generando QR: {qr_error}")
+                        # En caso de error, no imprimir nada para mantener el QR limpio
+                        pass
+                
+                    printer.text('\n')
+            
+                # Pie de página personalizado
+                if config.get('showFooter', True):
+                    printer.set(align='center', bold=False)
+                    printer.text('-' * 32 + '\n')
+                    footer_lines = config.get('footerText', 'Gracias por su visita').split('\n')
+                    for line in footer_lines:
+                        printer.text(line + '\n')
                     
-                printer.text('** TICKET DE PREVISUALIZACIÓN **\n')
+                    printer.text('** TICKET DE PREVISUALIZACIÓN **\n')
             
-            # Cortar papel
-            printer.text('\n' * 3)
-            printer.cut()
+                # Cortar papel
+                printer.text('\n' * 3)
+                printer.cut()
             
-            printer.close()
             
             logger.info(f"Ticket de previsualización impreso exitosamente para {cliente_data.get('nombre', 'Cliente')}")
             return True
@@ -1,3 +1,270 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from app_page.models import Cliente
+from .models import PrinterConfiguration, PrintJob, TicketDesignConfiguration
+from .printer_pool import PrinterConnectionPool, PrinterUnavailable
+from .printer_service import PrinterService, printer_service
+from .ticket_templates import get_ticket_template, qr_raster
+
+
+class PrintJobIndexTests(TestCase):
+    """La cola de impresión se consulta por estado y antigüedad usando el índice"""
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Con tablas casi vacías PostgreSQL prefiere un seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            # El ajuste es de la conexión compartida por todas las pruebas
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def test_pendientes_por_fecha_usa_indice(self):
+        plan = PrintJob.objects.filter(status='PENDING').order_by('created_at').explain()
+        self.assertIn('printjob_status_created_idx', plan)
+
+
+class PrintQueueTests(TestCase):
+    """El registro solo encola el ticket; el worker lo imprime después"""
+
+    def setUp(self):
+        PrinterConfiguration.objects.create(
+            name='Pruebas', printer_type='NETWORK', connection_string='127.0.0.1:9100', is_active=True
+        )
+        printer_service.enable_simulation_mode(True)
+        User.objects.create_user(username='guardia', password='testpass')
+        self.client.login(username='guardia', password='testpass')
+        self.cliente = Cliente.objects.create(matricula='ABC-123', tipo_vehiculo='Auto')
+
+    def test_encolar_no_imprime_y_worker_procesa(self):
+        print_job = printer_service.enqueue_qr_ticket(self.cliente)
+        self.assertEqual(print_job.status, 'PENDING')
+
+        status_url = reverse('print_job_status', args=[print_job.id])
+        self.assertEqual(self.client.get(status_url).json()['job']['status'], 'PENDING')
+
+        call_command('print_worker', '--once', stdout=StringIO())
+
+        job = self.client.get(status_url).json()['job']
+        self.assertEqual(job['status'], 'SUCCESS')
+        self.assertIsNotNone(job['completed_at'])
+
+    def test_metricas_por_estado_e_impresora(self):
+        from prometheus_client import REGISTRY
+
+        def valor(nombre, **etiquetas):
+            return REGISTRY.get_sample_value(nombre, etiquetas) or 0
+
+        encolados = valor('impresion_trabajos_total', estado='PENDING', impresora='Pruebas')
+        exitosos = valor('impresion_trabajos_total', estado='SUCCESS', impresora='Pruebas')
+        impresiones = valor('impresion_duracion_segundos_count', impresora='Pruebas')
+        printer_service.enqueue_qr_ticket(self.cliente)
+        call_command('print_worker', '--once', stdout=StringIO())
+        self.assertEqual(valor('impresion_trabajos_total', estado='PENDING', impresora='Pruebas'), encolados + 1)
+        self.assertEqual(valor('impresion_trabajos_total', estado='SUCCESS', impresora='Pruebas'), exitosos + 1)
+        self.assertEqual(valor('impresion_duracion_segundos_count', impresora='Pruebas'), impresiones + 1)
+
+    def test_cada_worker_atiende_solo_su_impresora(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        otra = PrinterConfiguration.objects.create(
+            name='Torre 2', printer_type='NETWORK', connection_string='127.0.0.2:9100', is_active=False,
+            simulation_mode=True,
+        )
+        propio = printer_service.enqueue_qr_ticket(self.cliente)
+        ajeno = PrintJob.objects.create(printer=otra, client_id=self.cliente.id)
+        en_curso = PrintJob.objects.create(printer=otra, client_id=self.cliente.id, status='PRINTING', started_at=timezone.now())
+        abandonado = PrintJob.objects.create(
+            printer=otra, client_id=self.cliente.id, status='PRINTING', started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        # El worker de Torre 2 recupera solo el trabajo abandonado y no toca la cola de la otra impresora
+        call_command('print_worker', '--once', '--printer', 'Torre 2', stdout=StringIO())
+        estados = dict(PrintJob.objects.values_list('id', 'status'))
+        self.assertEqual(estados[ajeno.id], 'SUCCESS')
+        self.assertEqual(estados[abandonado.id], 'SUCCESS')
+        self.assertEqual(estados[en_curso.id], 'PRINTING')
+        self.assertEqual(estados[propio.id], 'PENDING')
+
+    def test_el_worker_ve_el_modo_simulacion_cambiado_desde_la_web(self):
+        from unittest import mock
+        self.client.post(reverse('toggle_simulation'), '{"enable": false}', content_type='application/json')
+        # La web es otro proceso: el cache del worker no se entera del cambio
+        cache.clear()
+        real = printer_service.enqueue_qr_ticket(self.cliente)
+        with mock.patch.object(printer_service.connections, 'send') as send:
+            call_command('print_worker', '--once', stdout=StringIO())
+        send.assert_called_once()
+        self.assertEqual(PrintJob.objects.get(id=real.id).status, 'SUCCESS')
+
+        self.client.post(reverse('toggle_simulation'), '{"enable": true}', content_type='application/json')
+        cache.clear()
+        simulado = printer_service.enqueue_qr_ticket(self.cliente)
+        with mock.patch.object(printer_service.connections, 'send') as send:
+            call_command('print_worker', '--once', stdout=StringIO())
+        send.assert_not_called()
+        self.assertEqual(PrintJob.objects.get(id=simulado.id).status, 'SUCCESS')
+
+    def test_un_trabajo_solo_se_toma_una_vez(self):
+        print_job = printer_service.enqueue_qr_ticket(self.cliente)
+        self.assertEqual(printer_service.claim_next_job().id, print_job.id)
+        self.assertIsNone(printer_service.claim_next_job())
+        self.assertEqual(PrintJob.objects.get(id=print_job.id).status, 'PRINTING')
+
+
+class FakePrinter:
+    """Impresora de pruebas que cuenta aperturas y cierres"""
+
+    def __init__(self):
+        self.device = object()
+        self.closed = False
+        self.writes = []
+
+    def _raw(self, data):
+        self.writes.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+class PrinterConnectionPoolTests(TestCase):
+    """Una conexión por impresora, reutilizada y reabierta con backoff tras un fallo"""
+
+    def setUp(self):
+        cache.clear()
+        self.config = PrinterConfiguration.objects.create(
+            name='Pruebas', printer_type='NETWORK', connection_string='127.0.0.1:9100', is_active=True
+        )
+        self.creadas = []
+
+        def factory(config):
+            self.creadas.append(FakePrinter())
+            return self.creadas[-1]
+
+        self.pool = PrinterConnectionPool(factory)
+
+    def test_reutiliza_la_conexion(self):
+        for _ in range(3):
+            with self.pool.acquire(self.config) as printer:
+                self.assertIs(printer, self.creadas[0])
+        self.assertEqual(len(self.creadas), 1)
+        self.assertFalse(self.creadas[0].closed)
+        self.assertTrue(self.pool.state(self.config)['connected'])
+
+    def test_fallo_descarta_conexion_y_espera_antes_de_reintentar(self):
+        with self.assertRaises(OSError):
+            with self.pool.acquire(self.config):
+                raise OSError('papel atascado')
+        self.assertTrue(self.creadas[0].closed)
+
+        with self.assertRaises(PrinterUnavailable):
+            with self.pool.acquire(self.config):
+                pass
+        self.assertEqual(len(self.creadas), 1)
+
+        # Otro proceso ve el estado publicado en cache sin abrir la impresora
+        estado = PrinterConnectionPool(lambda config: self.fail('no debe conectar')).state(self.config)
+        self.assertFalse(estado['connected'])
+        self.assertEqual(estado['last_error'], 'papel atascado')
+
+
+    def test_send_reconecta_una_vez_si_la_conexion_inactiva_se_cayo(self):
+        with self.pool.acquire(self.config):
+            pass
+
+        def caida(data):
+            raise BrokenPipeError('socket cerrado por la impresora')
+        self.creadas[0]._raw = caida
+
+        self.pool.send(self.config, b'ticket')
+        self.assertTrue(self.creadas[0].closed)
+        self.assertEqual(self.creadas[1].writes, [b'ticket'])
+        self.assertTrue(self.pool.state(self.config)['connected'])
+
+    def test_estado_desde_la_web_no_abre_la_impresora(self):
+        servicio = PrinterService()
+        servicio.printer_config = self.config
+        servicio.connections = PrinterConnectionPool(lambda config: self.fail('no debe conectar'))
+        estado = servicio.get_printer_status()
+        self.assertIsNone(estado['connected'])
+        self.assertIn('desconocido', estado['message'])
+
+
+class TicketTemplateTests(TestCase):
+    """Las partes fijas del ticket se compilan una vez por diseño y el ticket sale en una escritura"""
+
+    def setUp(self):
+        cache.clear()
+        self.diseno = TicketDesignConfiguration.objects.create(
+            name='Portería', header_text='TORRES DEL PARQUE', is_active=True
+        )
+
+    def test_plantilla_cacheada_e_invalidada_al_guardar(self):
+        plantilla = get_ticket_template()
+        self.assertIn(b'TORRES DEL PARQUE', plantilla.header)
+        with self.assertNumQueries(0):
+            self.assertIs(get_ticket_template(), plantilla)
+
+        self.diseno.header_text = 'CONJUNTO NUEVO'
+        self.diseno.save()
+        self.assertIn(b'CONJUNTO NUEVO', get_ticket_template().header)
+
+    def test_el_worker_ve_el_diseno_guardado_por_otro_proceso(self):
+        from django.utils import timezone
+        from . import ticket_templates
+        get_ticket_template()
+        # La web guarda el diseño en otro proceso: ni la invalidación ni su cache llegan aquí
+        TicketDesignConfiguration.objects.filter(id=self.diseno.id).update(
+            header_text='CONJUNTO NUEVO', updated_at=timezone.now()
+        )
+        ticket_templates._template_local_expira = 0.0
+        self.assertIn(b'CONJUNTO NUEVO', get_ticket_template().header)
+
+    def test_ticket_en_una_sola_escritura(self):
+        config = PrinterConfiguration.objects.create(
+            name='Pruebas', printer_type='NETWORK', connection_string='127.0.0.1:9100', is_active=True
+        )
+        impresora = FakePrinter()
+        service = PrinterService()
+        service.printer_config = config
+        service.connections = PrinterConnectionPool(lambda config: impresora)
+        cliente = Cliente.objects.create(matricula='ABC-123', tipo_vehiculo='Auto')
+        print_job = PrintJob.objects.create(printer=config, client_id=cliente.id)
+
+        self.assertTrue(service._print_with_custom_design(cliente, print_job))
+
+        plantilla = get_ticket_template()
+        self.assertEqual(len(impresora.writes), 1)
+        ticket = impresora.writes[0]
+        self.assertTrue(ticket.startswith(plantilla.header))
+        self.assertTrue(ticket.endswith(plantilla.footer))
+        self.assertIn(b'Matricula: ABC-123', ticket)
+        self.assertEqual(PrintJob.objects.get(id=print_job.id).status, 'SUCCESS')
+
+    def test_qr_nativo_o_raster_segun_impresora(self):
+        cliente = Cliente.objects.create(matricula='ABC-123', tipo_vehiculo='Auto')
+        plantilla = get_ticket_template()
+        payload = f'1P0{cliente.id}'.encode()
+
+        nativo = plantilla.render(cliente, 'NATIVE')
+        self.assertIn(b'\x1d(k', nativo)
+        self.assertIn(payload, nativo)
+        self.assertNotIn(b'\x1dv0', nativo)
 
-# Create your tests here.
+        qr_raster.cache_clear()
+        raster = plantilla.render(cliente, 'RASTER')
+        self.assertIn(b'\x1dv0', raster)
+        self.assertNotIn(b'\x1d(k', raster)
+        plantilla.render(cliente, 'RASTER')
+        self.assertEqual(qr_raster.cache_info().hits, 1)
+        self.assertGreater(len(raster), len(nativo))
@@ -0,0 +1,223 @@
+"""
+Plantillas ESC/POS precompiladas para los tickets de entrada.
+
+El encabezado, los separadores y el pie del ticket solo dependen de la
+``TicketDesignConfiguration`` activa, así que se generan una vez como bytes
+ESC/POS (con la impresora ``Dummy`` de python-escpos) y se guardan en memoria
+del proceso y en el cache de Django. Al imprimir solo se generan los datos del
+cliente y el QR, y el ticket completo se envía a la impresora en una sola
+escritura. ``TicketDesignConfiguration.save`` invalida la plantilla.
+
+La invalidación solo alcanza al proceso que guardó el diseño (y al cache si es
+compartido); ``print_worker`` corre en otro proceso. Por eso la plantilla lleva
+la versión del diseño activo (id y ``updated_at``) y cada ``LOCAL_TTL``
+segundos se compara con la base de datos en una consulta liviana.
+
+El QR se imprime con el comando nativo ``GS ( k`` (la impresora lo dibuja a
+partir del id) salvo que la ``PrinterConfiguration`` indique modo raster.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from escpos.printer import Dummy
+
+from app_qr.render import imagen_qr
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'ticket_template_compiled'
+
+# Segundos que un proceso reutiliza su copia local sin verificar la versión del
+# diseño en la base de datos (lo máximo que tarda el worker en ver un cambio)
+LOCAL_TTL = getattr(settings, 'IMPRESORA_PLANTILLA_LOCAL_TTL', 5)
+
+DEFAULT_DESIGN = {
+    'font': 'courier',
+    'fontSize': 12,
+    'ticketWidth': 80,
+    'showLogo': True,
+    'showFecha': True,
+    'showQr': True,
+    'showFooter': True,
+    'headerText': 'SISTEMA DE PARKING\nControl de Acceso',
+    'footerText': 'Conserve este ticket\nGracias por su visita'
+}
+
+_template_local = None
+_template_local_expira = 0.0
+
+
+def _bogota(dt=None):
+    from .printer_service import get_bogota_time
+    return get_bogota_time(dt)
+
+
+@dataclass(frozen=True)
+class TicketTemplate:
+    """Diseño activo con sus partes estáticas ya convertidas a bytes ESC/POS"""
+    config: dict
+    header: bytes
+    footer: bytes
+
+    @property
+    def qr_size(self):
+        """Lado del QR en puntos para el modo raster"""
+        return min(200, int(self.config.get('ticketWidth', 80)) * 2)
+
+    @property
+    def qr_module_size(self):
+        """Tamaño de módulo (1-16) del QR nativo equivalente a ``qr_size``"""
+        return max(3, min(8, int(self.config.get('ticketWidth', 80)) * 2 // 25))
+
+    def render(self, cliente, qr_mode='NATIVE'):
+        """Devuelve el ticket completo del cliente listo para una sola escritura"""
+        body = Dummy()
+        body.charcode('CP437')
+
+        # Información del cliente con formato personalizado
+        body.set(align='left', bold=False, double_width=False, double_height=False)
+
+        if self.config.get('showFecha', True):
+            body.text(f"Fecha: {_bogota().strftime('%d/%m/%Y %H:%M')}\n")
+
+        body.text(f"ID: {cliente.id}\n")
+        body.text(f"Cedula: {cliente.cedula or 'N/A'}\n")
+        body.text(f"Nombre: {cliente.nombre or 'N/A'}\n")
+
+        # Información de ubicación (torre y apartamento)
+        if cliente.torre and cliente.apartamento:
+            body.text(f"Ubicacion: Torre {cliente.torre} - Apt {cliente.apartamento}\n")
+        elif cliente.torre:
+            body.text(f"Torre: {cliente.torre}\n")
+        elif cliente.apartamento:
+            body.text(f"Apartamento: {cliente.apartamento}\n")
+
+        body.text(f"Vehiculo: {cliente.get_tipo_vehiculo_display()}\n")
+        body.text(f"Matricula: {cliente.matricula}\n")
+
+        if cliente.fecha_entrada:
+            body.text(f"Entrada: {_bogota(cliente.fecha_entrada).strftime('%d/%m/%Y %H:%M')}\n")
+
+        body.text('\n')
+
+        # Código QR con el id del cliente (lo que lee el lector de salida)
+        if self.config.get('showQr', True):
+            try:
+                body.set(align='center')
+                if qr_mode == 'RASTER':
+                    body._raw(qr_raster(str(cliente.id), self.qr_size))
+                else:
+                    body.qr(str(cliente.id), size=self.qr_module_size, native=True)
+                body.text('\n')
+            except Exception as qr_error:
+                # En caso de error, no imprimir nada para mantener el QR limpio
+                logger.warning(f"Error procesando QR: {qr_error}")
+
+        return self.header + body.output + self.footer
+
+
+@lru_cache(maxsize=256)
+def qr_raster(payload, size):
+    """
+    Bytes ESC/POS del QR como imagen de 1 bit, para impresoras sin QR nativo.
+
+    Se genera directamente en blanco y negro al tamaño de módulo entero más
+    cercano (sin reescalar ni convertir a RGB) y se guarda en un LRU para que
+    las reimpresiones no vuelvan a rasterizar.
+    """
+    imagen = imagen_qr(payload, border=2, lado=size)
+
+    raster = Dummy()
+    raster.image(imagen)
+    return raster.output
+
+
+def compile_template(design_config):
+    """Genera las partes estáticas del ticket para un diseño"""
+    config = {**DEFAULT_DESIGN, **(design_config or {})}
+
+    header = Dummy()
+    # Configurar codificación
+    header.charcode('CP437')
+    if config.get('showLogo', True):
+        header.set(align='center', bold=True, double_width=True, double_height=True)
+        for line in config.get('headerText', 'SISTEMA DE PARKING').split('\n'):
+            header.text(line + '\n')
+        header.text('=' * 32 + '\n')
+        header.text('\n')
+
+    footer = Dummy()
+    footer.charcode('CP437')
+    if config.get('showFooter', True):
+        footer.set(align='center', bold=False)
+        footer.text('-' * 32 + '\n')
+        for line in config.get('footerText', 'Gracias por su visita').split('\n'):
+            footer.text(line + '\n')
+    # Cortar papel
+    footer.text('\n' * 3)
+    footer.cut()
+
+    return TicketTemplate(config=config, header=header.output, footer=footer.output)
+
+
+def load_design_config():
+    """Carga la configuración de diseño desde BD o cache"""
+    try:
+        from .models import TicketDesignConfiguration
+
+        active_config = TicketDesignConfiguration.objects.filter(is_active=True).first()
+        if active_config:
+            logger.info(f"Configuración cargada desde BD: {active_config.name}")
+            return active_config.to_dict()
+
+        # Fallback al cache
+        config = cache.get('printer_design_config', {})
+        if config:
+            logger.info("Configuración cargada desde cache")
+        else:
+            logger.info("Usando configuración por defecto")
+        return config
+
+    except Exception as e:
+        logger.warning(f"Error cargando configuración de diseño: {e}, usando por defecto")
+        return {}
+
+
+def _version_diseno():
+    """Id y fecha de actualización del diseño activo (None si no hay)"""
+    from .models import TicketDesignConfiguration
+
+    return TicketDesignConfiguration.objects.filter(is_active=True).values_list('id', 'updated_at').first()
+
+
+def get_ticket_template():
+    """Devuelve la plantilla del diseño activo (memoria local -> cache -> BD)"""
+    global _template_local, _template_local_expira
+
+    ahora = time.monotonic()
+    if _template_local is not None and ahora < _template_local_expira:
+        return _template_local
+
+    version = _version_diseno()
+    guardado = cache.get(CACHE_KEY)
+    if guardado is None or guardado[0] != version:
+        guardado = (version, compile_template(load_design_config()))
+        cache.set(CACHE_KEY, guardado, None)
+
+    _template_local = guardado[1]
+    _template_local_expira = ahora + LOCAL_TTL
+    return _template_local
+
+
+def invalidate_ticket_template():
+    """Descarta la plantilla local y la compartida para recompilarla en el próximo ticket"""
+    global _template_local, _template_local_expira
+
+    _template_local = None
+    _template_local_expira = 0.0
+    cache.delete(CACHE_KEY)
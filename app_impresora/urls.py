@@ -12,6 +12,7 @@ urlpatterns = [
     path('status/', views.printer_status, name='printer_status'),
     path('jobs/', views.print_jobs_list, name='print_jobs_list'),
     path('jobs/retry/<int:job_id>/', views.retry_print_job, name='retry_print_job'),
+    path('jobs/<int:job_id>/status/', views.print_job_status, name='print_job_status'),
     path('print/<int:client_id>/', views.print_client_qr, name='print_client_qr'),
     path('delete/', views.delete_printer, name='delete_printer'),
     path('toggle/', views.toggle_printer_status, name='toggle_printer_status'),
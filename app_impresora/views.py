@@ -21,7 +21,7 @@ def printer_dashboard(request):
     printers = PrinterConfiguration.objects.all()
     recent_jobs = PrintJob.objects.select_related('printer').order_by('-created_at')[:10]
     printer_status = printer_service.get_printer_status()
-    simulation_mode = cache.get('printer_simulation_mode', True)
+    simulation_mode = printer_service.simulation_mode
     
     context = {
         'printers': printers,
@@ -186,11 +186,8 @@ def toggle_simulation(request):
             data = json.loads(request.body)
             enable = data.get('enable', True)
             
-            # Actualizar cache
-            cache.set('printer_simulation_mode', enable, 86400)
-            
-            # Recargar servicio
-            printer_service.reload_simulation_mode()
+            # En la base de datos, para que lo vea también el worker de impresión
+            printer_service.enable_simulation_mode(enable)
             
             return JsonResponse({
                 'success': True,
@@ -228,28 +225,52 @@ def test_printer(request):
     
     return HttpResponse('Método no permitido', status=405)
 
+def _print_job_data(print_job):
+    """Datos de un trabajo de impresión para las respuestas JSON"""
+    return {
+        'id': print_job.id,
+        'client_id': print_job.client_id,
+        'status': print_job.status,
+        'status_display': print_job.get_status_display(),
+        'error_message': print_job.error_message,
+        'created_at': print_job.created_at.isoformat() if print_job.created_at else None,
+        'completed_at': print_job.completed_at.isoformat() if print_job.completed_at else None,
+    }
+
+def _enqueue_response(print_job, success_message, error_message):
+    """Respuesta JSON al encolar un ticket (el trabajo puede seguir pendiente)"""
+    if print_job is None:
+        return JsonResponse({'success': False, 'message': 'No hay impresora configurada'})
+    success = print_job.status != 'FAILED'
+    return JsonResponse({
+        'success': success,
+        'message': success_message if success else error_message,
+        'job': _print_job_data(print_job),
+    })
+
+@login_required
+def print_job_status(request, job_id):
+    """Estado de un trabajo de impresión, para consultar desde el navegador tras encolarlo"""
+    print_job = get_object_or_404(PrintJob, id=job_id)
+    return JsonResponse({
+        'success': True,
+        'job': _print_job_data(print_job),
+    })
+
 @login_required
 def print_client_qr(request, client_id):
     """Imprime el código QR de un cliente específico"""
     try:
         cliente = get_object_or_404(Cliente, id=client_id)
         
-        # Verificar que el cliente tenga QR generado
-        if not cliente.qr_image:
-            # Intentar generar el QR limpio si no existe
-            cliente.generate_clean_qr()
-            cliente.save()
-        
-        success = printer_service.print_qr_ticket(cliente)
+        print_job = printer_service.enqueue_qr_ticket(cliente)
+        success = print_job is not None and print_job.status != 'FAILED'
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({
-                'success': success,
-                'message': 'Ticket impreso exitosamente' if success else 'Error al imprimir ticket'
-            })
+            return _enqueue_response(print_job, 'Ticket enviado a la impresora', 'Error al imprimir ticket')
         
         if success:
-            messages.success(request, f'Ticket impreso para {cliente.get_display_name()}')
+            messages.success(request, f'Ticket enviado a la impresora para {cliente.get_display_name()}')
         else:
             messages.error(request, 'Error al imprimir el ticket')
             
@@ -352,7 +373,8 @@ def delete_printer(request):
                 # Eliminar trabajos asociados automáticamente
                 PrintJob.objects.filter(printer=printer).delete()
             
-            # Eliminar la impresora
+            # Eliminar la impresora (cerrando su conexión persistente)
+            printer_service.connections.close(printer.id)
             printer.delete()
             logger.info(f"Printer {printer_name} deleted successfully")
             
@@ -579,12 +601,9 @@ def auto_print_qr(request):
                 })
             
             cliente = get_object_or_404(Cliente, id=client_id)
-            success = printer_service.print_qr_ticket(cliente)
+            print_job = printer_service.enqueue_qr_ticket(cliente)
             
-            return JsonResponse({
-                'success': success,
-                'message': 'Ticket impreso automáticamente' if success else 'Error en impresión automática'
-            })
+            return _enqueue_response(print_job, 'Ticket enviado a la impresora', 'Error en impresión automática')
             
         except Exception as e:
             logger.error(f"Error en impresión automática: {e}")
@@ -658,13 +677,10 @@ def retry_print_job(request, job_id):
                     'message': 'Cliente no encontrado'
                 })
             
-            # Intentar imprimir nuevamente
-            success = printer_service.print_qr_ticket(cliente)
+            # Encolar un nuevo trabajo para el mismo cliente
+            print_job = printer_service.enqueue_qr_ticket(cliente)
             
-            return JsonResponse({
-                'success': success,
-                'message': 'Ticket reenviado a impresora' if success else 'Error al reintentar impresión'
-            })
+            return _enqueue_response(print_job, 'Ticket reenviado a impresora', 'Error al reintentar impresión')
             
         except Exception as e:
             logger.error(f"Error retrying print job {job_id}: {e}")
@@ -1,11 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Cliente, Perfil, Costo, TarifaPlena, Recaudacion
+from .models import Cliente, Perfil, Costo, TarifaPlena, Recaudacion, RecaudacionDetalle, CapacidadParqueadero
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
-	list_display = ('cedula', 'nombre', 'telefono', 'torre', 'apartamento', 'matricula', 'tipo_vehiculo', 'tiempo_parking', 'fecha_entrada', 'fecha_salida')
+	list_display = ('cedula', 'nombre', 'telefono', 'torre', 'apartamento', 'matricula', 'tipo_vehiculo', 'tiempo_parking', 'fecha_entrada', 'fecha_salida', 'monto_cobrado')
 	search_fields = ('cedula', 'nombre', 'matricula', 'telefono', 'torre', 'apartamento')
 	list_filter = ('tipo_vehiculo',)
 
@@ -99,8 +99,42 @@ class TarifaPlenaAdmin(admin.ModelAdmin):
 		qs = super().get_queryset(request)
 		return qs.filter(id=1)  # Solo el registro principal
 
+@admin.register(CapacidadParqueadero)
+class CapacidadParqueaderoAdmin(admin.ModelAdmin):
+	list_display = ('tipo_vehiculo', 'capacidad', 'ocupados', 'fecha_actualizacion')
+	readonly_fields = ('ocupados', 'fecha_actualizacion')
+	actions = ['sincronizar_ocupacion']
+	
+	def has_change_permission(self, request, obj=None):
+		"""Solo administradores pueden modificar la capacidad"""
+		if request.user.is_superuser:
+			return True
+		
+		try:
+			perfil = request.user.perfil
+			return perfil.puede_editar_costos()
+		except:
+			return False
+	
+	@admin.action(description='Recalcular ocupación desde los vehículos activos')
+	def sincronizar_ocupacion(self, request, queryset):
+		CapacidadParqueadero.sincronizar()
+		self.message_user(request, 'Ocupación recalculada correctamente.')
+
+class RecaudacionDetalleInline(admin.TabularInline):
+	model = RecaudacionDetalle
+	fields = ('nombre', 'cedula', 'matricula', 'tipo_vehiculo', 'fecha_entrada', 'fecha_salida', 'tiempo_parking', 'costo', 'tarifa_plena')
+	readonly_fields = fields
+	extra = 0
+	can_delete = False
+	
+	def has_add_permission(self, request, obj=None):
+		"""El detalle lo guarda el corte, no se edita"""
+		return False
+
 @admin.register(Recaudacion)
 class RecaudacionAdmin(admin.ModelAdmin):
+	inlines = [RecaudacionDetalleInline]
 	list_display = ('id', 'monto_recaudado', 'numero_clientes', 'fecha_corte', 'usuario', 'fecha_inicio', 'fecha_fin')
 	list_filter = ('fecha_corte', 'usuario')
 	search_fields = ('usuario__username', 'usuario__first_name', 'usuario__last_name')
@@ -0,0 +1,225 @@
+"""
+Índice de búsqueda de clientes y visitantes.
+
+Las listas buscaban con un ``icontains`` por columna unidos con OR, lo que
+recorre toda la tabla en cada tecla. ``buscar`` filtra con un índice:
+
+- SQLite: una tabla virtual FTS5 con el tokenizador ``trigram`` por modelo
+  (``app_page_cliente_fts``, ``app_page_visitante_fts``). El trigram busca
+  subcadenas sin distinguir mayúsculas, igual que ``icontains``. La tabla
+  lee el contenido de la tabla del modelo y la mantienen al día triggers de
+  INSERT/UPDATE/DELETE, así que también cubren ``update()`` y ``bulk_create``.
+- PostgreSQL: índices GIN ``gin_trgm_ops`` sobre ``UPPER(columna)``, la
+  expresión que genera ``icontains``, de modo que el mismo filtro usa el
+  índice.
+
+Los textos de menos de tres caracteres no forman un trigrama y se buscan con
+``icontains`` (igual que cualquier base sin índice de búsqueda).
+
+``instalar`` crea las tablas, triggers e índices que falten. Lo llaman la
+migración y ``post_migrate``: SQLite borra los triggers cuando Django
+reconstruye la tabla de un modelo al alterarla, y así se recrean (y el
+índice se reconstruye) en el siguiente ``migrate``.
+"""
+
+import logging
+
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Columnas indexadas por modelo
+CAMPOS = {
+    'cliente': ('nombre', 'cedula', 'matricula', 'torre', 'apartamento', 'telefono'),
+    'visitante': ('nombre', 'cedula', 'torre', 'apartamento', 'telefono'),
+}
+
+# Peso de cada columna al ordenar por relevancia en SQLite (las demás valen 1)
+PESOS = {'matricula': 10.0, 'cedula': 10.0, 'nombre': 5.0}
+
+# Largo mínimo para buscar por trigramas
+MIN_CARACTERES = 3
+
+# Alias de BD con el índice instalado (se consulta una vez por proceso)
+_indice_disponible = {}
+
+
+def _tabla_fts(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def _sql_sqlite(model):
+    tabla = model._meta.db_table
+    fts = _tabla_fts(model)
+    campos = CAMPOS[model._meta.model_name]
+    columnas = ', '.join(campos)
+    nuevos = ', '.join(f'new.{campo}' for campo in campos)
+    viejos = ', '.join(f'old.{campo}' for campo in campos)
+    tabla_virtual = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columnas}, "
+        f"content='{tabla}', content_rowid='id', tokenize='trigram')"
+    )
+    triggers = {
+        f'{fts}_ai': (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END"
+        ),
+        f'{fts}_ad': (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); END"
+        ),
+        f'{fts}_au': (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columnas} ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); "
+            f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END"
+        ),
+    }
+    return fts, tabla_virtual, triggers
+
+
+def _modelos():
+    from .models import Cliente, Visitante
+    return (Cliente, Visitante)
+
+
+def instalar(connection):
+    """Crea lo que falte del índice de búsqueda en ``connection`` (idempotente)"""
+    _indice_disponible.pop(connection.alias, None)
+    try:
+        # Savepoint: en PostgreSQL un error no aborta la migración que lo llama
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'sqlite':
+                _instalar_sqlite(connection)
+            elif connection.vendor == 'postgresql':
+                _instalar_postgresql(connection)
+    except DatabaseError as e:
+        # Sin FTS5 o sin permiso para pg_trgm la búsqueda sigue con icontains
+        logger.warning(f"Índice de búsqueda no disponible en '{connection.alias}': {e}")
+
+
+def _instalar_sqlite(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        for model in _modelos():
+            fts, tabla_virtual, triggers = _sql_sqlite(model)
+            if model._meta.db_table not in existentes:
+                # Migración hacia atrás: la tabla del modelo todavía no existe
+                continue
+            if fts in existentes and all(nombre in existentes for nombre in triggers):
+                continue
+            cursor.execute(tabla_virtual)
+            for sql in triggers.values():
+                cursor.execute(sql)
+            # Tabla nueva o triggers perdidos: volver a leer la tabla del modelo
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            logger.info(f"Índice de búsqueda {fts} reconstruido")
+
+
+def _instalar_postgresql(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for model in _modelos():
+            tabla = model._meta.db_table
+            for campo in CAMPOS[model._meta.model_name]:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {tabla}_{campo}_trgm '
+                    f'ON {tabla} USING gin (UPPER({campo}::text) gin_trgm_ops)'
+                )
+
+
+def desinstalar(connection):
+    """Elimina el índice de búsqueda (reversa de la migración)"""
+    _indice_disponible.pop(connection.alias, None)
+    with connection.cursor() as cursor:
+        for model in _modelos():
+            if connection.vendor == 'sqlite':
+                fts, _, triggers = _sql_sqlite(model)
+                for nombre in triggers:
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {nombre}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif connection.vendor == 'postgresql':
+                tabla = model._meta.db_table
+                for campo in CAMPOS[model._meta.model_name]:
+                    cursor.execute(f'DROP INDEX IF EXISTS {tabla}_{campo}_trgm')
+
+
+def _disponible(connection):
+    if connection.alias not in _indice_disponible:
+        disponible = False
+        if connection.vendor == 'sqlite':
+            triggers = [nombre for model in _modelos() for nombre in _sql_sqlite(model)[2]]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                    f"AND name IN ({', '.join(['%s'] * len(triggers))})",
+                    triggers,
+                )
+                disponible = cursor.fetchone()[0] == len(triggers)
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                disponible = cursor.fetchone() is not None
+        _indice_disponible[connection.alias] = disponible
+    return _indice_disponible[connection.alias]
+
+
+def _frase_fts(texto, campos):
+    # Entre comillas el texto es una sola frase: con trigram equivale a una subcadena
+    frase = '"' + texto.replace('"', '""') + '"'
+    return f"{{{' '.join(campos)}}} : {frase}"
+
+
+def buscar(queryset, texto, campos=None, por_relevancia=False):
+    """
+    Filtra ``queryset`` (de Cliente o Visitante) a las filas que contienen ``texto``.
+
+    ``campos`` limita la búsqueda a esas columnas (por defecto todas las de
+    ``CAMPOS``). Con ``por_relevancia`` ordena primero las mejores coincidencias;
+    si no, respeta el orden del queryset.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+
+    model = queryset.model
+    campos = tuple(campos or CAMPOS[model._meta.model_name])
+    connection = connections[router.db_for_read(model)]
+
+    if len(texto) < MIN_CARACTERES or not _disponible(connection):
+        return _buscar_icontains(queryset, texto, campos)
+
+    if connection.vendor == 'sqlite':
+        fts = _tabla_fts(model)
+        consulta = _frase_fts(texto, campos)
+        queryset = queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [consulta])
+        )
+        if por_relevancia:
+            # bm25 devuelve valores más bajos para las mejores coincidencias
+            pesos = ', '.join(str(PESOS.get(campo, 1.0)) for campo in CAMPOS[model._meta.model_name])
+            queryset = queryset.annotate(relevancia=RawSQL(
+                f'SELECT -bm25({fts}, {pesos}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {model._meta.db_table}.id',
+                [consulta],
+            ))
+    else:
+        queryset = _buscar_icontains(queryset, texto, campos)
+        if por_relevancia:
+            similitudes = ', '.join(f'similarity(COALESCE({campo}, \'\'), %s)' for campo in campos)
+            queryset = queryset.annotate(relevancia=RawSQL(
+                f'GREATEST({similitudes})' if len(campos) > 1 else similitudes,
+                [texto] * len(campos),
+            ))
+
+    if por_relevancia:
+        queryset = queryset.order_by('-relevancia', *queryset.query.order_by)
+    return queryset
+
+
+def _buscar_icontains(queryset, texto, campos):
+    condicion = Q()
+    for campo in campos:
+        condicion |= Q(**{f'{campo}__icontains': texto})
+    return queryset.filter(condicion)
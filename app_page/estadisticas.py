@@ -0,0 +1,106 @@
+"""
+Contadores de la barra de navegación (clientes hoy, en parking, visitantes hoy).
+
+Los contadores viven en el cache de Django y se actualizan con ``incr``/``decr``
+en cada entrada, salida y registro de visitante, de modo que renderizar la
+barra no consulta la base de datos. Cada cierto tiempo se reconcilian con un
+``COUNT`` real para corregir cualquier desvío (registros borrados, cambios
+hechos desde el admin, procesos con cache propio, etc.).
+
+En producción con varios workers el cache debe ser compartido (Redis,
+Memcached o DatabaseCache); con LocMemCache cada proceso lleva su propia
+cuenta y solo se corrige en la reconciliación.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .fechas import rango_dia
+
+RECONCILIACION_SEGUNDOS = getattr(settings, 'ESTADISTICAS_RECONCILIACION_SEGUNDOS', 300)
+
+CLAVE_RECONCILIADO = 'navbar_estadisticas_reconciliado'
+CLAVE_EN_PARKING = 'navbar_clientes_en_parking'
+
+
+def _clave_clientes_hoy(fecha=None):
+    return f"navbar_clientes_hoy_{(fecha or timezone.localdate()).isoformat()}"
+
+
+def _clave_visitantes_hoy(fecha=None):
+    return f"navbar_visitantes_hoy_{(fecha or timezone.localdate()).isoformat()}"
+
+
+def reconciliar():
+    """Recalcula los contadores desde la base de datos y los guarda en cache"""
+    from .models import Cliente, Visitante
+
+    hoy = timezone.localdate()
+    inicio_dia, fin_dia = rango_dia(hoy)
+    valores = {
+        _clave_clientes_hoy(hoy): Cliente.objects.filter(
+            fecha_entrada__gte=inicio_dia, fecha_entrada__lt=fin_dia
+        ).count(),
+        CLAVE_EN_PARKING: Cliente.objects.filter(fecha_salida__isnull=True).count(),
+        _clave_visitantes_hoy(hoy): Visitante.objects.filter(
+            fecha_registro__gte=inicio_dia, fecha_registro__lt=fin_dia
+        ).count(),
+    }
+    # Las claves del día expiran solas al día siguiente
+    cache.set_many(valores, 60 * 60 * 48)
+    cache.set(CLAVE_RECONCILIADO, True, RECONCILIACION_SEGUNDOS)
+    return valores
+
+
+def get_estadisticas():
+    """Devuelve los contadores de la barra de navegación sin consultar la BD en estado estable"""
+    claves = [_clave_clientes_hoy(), CLAVE_EN_PARKING, _clave_visitantes_hoy(), CLAVE_RECONCILIADO]
+    valores = cache.get_many(claves)
+    if len(valores) < len(claves):
+        valores = reconciliar()
+
+    return {
+        'clientes_hoy': valores[claves[0]],
+        'clientes_en_parking': valores[claves[1]],
+        'visitantes_hoy': valores[claves[2]],
+    }
+
+
+def _sumar(clave, delta):
+    """Suma ``delta`` al contador; si no existe se deja para la próxima reconciliación"""
+    try:
+        cache.incr(clave, delta)
+    except ValueError:
+        pass
+
+
+def _es_hoy(fecha):
+    return fecha is not None and timezone.localdate(fecha) == timezone.localdate()
+
+
+def contar_entrada(cliente):
+    """Un cliente nuevo entra al parking"""
+    if _es_hoy(cliente.fecha_entrada):
+        _sumar(_clave_clientes_hoy(), 1)
+    if cliente.fecha_salida is None:
+        _sumar(CLAVE_EN_PARKING, 1)
+
+
+def contar_salida():
+    """Un cliente activo registra su salida"""
+    _sumar(CLAVE_EN_PARKING, -1)
+
+
+def descontar_cliente(cliente):
+    """Un cliente fue eliminado"""
+    if _es_hoy(cliente.fecha_entrada):
+        _sumar(_clave_clientes_hoy(), -1)
+    if cliente.fecha_salida is None:
+        _sumar(CLAVE_EN_PARKING, -1)
+
+
+def contar_visitante(visitante, delta=1):
+    """Un visitante se registra (o se elimina con ``delta=-1``)"""
+    if _es_hoy(visitante.fecha_registro):
+        _sumar(_clave_visitantes_hoy(), delta)
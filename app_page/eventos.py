@@ -0,0 +1,192 @@
+"""
+Eventos en vivo para las porterías y el panel de administración.
+
+Cada entrada, salida, cambio de tarifa plena o liberación de cupo se publica
+como un evento numerado en el cache de Django. La vista ``eventos_parking``
+(Server-Sent Events, servida por ASGI) lee los eventos con número mayor al
+último entregado y los envía a los navegadores conectados, así varias
+porterías quedan sincronizadas sin recargar la lista completa.
+
+Igual que los contadores de ``estadisticas``, con varios workers el cache
+debe ser compartido (Redis, Memcached o DatabaseCache).
+
+El stream necesita un servidor ASGI (``parking_site/asgi.py``): con WSGI
+Django consume el generador asíncrono completo antes de enviar nada, así
+que cada pestaña ocuparía un worker durante ``DURACION_MAXIMA`` sin recibir
+eventos. Por eso las páginas solo abren la conexión si ``disponibles``.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+
+CLAVE_SECUENCIA = 'eventos_parking_secuencia'
+
+# Segundos que se conserva cada evento (cubre la reconexión de un cliente)
+TTL_EVENTO = getattr(settings, 'EVENTOS_TTL', 300)
+
+# Cada cuánto la conexión revisa si hay eventos nuevos
+INTERVALO = getattr(settings, 'EVENTOS_INTERVALO', 1.0)
+
+# Comentario de keep-alive para proxies que cortan conexiones inactivas
+INTERVALO_PING = getattr(settings, 'EVENTOS_INTERVALO_PING', 15)
+
+# Duración máxima de una conexión; el navegador reconecta solo con Last-Event-ID
+DURACION_MAXIMA = getattr(settings, 'EVENTOS_DURACION_MAXIMA', 300)
+
+# Eventos como máximo por lectura (un cliente muy atrasado recibe los más recientes)
+MAXIMO_POR_LECTURA = 100
+
+
+def disponibles(request):
+    """Si ``request`` puede recibir eventos en vivo: servida por ASGI, o forzado con ``EVENTOS_EN_VIVO``"""
+    activos = getattr(settings, 'EVENTOS_EN_VIVO', None)
+    if activos is None:
+        return isinstance(request, ASGIRequest)
+    return activos
+
+
+def _clave_evento(numero):
+    return f"eventos_parking_{numero}"
+
+
+def publicar(tipo, datos):
+    """Publica un evento para todas las conexiones abiertas y devuelve su número"""
+    try:
+        numero = cache.incr(CLAVE_SECUENCIA)
+    except ValueError:
+        cache.add(CLAVE_SECUENCIA, 0, None)
+        numero = cache.incr(CLAVE_SECUENCIA)
+    cache.set(_clave_evento(numero), {'tipo': tipo, 'datos': datos}, TTL_EVENTO)
+    return numero
+
+
+def ultimo_numero():
+    """Número del último evento publicado (0 si todavía no hay eventos)"""
+    return cache.get(CLAVE_SECUENCIA) or 0
+
+
+class Lectura:
+    """
+    Posición de una conexión en la secuencia de eventos.
+
+    ``publicar`` toma el número con ``incr`` antes de escribir el evento, así
+    que una lectura puede ver un número cuyo evento todavía no está en el
+    cache. ``ultimo`` solo avanza hasta el último número contiguo leído y los
+    huecos se vuelven a pedir en cada lectura hasta que pasa ``TTL_EVENTO``
+    (el evento ya no puede aparecer). Los eventos posteriores a un hueco se
+    entregan sin esperarlo y se recuerdan para no repetirlos.
+    """
+
+    def __init__(self, ultimo):
+        self.ultimo = ultimo
+        self.huecos = {}
+        self.entregados = set()
+
+    def leer(self):
+        """Devuelve [(número, evento)] publicados y no entregados todavía a esta conexión"""
+        actual = ultimo_numero()
+        if actual < self.ultimo:
+            # La secuencia se reinició (cache vaciado): se vuelve a empezar
+            self.ultimo, self.huecos, self.entregados = actual, {}, set()
+            return []
+        if actual - MAXIMO_POR_LECTURA > self.ultimo:
+            # Cliente muy atrasado: recibe solo los más recientes
+            self._avanzar_hasta(actual - MAXIMO_POR_LECTURA)
+        numeros = [numero for numero in range(self.ultimo + 1, actual + 1) if numero not in self.entregados]
+        encontrados = cache.get_many([_clave_evento(numero) for numero in numeros])
+        ahora = time.monotonic()
+        eventos = []
+        for numero in numeros:
+            evento = encontrados.get(_clave_evento(numero))
+            if evento is not None:
+                eventos.append((numero, evento))
+                self.entregados.add(numero)
+                self.huecos.pop(numero, None)
+            elif ahora - self.huecos.setdefault(numero, ahora) >= TTL_EVENTO:
+                # No se escribió o ya expiró: se da por perdido
+                del self.huecos[numero]
+                self.entregados.add(numero)
+        siguiente = self.ultimo
+        while siguiente + 1 in self.entregados:
+            siguiente += 1
+        self._avanzar_hasta(siguiente)
+        return eventos
+
+    def _avanzar_hasta(self, numero):
+        self.ultimo = numero
+        self.entregados = {entregado for entregado in self.entregados if entregado > numero}
+        self.huecos = {hueco: visto for hueco, visto in self.huecos.items() if hueco > numero}
+
+
+def formatear_sse(numero, evento):
+    """Serializa un evento con el formato de Server-Sent Events"""
+    datos = json.dumps(evento['datos'], default=str)
+    return f"id: {numero}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+async def transmitir(ultimo):
+    """Generador asíncrono con los eventos posteriores a ``ultimo`` para una conexión SSE"""
+    yield f"retry: {int(INTERVALO * 3000)}\n\n"
+    lectura = Lectura(ultimo)
+    inicio = ultimo_ping = time.monotonic()
+    while time.monotonic() - inicio < DURACION_MAXIMA:
+        # El cache puede ser de red (Redis/Memcached): no bloquear el event loop
+        eventos = await sync_to_async(lectura.leer, thread_sensitive=False)()
+        for numero, evento in eventos:
+            yield formatear_sse(numero, evento)
+        ahora = time.monotonic()
+        if eventos:
+            ultimo_ping = ahora
+        elif ahora - ultimo_ping >= INTERVALO_PING:
+            ultimo_ping = ahora
+            yield ": ping\n\n"
+        await asyncio.sleep(INTERVALO)
+
+
+# --- Eventos del parking ---
+
+def _datos_cliente(cliente):
+    return {
+        'id': cliente.id,
+        'matricula': cliente.matricula,
+        'tipo_vehiculo': cliente.tipo_vehiculo,
+        'fecha_entrada': cliente.fecha_entrada.isoformat() if cliente.fecha_entrada else None,
+    }
+
+
+def publicar_entrada(cliente):
+    """Un vehículo entra: ocupa un cupo de su tipo"""
+    publicar('entrada', {
+        **_datos_cliente(cliente),
+        'ocupacion': {'tipo_vehiculo': cliente.tipo_vehiculo, 'delta': 1},
+    })
+
+
+def publicar_salida(cliente):
+    """Un vehículo sale: libera un cupo de su tipo"""
+    publicar('salida', {
+        **_datos_cliente(cliente),
+        'fecha_salida': cliente.fecha_salida.isoformat() if cliente.fecha_salida else None,
+        'monto_cobrado': cliente.monto_cobrado,
+        'ocupacion': {'tipo_vehiculo': cliente.tipo_vehiculo, 'delta': -1},
+    })
+
+
+def publicar_ocupacion(tipo_vehiculo, delta):
+    """Cambio de ocupación sin entrada/salida (p. ej. un cliente activo eliminado)"""
+    publicar('ocupacion', {'tipo_vehiculo': tipo_vehiculo, 'delta': delta})
+
+
+def publicar_tarifa_plena(tarifa_plena):
+    """La tarifa plena se activó o desactivó"""
+    publicar('tarifa_plena', {
+        'activa': tarifa_plena.activa,
+        'costo_fijo_auto': tarifa_plena.costo_fijo_auto,
+        'costo_fijo_moto': tarifa_plena.costo_fijo_moto,
+    })
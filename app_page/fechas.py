@@ -0,0 +1,14 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+
+def rango_dia(fecha=None):
+    """Devuelve (inicio, fin) del día local como datetimes aware.
+
+    Filtrar con ``campo__gte=inicio, campo__lt=fin`` en lugar de ``campo__date=fecha``
+    permite que la base de datos use el índice del campo.
+    """
+    fecha = fecha or timezone.localdate()
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+    return inicio, fin
@@ -0,0 +1,110 @@
+"""
+Textos de tiempo y costo de los clientes.
+
+Las mismas funciones las usan los métodos de ``Cliente`` (plantillas y
+reportes) y ``fila_cliente``, que arma las filas de ``/api/clientes/``. La
+fila calcula el tiempo y el costo una sola vez, con la hora y el snapshot de
+tarifas que recibe, en lugar de que cada método los vuelva a calcular.
+"""
+
+from django.utils import timezone
+
+from .tarifas import formatear_costo
+
+# Columnas que necesita una fila de la lista (qr_image y el resto no se leen)
+CAMPOS_FILA_CLIENTE = (
+    'id', 'cedula', 'nombre', 'telefono', 'torre', 'apartamento', 'matricula', 'tipo_vehiculo',
+    'fecha_entrada', 'fecha_salida', 'monto_cobrado', 'tarifa_plena_aplicada',
+)
+
+
+def tiempo_corto(segundos):
+    """Duración compacta: '2h 5m', '3h', '45m' o '< 1m'"""
+    horas = segundos // 3600
+    minutos = (segundos % 3600) // 60
+    if horas > 0:
+        return f"{horas}h {minutos}m" if minutos > 0 else f"{horas}h"
+    if minutos > 0:
+        return f"{minutos}m"
+    return "< 1m"
+
+
+def tiempo_largo(segundos):
+    """Duración en palabras: '1 día, 2 horas, 5 minutos'"""
+    dias = segundos // 86400
+    horas = (segundos % 86400) // 3600
+    minutos = (segundos % 3600) // 60
+
+    partes = []
+    if dias > 0:
+        partes.append(f"{dias} día{'s' if dias != 1 else ''}")
+    if horas > 0:
+        partes.append(f"{horas} hora{'s' if horas != 1 else ''}")
+    if minutos > 0:
+        partes.append(f"{minutos} minuto{'s' if minutos != 1 else ''}")
+
+    if not partes:
+        return "Menos de 1 minuto"
+    return ", ".join(partes)
+
+
+def relacion_tiempo_costo(minutos, costo):
+    """Minutos por peso ('2.5 min/$') o pesos por minuto ('$150/min') si es menos de uno"""
+    if costo == 0 or minutos == 0:
+        return "0 min/$"
+    relacion = minutos / costo
+    if relacion >= 1:
+        return f"{relacion:.1f} min/$"
+    return f"${1 / relacion:.0f}/min"
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else ''
+
+
+def fila_cliente(cliente, ahora, tarifas, con_costos=False):
+    """Fila de la lista de clientes con todos los campos derivados ya calculados"""
+    fila = {
+        'id': cliente.id,
+        'cedula': cliente.cedula or '',
+        'nombre': cliente.nombre or '',
+        'telefono': cliente.telefono or '',
+        'torre': cliente.get_display_torre(),
+        'apartamento': cliente.get_display_apartamento(),
+        'matricula': cliente.matricula,
+        'tipo_vehiculo': cliente.get_tipo_vehiculo_display(),
+        'fecha_entrada': _fecha(cliente.fecha_entrada),
+        'fecha_entrada_iso': cliente.fecha_entrada.isoformat() if cliente.fecha_entrada else None,
+        'fecha_salida': _fecha(cliente.fecha_salida),
+        'en_parking': cliente.fecha_salida is None,
+    }
+
+    if cliente.fecha_entrada:
+        segundos = int(((cliente.fecha_salida or ahora) - cliente.fecha_entrada).total_seconds())
+        fila['tiempo_formateado'] = tiempo_corto(segundos)
+        fila['tiempo_detallado'] = tiempo_largo(segundos)
+    else:
+        segundos = 0
+        fila['tiempo_formateado'] = 'Sin entrada'
+        fila['tiempo_detallado'] = 'Sin fecha de entrada'
+
+    if con_costos:
+        # Mismo cálculo que Cliente.calcular_costo / es_tarifa_plena con la hora de la petición
+        minutos = segundos // 60
+        if cliente.monto_cobrado is not None:
+            costo = float(cliente.monto_cobrado)
+        elif cliente.fecha_entrada:
+            costo = tarifas.calcular(cliente.tipo_vehiculo, minutos)
+        else:
+            costo = 0.0
+        tarifa_plena = cliente.tarifa_plena_aplicada
+        if tarifa_plena is None:
+            tarifa_plena = tarifas.tarifa_plena_activa
+        fila['costo_formateado'] = formatear_costo(costo, tarifa_plena)
+        if cliente.fecha_entrada:
+            relacion = relacion_tiempo_costo(minutos, costo)
+            fila['tiempo_por_costo_formateado'] = relacion
+            fila['tarifa_completa'] = f"${costo:,.0f} ({relacion})"
+        else:
+            fila['tiempo_por_costo_formateado'] = fila['tarifa_completa'] = 'Sin entrada'
+    return fila
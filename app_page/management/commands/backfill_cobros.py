@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app_page.models import Cliente
+from app_page.tarifas import get_tarifas
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda monto_cobrado, minutos_cobrados y tarifa aplicada en los clientes con salida '
+        'que aún no los tienen. Se usan las tarifas vigentes, ya que las históricas no se conservaron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de clientes actualizados por lote (por defecto 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta los clientes pendientes sin modificarlos',
+        )
+
+    def handle(self, *args, **options):
+        pendientes = Cliente.objects.filter(
+            fecha_salida__isnull=False,
+            monto_cobrado__isnull=True,
+        ).order_by('id')
+        total = pendientes.count()
+
+        if options['dry_run']:
+            self.stdout.write(f"{total} clientes con salida sin cobro registrado.")
+            return
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('No hay clientes pendientes de backfill.'))
+            return
+
+        batch_size = options['batch_size']
+        tarifas = get_tarifas()
+        campos = ['monto_cobrado', 'minutos_cobrados', 'tarifa_aplicada', 'tarifa_plena_aplicada']
+        columnas = ['id', 'tipo_vehiculo', 'fecha_entrada', 'fecha_salida']
+        actualizados = 0
+        ultimo_id = 0
+
+        self.stdout.write(f"Registrando cobro de {total} clientes en lotes de {batch_size}...")
+
+        # Paginación por id para no depender de OFFSET mientras se actualiza la tabla
+        while True:
+            lote = list(pendientes.filter(id__gt=ultimo_id).only(*columnas)[:batch_size])
+            if not lote:
+                break
+
+            for cliente in lote:
+                cliente.calcular_cobro(tarifas)
+
+            with transaction.atomic():
+                Cliente.objects.bulk_update(lote, campos)
+
+            actualizados += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"  {actualizados}/{total}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Proceso completado: {actualizados} clientes actualizados')
+        )
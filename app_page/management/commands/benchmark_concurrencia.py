@@ -0,0 +1,178 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.utils import timezone
+from app_page import salidas
+from app_page.models import CapacidadParqueadero, Cliente, Recaudacion
+
+# Conexión sin el perfil de settings.DATABASES: journal clásico, transacciones
+# DEFERRED y el timeout por defecto de sqlite3 (5 s)
+OPCIONES_BASICAS = {'init_command': 'PRAGMA journal_mode=DELETE'}
+
+OPERACIONES = ('entrada', 'salida', 'lectura', 'corte')
+
+# Un lector hace un corte de recaudación (lee y luego escribe) cada tantas lecturas
+LECTURAS_POR_CORTE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula N porterías registrando entradas y salidas mientras otros usuarios consultan '
+        'la recaudación y la lista de vehículos y hacen cortes, y mide operaciones por segundo, latencias y '
+        'errores "database is locked" con el perfil de SQLite de settings y con el básico. '
+        'Usa una base SQLite temporal creada con migrate, no la del proyecto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--porterias',
+            type=int,
+            default=4,
+            help='Hilos que registran entradas y salidas (por defecto 4)',
+        )
+        parser.add_argument(
+            '--lectores',
+            type=int,
+            default=2,
+            help='Hilos que consultan recaudación y la lista (por defecto 2)',
+        )
+        parser.add_argument(
+            '--segundos',
+            type=float,
+            default=10,
+            help='Duración de cada medición (por defecto 10)',
+        )
+        parser.add_argument(
+            '--perfil',
+            choices=['produccion', 'basico', 'ambos'],
+            default='ambos',
+            help='Perfil de conexión a medir (por defecto ambos)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este benchmark mide la configuración de SQLite.')
+
+        perfiles = ['basico', 'produccion'] if options['perfil'] == 'ambos' else [options['perfil']]
+        # Las conexiones de cada hilo se crean a partir de este diccionario
+        configuracion = connections.settings['default']
+        original = dict(configuracion)
+        with tempfile.TemporaryDirectory() as directorio:
+            try:
+                for perfil in perfiles:
+                    connections.close_all()
+                    configuracion['NAME'] = os.path.join(directorio, f'{perfil}.sqlite3')
+                    configuracion['OPTIONS'] = OPCIONES_BASICAS if perfil == 'basico' else original.get('OPTIONS', {})
+                    self._preparar()
+                    self._medir(perfil, options)
+            finally:
+                connections.close_all()
+                configuracion.clear()
+                configuracion.update(original)
+
+    def _preparar(self):
+        call_command('migrate', verbosity=0)
+        # Sin límite de cupos: se mide la base de datos, no la ocupación
+        CapacidadParqueadero.objects.update(capacidad=None)
+        User.objects.create_user(username='benchmark')
+        modo = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+        self.stdout.write(f"\nBase temporal lista (journal_mode={modo})")
+        connections.close_all()
+
+    def _medir(self, perfil, options):
+        latencias = {operacion: [] for operacion in OPERACIONES}
+        errores = {operacion: 0 for operacion in OPERACIONES}
+        bloqueo = threading.Lock()
+        barrera = threading.Barrier(options['porterias'] + options['lectores'])
+        fin = []
+
+        def medir(operacion, funcion):
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion()
+            except OperationalError:
+                with bloqueo:
+                    errores[operacion] += 1
+                return None
+            with bloqueo:
+                latencias[operacion].append(time.perf_counter() - inicio)
+            return resultado
+
+        def entrada(numero, i):
+            with transaction.atomic():
+                CapacidadParqueadero.ocupar('Auto')
+                return Cliente.objects.create(
+                    matricula=f'P{numero}-{i}',
+                    tipo_vehiculo='Auto',
+                    fecha_entrada=timezone.now(),
+                )
+
+        def porteria(numero):
+            en_parking = []
+            i = 0
+            try:
+                barrera.wait()
+                while not fin:
+                    # Cada portería mantiene unos pocos vehículos adentro y alterna entrada y salida
+                    if len(en_parking) < 3 or i % 2 == 0:
+                        cliente = medir('entrada', lambda: entrada(numero, i))
+                        if cliente is not None:
+                            en_parking.append(cliente)
+                    else:
+                        cliente = en_parking.pop(0)
+                        medir('salida', lambda: salidas.confirmar_salida(cliente))
+                    i += 1
+            finally:
+                connections.close_all()
+
+        def lector():
+            usuario = User.objects.get(username='benchmark')
+            i = 0
+            try:
+                barrera.wait()
+                while not fin:
+                    medir('lectura', lambda: (
+                        Recaudacion.calcular_recaudacion_actual(),
+                        list(Cliente.objects.filter(fecha_salida__isnull=True).order_by('-fecha_entrada')[:10]),
+                    ))
+                    i += 1
+                    if i % LECTURAS_POR_CORTE == 0:
+                        medir('corte', lambda: Recaudacion.realizar_corte(usuario))
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=porteria, args=(n,)) for n in range(options['porterias'])]
+        hilos += [threading.Thread(target=lector) for _ in range(options['lectores'])]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(options['segundos'])
+        fin.append(True)
+        for hilo in hilos:
+            hilo.join()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"=== Perfil {perfil}: {options['porterias']} porterías, "
+            f"{options['lectores']} lectores, {options['segundos']:.0f} s ==="
+        ))
+        total = 0
+        for operacion in OPERACIONES:
+            tiempos = sorted(latencias[operacion])
+            total += len(tiempos)
+            if not tiempos:
+                self.stdout.write(f"{operacion:<8} sin operaciones completas, {errores[operacion]} errores")
+                continue
+            p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+            self.stdout.write(
+                f"{operacion:<8} {len(tiempos) / options['segundos']:8.1f} op/s  "
+                f"p50 {statistics.median(tiempos) * 1000:7.1f} ms  "
+                f"p95 {p95 * 1000:7.1f} ms  máx {tiempos[-1] * 1000:7.1f} ms  "
+                f"errores {errores[operacion]}"
+            )
+        self.stdout.write(f"Total    {total / options['segundos']:8.1f} op/s")
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app_page.models import Cliente
+from app_qr import render
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuántas imágenes de QR por segundo se generan con los diseños limpio y con datos, '
+        'con las fuentes y medidas cacheadas y recargándolas en cada imagen. No usa la base de datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iteraciones',
+            type=int,
+            default=500,
+            help='Imágenes generadas por medición (por defecto 500)',
+        )
+
+    def handle(self, *args, **options):
+        iteraciones = options['iteraciones']
+        # Cliente sin guardar: solo se usan sus atributos
+        cliente = Cliente(
+            id=123456,
+            matricula='ABC-123',
+            tipo_vehiculo='Auto',
+            torre='5',
+            apartamento='502',
+            fecha_entrada=timezone.now(),
+        )
+        lineas = render.lineas_cliente(cliente)
+
+        def limpio(i):
+            render.renderizar_png(str(cliente.id + i))
+
+        def con_datos(i):
+            render.renderizar_png(str(cliente.id + i), render.LAYOUT_CON_DATOS, lineas)
+
+        def con_datos_sin_cache(i):
+            # Equivalente al cálculo anterior: fuentes, medidas y lienzo en cada imagen
+            render.fuente.cache_clear()
+            render.ancho_texto.cache_clear()
+            render._lienzo.cache_clear()
+            con_datos(i)
+
+        self.stdout.write(f"{iteraciones} imágenes por medición")
+        for nombre, funcion in (
+            ('Limpio', limpio),
+            ('Con datos (cacheado)', con_datos),
+            ('Con datos (sin cache)', con_datos_sin_cache),
+        ):
+            funcion(0)  # calentar
+            inicio = time.perf_counter()
+            for i in range(iteraciones):
+                funcion(i)
+            duracion = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{nombre:<24} {iteraciones / duracion:8.0f} imágenes/s "
+                f"({duracion * 1000 / iteraciones:.2f} ms por imagen)"
+            )
@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from app_page.models import Cliente, Recaudacion
+
+
+class Rollback(Exception):
+    """Fuerza el rollback de los datos sintéticos del benchmark"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el tiempo de Recaudacion.calcular_recaudacion_actual con N clientes salidos. '
+        'Los datos se crean dentro de una transacción que se revierte al terminar; '
+        'no ejecutar sobre la base de datos de producción en horario de operación.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Cantidades de clientes salidos a medir (por defecto 10k, 100k y 1M)',
+        )
+        parser.add_argument(
+            '--legado-hasta',
+            type=int,
+            default=10000,
+            help='Medir también el cálculo fila por fila en Python hasta este tamaño',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Tamaño de lote para bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        for tamano in options['tamanos']:
+            try:
+                with transaction.atomic():
+                    self._medir(tamano, options)
+                    raise Rollback()
+            except Rollback:
+                pass
+
+    def _medir(self, tamano, options):
+        self.stdout.write(f"\n=== {tamano:,} clientes salidos ===")
+
+        inicio = time.perf_counter()
+        self._crear_clientes(tamano, options['batch_size'])
+        self.stdout.write(f"Datos generados en {time.perf_counter() - inicio:.2f}s")
+
+        inicio = time.perf_counter()
+        datos = Recaudacion.calcular_recaudacion_actual()
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"SQL: {duracion * 1000:.1f} ms - ${datos['monto_total']:,.2f} "
+            f"({datos['numero_clientes']:,} clientes)"
+        ))
+
+        if tamano <= options['legado_hasta']:
+            inicio = time.perf_counter()
+            total = sum(cliente.calcular_costo() for cliente in datos['clientes'])
+            duracion = time.perf_counter() - inicio
+            self.stdout.write(f"Python fila por fila: {duracion * 1000:.1f} ms - ${total:,.2f}")
+
+    def _crear_clientes(self, tamano, batch_size):
+        ahora = timezone.now()
+        rng = random.Random(tamano)
+        lote = []
+        for i in range(tamano):
+            entrada = ahora - timezone.timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+            lote.append(Cliente(
+                matricula=f'BEN-{i % 1000:03d}',
+                tipo_vehiculo=rng.choice(['Auto', 'Moto']),
+                fecha_entrada=entrada,
+                fecha_salida=entrada + timezone.timedelta(minutes=rng.randint(1, 600)),
+            ))
+            if len(lote) >= batch_size:
+                Cliente.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            Cliente.objects.bulk_create(lote)
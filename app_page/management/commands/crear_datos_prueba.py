@@ -75,6 +75,7 @@ class Command(BaseCommand):
                 numero_clientes=len(clientes_creados),
                 observaciones='Corte de prueba generado automáticamente'
             )
+            corte.guardar_detalles()
             
             self.stdout.write(
                 self.style.SUCCESS(
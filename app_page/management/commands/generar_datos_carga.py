@@ -0,0 +1,172 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from app_page.models import CapacidadParqueadero, Cliente, Perfil, Recaudacion
+from app_page.salidas import normalizar_matricula
+from app_page.tarifas import get_tarifas
+
+LETRAS = 'ABCDEFGHJKLMNPRSTUVWXYZ'
+NOMBRES = ['Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Laura', 'Andrés', 'Paula', 'Jorge', 'Camila']
+APELLIDOS = ['Gómez', 'Rodríguez', 'Martínez', 'López', 'García', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Díaz']
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos con volumen de producción para la prueba de carga: historial de clientes '
+        'con salida y cobro, vehículos en el parking, un corte diario con su detalle y los '
+        'usuarios de las porterías y del administrador. Úselo sobre una base de pruebas '
+        '(DATABASE_URL), no sobre la de producción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--historico',
+            type=int,
+            default=100000,
+            help='Clientes con salida registrada (por defecto 100000)',
+        )
+        parser.add_argument(
+            '--activos',
+            type=int,
+            default=300,
+            help='Vehículos dentro del parking (por defecto 300)',
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=90,
+            help='Días de historial, con un corte de recaudación por día (por defecto 90)',
+        )
+        parser.add_argument(
+            '--porterias',
+            type=int,
+            default=8,
+            help='Usuarios de portería a crear: <prefijo>_porteria_1..N (por defecto 8)',
+        )
+        parser.add_argument(
+            '--prefijo-usuarios',
+            default='carga',
+            help='Prefijo de los usuarios creados (por defecto carga)',
+        )
+        parser.add_argument(
+            '--clave',
+            default='carga123',
+            help='Contraseña de los usuarios creados (por defecto carga123)',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=42,
+            help='Semilla aleatoria para generar siempre los mismos datos (por defecto 42)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Tamaño de lote para bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        inicio = time.perf_counter()
+
+        admin = self._usuarios(options)
+        ahora = timezone.now()
+        desde = ahora - timedelta(days=options['dias'])
+
+        self._clientes(rng, options['historico'], desde, ahora, True, options['batch_size'])
+        self._clientes(rng, options['activos'], ahora - timedelta(hours=12), ahora, False, options['batch_size'])
+        CapacidadParqueadero.sincronizar()
+        cortes = self._cortes(admin, desde, options['dias'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['historico']:,} clientes con salida, {options['activos']:,} en el parking y "
+            f"{cortes} cortes generados en {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    def _usuarios(self, options):
+        prefijo, clave = options['prefijo_usuarios'], options['clave']
+        cuentas = [(f'{prefijo}_admin', 'administrador')]
+        cuentas += [(f'{prefijo}_porteria_{n}', 'empleado') for n in range(1, options['porterias'] + 1)]
+        for nombre, rol in cuentas:
+            usuario, _ = User.objects.get_or_create(username=nombre)
+            usuario.set_password(clave)
+            usuario.save()
+            Perfil.objects.update_or_create(usuario=usuario, defaults={'rol': rol})
+        self.stdout.write(f"Usuarios: {', '.join(nombre for nombre, _ in cuentas)} (clave {clave})")
+        return User.objects.get(username=cuentas[0][0])
+
+    def _matricula(self, rng, tipo):
+        letras = ''.join(rng.choice(LETRAS) for _ in range(3))
+        if tipo == 'Moto':
+            return f"{letras}-{rng.randint(10, 99)}{rng.choice(LETRAS)}"
+        return f"{letras}-{rng.randint(0, 999):03d}"
+
+    def _clientes(self, rng, cantidad, desde, hasta, con_salida, batch_size):
+        tarifas = get_tarifas()
+        rango = (hasta - desde).total_seconds()
+        lote = []
+        for _ in range(cantidad):
+            tipo = rng.choices(['Auto', 'Moto', 'Otro'], weights=[70, 25, 5])[0]
+            matricula = self._matricula(rng, tipo)
+            entrada = desde + timedelta(seconds=rng.uniform(0, rango))
+            # Residentes sin datos personales la mayoría de las veces, como en portería
+            con_datos = rng.random() < 0.4
+            cliente = Cliente(
+                cedula=str(rng.randint(10000000, 1999999999)) if con_datos else None,
+                nombre=f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}" if con_datos else None,
+                telefono=f"3{rng.randint(100000000, 299999999)}" if con_datos else None,
+                torre=str(rng.randint(1, 12)),
+                apartamento=f"{rng.randint(1, 20)}{rng.randint(1, 4):02d}",
+                matricula=matricula,
+                # bulk_create no pasa por Cliente.save
+                matricula_normalizada=normalizar_matricula(matricula),
+                tipo_vehiculo=tipo,
+                fecha_entrada=entrada,
+            )
+            if con_salida:
+                # Estadías de minutos a un día, la mayoría de pocas horas
+                minutos = min(int(rng.expovariate(1 / 150)) + 1, 24 * 60)
+                cliente.fecha_salida = min(entrada + timedelta(minutes=minutos), hasta)
+                monto, tarifa, minutos_cobrados = tarifas.cobro(tipo, cliente.tiempo_en_minutos())
+                cliente.monto_cobrado = monto
+                cliente.tarifa_aplicada = tarifa
+                cliente.minutos_cobrados = minutos_cobrados
+                cliente.tarifa_plena_aplicada = tarifas.tarifa_plena_activa
+            lote.append(cliente)
+            if len(lote) >= batch_size:
+                Cliente.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            Cliente.objects.bulk_create(lote)
+
+    def _cortes(self, admin, desde, dias):
+        # Un corte por día hasta ayer; lo de hoy queda como recaudación actual
+        inicio = Recaudacion.get_ultimo_corte() or desde
+        cortes = 0
+        for dia in range(1, dias):
+            fin = desde + timedelta(days=dia)
+            if fin <= inicio:
+                continue
+            with transaction.atomic():
+                corte = Recaudacion.objects.create(
+                    usuario=admin,
+                    monto_recaudado=0,
+                    fecha_inicio=inicio,
+                    fecha_fin=fin,
+                    observaciones='Corte generado para la prueba de carga',
+                )
+                detalles = corte.guardar_detalles(
+                    Cliente.objects.filter(fecha_salida__gt=inicio, fecha_salida__lte=fin)
+                )
+                corte.monto_recaudado = sum(detalle.costo for detalle in detalles)
+                corte.numero_clientes = len(detalles)
+                corte.save(update_fields=['monto_recaudado', 'numero_clientes'])
+            inicio = fin
+            cortes += 1
+        return cortes
@@ -0,0 +1,279 @@
+import http.cookiejar
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.urls import reverse
+
+LETRAS = 'ABCDEFGHJKLMNPRSTUVWXYZ'
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Resultados:
+    """Latencias y errores por endpoint, compartidos entre los usuarios virtuales"""
+
+    def __init__(self):
+        self.latencias = {}
+        self.errores = {}
+        self.rechazos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre, segundos, error=False, rechazo=False):
+        with self._lock:
+            self.latencias.setdefault(nombre, [])
+            self.errores.setdefault(nombre, 0)
+            self.rechazos.setdefault(nombre, 0)
+            if error:
+                self.errores[nombre] += 1
+            else:
+                self.latencias[nombre].append(segundos)
+                if rechazo:
+                    self.rechazos[nombre] += 1
+
+
+class Sesion:
+    """Navegador mínimo: cookies de sesión, token CSRF y medición de cada petición"""
+
+    def __init__(self, base, resultados):
+        self.base = base.rstrip('/')
+        self.resultados = resultados
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _csrf(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def pedir(self, nombre, ruta, datos=None, parametros=None, medir=True):
+        """GET (o POST si hay ``datos``); devuelve el JSON de la respuesta si lo hay"""
+        url = self.base + ruta
+        if parametros:
+            url += '?' + urllib.parse.urlencode(parametros)
+        encabezados = {'X-Requested-With': 'XMLHttpRequest', 'Referer': self.base + '/'}
+        cuerpo = None
+        if datos is not None:
+            encabezados['X-CSRFToken'] = self._csrf()
+            cuerpo = urllib.parse.urlencode(datos).encode()
+        peticion = urllib.request.Request(url, data=cuerpo, headers=encabezados)
+
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(peticion, timeout=60) as respuesta:
+                contenido = respuesta.read()
+                tipo = respuesta.headers.get('Content-Type', '')
+        except (urllib.error.URLError, OSError):
+            if medir:
+                self.resultados.registrar(nombre, time.perf_counter() - inicio, error=True)
+            return None
+        duracion = time.perf_counter() - inicio
+
+        json_respuesta = json.loads(contenido) if tipo.startswith('application/json') else None
+        if medir:
+            # success=False es una respuesta válida (sin cupo, ya registrada), se cuenta aparte
+            rechazo = isinstance(json_respuesta, dict) and json_respuesta.get('success') is False
+            self.resultados.registrar(nombre, duracion, rechazo=rechazo)
+        return json_respuesta
+
+    def iniciar_sesion(self, usuario, clave):
+        ruta = reverse('login')
+        self.pedir('login', ruta, medir=False)
+        self.pedir('login', ruta, {
+            'username': usuario,
+            'password': clave,
+            'csrfmiddlewaretoken': self._csrf(),
+        }, medir=False)
+        if not any(cookie.name == 'sessionid' for cookie in self.cookies):
+            raise CommandError(f"No se pudo iniciar sesión como {usuario}; ¿se ejecutó generar_datos_carga?")
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de punta a punta: porterías que registran entradas y salidas (consulta '
+        'y confirmación) y administradores que revisan la lista de clientes y la recaudación. '
+        'Reporta peticiones por segundo y latencias p50/p95/p99 por endpoint. Sin --url levanta '
+        'un servidor WSGI con hilos sobre la base configurada; prepare los datos con '
+        'generar_datos_carga.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Servidor a probar (ej. http://127.0.0.1:8000); por defecto uno local en un puerto libre',
+        )
+        parser.add_argument(
+            '--porterias',
+            type=int,
+            default=4,
+            help='Usuarios virtuales de portería (por defecto 4)',
+        )
+        parser.add_argument(
+            '--administradores',
+            type=int,
+            default=1,
+            help='Usuarios virtuales administradores (por defecto 1)',
+        )
+        parser.add_argument(
+            '--segundos',
+            type=float,
+            default=30,
+            help='Duración de la prueba (por defecto 30)',
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.0,
+            help='Segundos de espera entre acciones de cada usuario virtual (por defecto 0)',
+        )
+        parser.add_argument(
+            '--prefijo-usuarios',
+            default='carga',
+            help='Prefijo de los usuarios de generar_datos_carga (por defecto carga)',
+        )
+        parser.add_argument(
+            '--clave',
+            default='carga123',
+            help='Contraseña de los usuarios (por defecto carga123)',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=42,
+            help='Semilla aleatoria de las acciones (por defecto 42)',
+        )
+
+    def handle(self, *args, **options):
+        servidor = None
+        base = options['url']
+        if not base:
+            servidor = ThreadedWSGIServer(('127.0.0.1', 0), _HandlerSilencioso, allow_reuse_address=False)
+            servidor.set_app(get_internal_wsgi_application())
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            base = f"http://127.0.0.1:{servidor.server_port}"
+            # Los logs por petición de las vistas (y los avisos de impresora) distorsionan las latencias
+            logging.disable(logging.WARNING)
+
+        try:
+            self.stdout.write(
+                f"{options['porterias']} porterías y {options['administradores']} administradores "
+                f"contra {base} durante {options['segundos']:.0f}s"
+            )
+            resultados = self._ejecutar(base, options)
+        finally:
+            if servidor:
+                servidor.shutdown()
+                servidor.server_close()
+                logging.disable(logging.NOTSET)
+
+        self._reportar(resultados, options['segundos'])
+
+    def _ejecutar(self, base, options):
+        resultados = Resultados()
+        prefijo = options['prefijo_usuarios']
+        usuarios = [(self._porteria, f'{prefijo}_porteria_{n}') for n in range(1, options['porterias'] + 1)]
+        usuarios += [(self._administrador, f'{prefijo}_admin') for _ in range(options['administradores'])]
+
+        sesiones = []
+        for _, usuario in usuarios:
+            sesion = Sesion(base, resultados)
+            sesion.iniciar_sesion(usuario, options['clave'])
+            sesiones.append(sesion)
+
+        fin = time.monotonic() + options['segundos']
+        hilos = [
+            threading.Thread(
+                target=escenario,
+                args=(sesion, random.Random(options['semilla'] + n), fin, options['pausa']),
+            )
+            for n, ((escenario, _), sesion) in enumerate(zip(usuarios, sesiones))
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def _porteria(self, sesion, rng, fin, pausa):
+        """Registra entradas y da salida a sus vehículos con la consulta y la confirmación"""
+        ruta = reverse('dashboard_parking')
+        adentro = []
+        while time.monotonic() < fin:
+            if len(adentro) < 5 or rng.random() < 0.5:
+                tipo = rng.choices(['Auto', 'Moto'], weights=[75, 25])[0]
+                letras = ''.join(rng.choice(LETRAS) for _ in range(3))
+                fin_placa = f"{rng.randint(10, 99)}{rng.choice(LETRAS)}" if tipo == 'Moto' else f"{rng.randint(0, 999):03d}"
+                datos = sesion.pedir('entrada', ruta, {
+                    'matricula_inicio': letras,
+                    'matricula_fin': fin_placa,
+                    'tipo_vehiculo': tipo,
+                    'torre': str(rng.randint(1, 12)),
+                })
+                if datos and datos.get('success'):
+                    adentro.append((datos['cliente']['id'], f"{letras}{fin_placa}"))
+            else:
+                cliente_id, placa = adentro.pop(rng.randrange(len(adentro)))
+                # Paso 1: escanear el ticket o digitar la placa; paso 2: confirmar el cobro
+                codigo = str(cliente_id) if rng.random() < 0.7 else placa
+                datos = sesion.pedir('salida_consulta', ruta, {'codigo': codigo})
+                if datos and datos.get('mostrar_confirmacion'):
+                    sesion.pedir('salida_confirmar', ruta, {
+                        'confirmar_salida': 'true',
+                        'cliente_id': datos['cliente']['id'],
+                    })
+            if pausa:
+                time.sleep(pausa)
+
+    def _administrador(self, sesion, rng, fin, pausa):
+        """Revisa la lista de clientes (con filtros y páginas) y la recaudación"""
+        while time.monotonic() < fin:
+            accion = rng.random()
+            if accion < 0.15:
+                sesion.pedir('lista_clientes', reverse('lista_clientes'))
+            elif accion < 0.6:
+                parametros = rng.choice([
+                    {},
+                    {'estado': 'en_parking'},
+                    {'buscar': rng.choice(LETRAS) + rng.choice(LETRAS) + rng.choice(LETRAS)},
+                    {'tipo': 'moto'},
+                ])
+                datos = sesion.pedir('api_clientes', reverse('api_clientes'), parametros=parametros)
+                if datos and datos.get('siguiente') and rng.random() < 0.5:
+                    sesion.pedir('api_clientes', reverse('api_clientes'), parametros={**parametros, 'cursor': datos['siguiente']})
+            else:
+                datos = sesion.pedir('resumen_recaudacion', reverse('resumen_recaudacion'))
+                if datos and datos.get('historial') and rng.random() < 0.3:
+                    sesion.pedir('detalle_corte', rng.choice(datos['historial'])['detalle_url'])
+            if pausa:
+                time.sleep(pausa)
+
+    def _reportar(self, resultados, segundos):
+        self.stdout.write(
+            f"\n{'Endpoint':<20} {'Peticiones':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'máx ms':>8} {'Errores':>8} {'success=False':>14}"
+        )
+        total = 0
+        for nombre in sorted(resultados.latencias):
+            tiempos = sorted(resultados.latencias[nombre])
+            total += len(tiempos)
+            if tiempos:
+                percentiles = statistics.quantiles(tiempos, n=100, method='inclusive') if len(tiempos) > 1 else tiempos * 99
+                p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+                maximo = tiempos[-1]
+            else:
+                p50 = p95 = p99 = maximo = 0
+            self.stdout.write(
+                f"{nombre:<20} {len(tiempos):>10} {len(tiempos) / segundos:>8.1f} {p50 * 1000:>8.1f} "
+                f"{p95 * 1000:>8.1f} {p99 * 1000:>8.1f} {maximo * 1000:>8.1f} "
+                f"{resultados.errores[nombre]:>8} {resultados.rechazos[nombre]:>14}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Total: {total} peticiones, {total / segundos:.1f} req/s"))
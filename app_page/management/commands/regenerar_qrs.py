@@ -1,5 +1,14 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from app_page.models import Cliente
+from app_page.fechas import rango_dia
+from app_qr.render import guardar_qr
+
 
 class Command(BaseCommand):
     help = 'Regenera códigos QR limpios para todos los clientes'
@@ -10,41 +19,125 @@ class Command(BaseCommand):
             type=int,
             help='ID específico del cliente para regenerar QR',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos que dibujan y escriben los QR en paralelo (por defecto uno por CPU; 1 = sin procesos extra)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Clientes leídos y actualizados por lote (por defecto 500)',
+        )
+        parser.add_argument(
+            '--only-active',
+            action='store_true',
+            help='Solo clientes que siguen en el parking (sin salida)',
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Solo clientes que entraron desde esta fecha (AAAA-MM-DD)',
+        )
 
     def handle(self, *args, **options):
         if options['cliente_id']:
-            try:
-                cliente = Cliente.objects.get(id=options['cliente_id'])
-                self.stdout.write(f"Regenerando QR limpio para cliente {cliente.id}: {cliente.nombre}")
-                if cliente.generate_clean_qr():
-                    cliente.save()
-                    self.stdout.write(
-                        self.style.SUCCESS(f'QR limpio regenerado exitosamente para {cliente.nombre}')
-                    )
-                else:
-                    self.stdout.write(
-                        self.style.ERROR(f'Error al regenerar QR limpio para {cliente.nombre}')
-                    )
-            except Cliente.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(f'Cliente con ID {options["cliente_id"]} no encontrado')
-                )
+            self._regenerar_uno(options['cliente_id'])
+            return
+
+        clientes = Cliente.objects.filter(fecha_entrada__isnull=False)
+        if options['only_active']:
+            clientes = clientes.filter(fecha_salida__isnull=True)
+        if options['since']:
+            clientes = clientes.filter(fecha_entrada__gte=rango_dia(options['since'])[0])
+
+        total = clientes.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('No hay clientes para regenerar.'))
+            return
+
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        self.stdout.write(f"Regenerando QRs limpios para {total} clientes con {workers} procesos...")
+
+        clientes = clientes.only('id', 'fecha_entrada', 'qr_image').order_by('id')
+        campo = Cliente._meta.get_field('qr_image')
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        # Varios clientes por envío a cada proceso para amortizar el pickling
+        self.envio = max(1, chunk_size // (workers * 4))
+        procesados = 0
+        inicio = time.perf_counter()
+        lote = []
+
+        try:
+            for cliente in clientes.iterator(chunk_size=chunk_size):
+                lote.append(cliente)
+                if len(lote) >= chunk_size:
+                    procesados += self._procesar_lote(lote, campo, executor)
+                    lote = []
+                    self._progreso(procesados, total, inicio)
+            if lote:
+                procesados += self._procesar_lote(lote, campo, executor)
+                self._progreso(procesados, total, inicio)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Proceso completado: {procesados}/{total} QRs limpios regenerados '
+            f'en {duracion:.1f}s ({procesados / max(duracion, 1e-9):.0f} QR/s)'
+        ))
+
+    def _procesar_lote(self, lote, campo, executor):
+        """Dibuja y escribe los PNG del lote (en paralelo si hay executor) y guarda las rutas en un UPDATE"""
+        por_id = {cliente.id: cliente for cliente in lote}
+        ids = list(por_id)
+        nombres = [
+            campo.generate_filename(cliente, f"qr_{cliente.id}_{cliente.fecha_entrada.strftime('%Y%m%d%H%M%S')}.png")
+            for cliente in lote
+        ]
+
+        if executor:
+            resultados = executor.map(guardar_qr, ids, nombres, chunksize=self.envio)
+        else:
+            resultados = map(guardar_qr, ids, nombres)
+
+        for cliente_id, nombre in resultados:
+            por_id[cliente_id].qr_image.name = nombre
+
+        # Una transacción corta por lote en lugar de un save() por cliente
+        with transaction.atomic():
+            Cliente.objects.bulk_update(lote, ['qr_image'])
+        return len(lote)
+
+    def _progreso(self, procesados, total, inicio):
+        duracion = time.perf_counter() - inicio
+        velocidad = procesados / max(duracion, 1e-9)
+        restante = (total - procesados) / velocidad if velocidad else 0
+        self.stdout.write(
+            f"  {procesados}/{total} ({procesados * 100 // total}%) - "
+            f"{velocidad:.0f} QR/s - faltan ~{restante:.0f}s"
+        )
+
+    def _regenerar_uno(self, cliente_id):
+        try:
+            cliente = Cliente.objects.get(id=cliente_id)
+        except Cliente.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Cliente con ID {cliente_id} no encontrado')
+            )
+            return
+
+        self.stdout.write(f"Regenerando QR limpio para cliente {cliente.id}: {cliente.nombre}")
+        if cliente.generate_clean_qr():
+            cliente.save(update_fields=['qr_image'])
+            self.stdout.write(
+                self.style.SUCCESS(f'QR limpio regenerado exitosamente para {cliente.nombre}')
+            )
         else:
-            clientes = Cliente.objects.filter(fecha_entrada__isnull=False)
-            total = clientes.count()
-            exitosos = 0
-            
-            self.stdout.write(f"Regenerando QRs limpios para {total} clientes...")
-            
-            for cliente in clientes:
-                self.stdout.write(f"Procesando cliente {cliente.id}: {cliente.nombre}")
-                if cliente.generate_clean_qr():
-                    cliente.save()
-                    exitosos += 1
-                    self.stdout.write(f"  ✓ QR limpio generado exitosamente")
-                else:
-                    self.stdout.write(f"  ✗ Error al generar QR limpio")
-            
             self.stdout.write(
-                self.style.SUCCESS(f'Proceso completado: {exitosos}/{total} QRs limpios regenerados')
+                self.style.ERROR(f'Error al regenerar QR limpio para {cliente.nombre}')
             )
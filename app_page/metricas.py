@@ -0,0 +1,170 @@
+"""
+Métricas de operación en formato Prometheus (``GET /metrics``).
+
+Contadores e histogramas en memoria del proceso con ``prometheus_client``:
+entradas, salidas y pesos cobrados por tipo de vehículo, recaudación desde
+el último corte, vehículos en el parking, trabajos de impresión por estado e
+impresora, duración de la impresión y latencia de las peticiones por vista.
+Se actualizan donde ocurre cada evento, así que leer ``/metrics`` no
+consulta la base de datos ni el cache.
+
+Con varios workers de gunicorn se usa el modo multiproceso de
+``prometheus_client``: defina ``PROMETHEUS_MULTIPROC_DIR`` (un directorio
+vacío en cada arranque) antes de iniciar gunicorn. Cada worker escribe sus
+valores en archivos de ese directorio y ``/metrics`` los suma; el hook
+``child_exit`` de gunicorn debe llamar a ``multiprocess.mark_process_dead``
+(ver el README).
+
+La recaudación desde el último corte y los vehículos en el parking son
+valores globales, no por proceso, y se publican como el valor más reciente
+de cualquier worker. Con un cache compartido (Redis, Memcached o
+DatabaseCache) se toman de sus contadores al registrar cada entrada, salida
+o corte, sin consultar la base de datos. Con varios workers y un cache de
+cada proceso (``LocMemCache``, el de por defecto) esos contadores solo
+tienen la parte de un worker, así que se recalculan con una consulta en
+cada evento.
+"""
+
+import os
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+CLAVE_RECAUDACION = 'metricas_recaudacion_desde_corte_centavos'
+
+# Backends de cache cuyo contenido vive en la memoria de cada proceso
+CACHES_POR_PROCESO = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+# Cualquier otro método queda como "otro" para no crear series sin límite
+METODOS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'}
+
+ENTRADAS = Counter(
+    'parking_entradas', 'Vehículos registrados a la entrada', ['tipo_vehiculo'],
+)
+SALIDAS = Counter(
+    'parking_salidas', 'Salidas registradas con su cobro', ['tipo_vehiculo'],
+)
+RECAUDADO = Counter(
+    'parking_recaudado_pesos', 'Pesos cobrados en las salidas', ['tipo_vehiculo'],
+)
+CORTES = Counter(
+    'parking_cortes', 'Cortes de recaudación realizados',
+)
+RECAUDACION_DESDE_CORTE = Gauge(
+    'parking_recaudacion_desde_corte_pesos', 'Pesos cobrados desde el último corte de recaudación',
+    multiprocess_mode='mostrecent',
+)
+EN_PARKING = Gauge(
+    'parking_vehiculos_en_parking', 'Vehículos dentro del parking',
+    multiprocess_mode='mostrecent',
+)
+TRABAJOS_IMPRESION = Counter(
+    'impresion_trabajos', 'Trabajos de impresión por estado (PENDING al encolar, SUCCESS o FAILED al terminar)',
+    ['estado', 'impresora'],
+)
+DURACION_IMPRESION = Histogram(
+    'impresion_duracion_segundos', 'Duración de la impresión de un ticket', ['impresora'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+LATENCIA = Histogram(
+    'http_peticion_duracion_segundos', 'Latencia de las peticiones por vista', ['vista', 'metodo'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def _totales_en_cache():
+    """Los contadores del cache valen para todos los workers: un solo proceso o cache compartido"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return True
+    return settings.CACHES.get('default', {}).get('BACKEND') not in CACHES_POR_PROCESO
+
+
+def _publicar_en_parking():
+    from .estadisticas import CLAVE_EN_PARKING
+    from .models import Cliente
+    if _totales_en_cache():
+        en_parking = cache.get(CLAVE_EN_PARKING)
+    else:
+        en_parking = Cliente.objects.filter(fecha_salida__isnull=True).count()
+    if en_parking is not None:
+        EN_PARKING.set(en_parking)
+
+
+def sincronizar_recaudacion():
+    """Recalcula la recaudación desde el último corte (una consulta) y la publica"""
+    from .models import Recaudacion
+    centavos = int(Decimal(str(Recaudacion.calcular_recaudacion_actual()['monto_total'])) * 100)
+    cache.set(CLAVE_RECAUDACION, centavos, None)
+    RECAUDACION_DESDE_CORTE.set(centavos / 100)
+
+
+def contar_entrada(cliente):
+    """Un vehículo entra al parking"""
+    ENTRADAS.labels(cliente.tipo_vehiculo).inc()
+    _publicar_en_parking()
+
+
+def contar_salida(cliente):
+    """Un vehículo sale con el cobro ya guardado en ``cliente``"""
+    monto = Decimal(str(cliente.monto_cobrado or 0))
+    SALIDAS.labels(cliente.tipo_vehiculo).inc()
+    RECAUDADO.labels(cliente.tipo_vehiculo).inc(float(monto))
+    if not _totales_en_cache():
+        sincronizar_recaudacion()
+        _publicar_en_parking()
+        return
+    try:
+        centavos = cache.incr(CLAVE_RECAUDACION, int(monto * 100))
+    except ValueError:
+        # Sin valor en el cache (arranque o cache vaciado): la salida ya está guardada y entra en el cálculo
+        sincronizar_recaudacion()
+    else:
+        RECAUDACION_DESDE_CORTE.set(centavos / 100)
+    _publicar_en_parking()
+
+
+def contar_corte(corte):
+    """Se hizo un corte: la recaudación pendiente vuelve a lo cobrado después de él"""
+    CORTES.inc()
+    sincronizar_recaudacion()
+
+
+def contar_impresion(estado, impresora, segundos=None):
+    """Un trabajo de impresión se encoló (PENDING) o terminó en ``segundos``"""
+    TRABAJOS_IMPRESION.labels(estado, impresora).inc()
+    if segundos is not None:
+        DURACION_IMPRESION.labels(impresora).observe(segundos)
+
+
+def exportar():
+    """Contenido y tipo de la respuesta de ``/metrics`` (suma de los workers en modo multiproceso)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+class LatenciaMiddleware:
+    """Registra la latencia de cada petición con el nombre de URL de su vista"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        vista = (match.view_name if match else None) or '<sin ruta>'
+        metodo = request.method if request.method in METODOS else 'otro'
+        LATENCIA.labels(vista, metodo).observe(time.perf_counter() - inicio)
+        return response
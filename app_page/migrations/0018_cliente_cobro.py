@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0017_recaudacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='minutos_cobrados',
+            field=models.PositiveIntegerField(blank=True, help_text='Minutos facturados al registrar la salida', null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='monto_cobrado',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Monto cobrado al registrar la salida', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='tarifa_aplicada',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Costo por minuto o costo fijo usado en el cobro', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='tarifa_plena_aplicada',
+            field=models.BooleanField(blank=True, help_text='Indica si el cobro se hizo con tarifa plena', null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0018_cliente_cobro'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('fecha_salida__isnull', True)), fields=['fecha_entrada'], name='cliente_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['cedula', 'fecha_salida', 'fecha_entrada'], name='cliente_cedula_salida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('fecha_salida__isnull', False)), fields=['fecha_salida'], name='cliente_fecha_salida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['fecha_entrada'], name='cliente_fecha_entrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitante',
+            index=models.Index(fields=['fecha_registro'], name='visitante_fecha_registro_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+def crear_capacidades(apps, schema_editor):
+    """Crea un registro por tipo de vehículo con la ocupación actual y sin límite"""
+    Cliente = apps.get_model('app_page', 'Cliente')
+    CapacidadParqueadero = apps.get_model('app_page', 'CapacidadParqueadero')
+    for tipo in ('Auto', 'Moto', 'Otro'):
+        CapacidadParqueadero.objects.get_or_create(
+            tipo_vehiculo=tipo,
+            defaults={
+                'ocupados': Cliente.objects.filter(tipo_vehiculo=tipo, fecha_salida__isnull=True).count(),
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0019_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacidadParqueadero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_vehiculo', models.CharField(choices=[('Auto', 'Auto'), ('Moto', 'Moto'), ('Otro', 'Otro')], max_length=10, unique=True, verbose_name='Tipo de vehículo')),
+                ('capacidad', models.PositiveIntegerField(blank=True, help_text='Cantidad máxima de vehículos de este tipo. Vacío = sin límite', null=True, verbose_name='Capacidad')),
+                ('ocupados', models.PositiveIntegerField(default=0, help_text='Se actualiza automáticamente con cada entrada y salida', verbose_name='Cupos ocupados')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Capacidad del Parqueadero',
+                'verbose_name_plural': 'Capacidad del Parqueadero',
+            },
+        ),
+        migrations.RunPython(crear_capacidades, migrations.RunPython.noop),
+    ]
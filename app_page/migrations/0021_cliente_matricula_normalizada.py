@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:08
+
+import re
+
+from django.db import migrations, models
+
+
+def normalizar_matriculas(apps, schema_editor):
+    """Completa matricula_normalizada en los registros existentes"""
+    Cliente = apps.get_model('app_page', 'Cliente')
+    lote = []
+    for cliente in Cliente.objects.only('id', 'matricula').iterator(chunk_size=2000):
+        cliente.matricula_normalizada = re.sub(r'[\W_]+', '', (cliente.matricula or '').upper())
+        lote.append(cliente)
+        if len(lote) >= 2000:
+            Cliente.objects.bulk_update(lote, ['matricula_normalizada'])
+            lote = []
+    if lote:
+        Cliente.objects.bulk_update(lote, ['matricula_normalizada'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0020_capacidadparqueadero'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='matricula_normalizada',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(normalizar_matriculas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('fecha_salida__isnull', True)), fields=['matricula_normalizada', 'fecha_entrada'], name='cliente_matricula_activa_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:13
+
+from django.db import migrations
+
+
+def instalar_indice(apps, schema_editor):
+    """Tabla FTS5 con triggers (SQLite) o índices de trigramas (PostgreSQL)"""
+    from app_page import busqueda
+    busqueda.instalar(schema_editor.connection)
+
+
+def desinstalar_indice(apps, schema_editor):
+    from app_page import busqueda
+    busqueda.desinstalar(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0021_cliente_matricula_normalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar_indice, desinstalar_indice),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_page', '0022_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recaudacion',
+            name='detalle_guardado',
+            field=models.BooleanField(default=False, editable=False, help_text='Si las líneas del corte ya están guardadas en RecaudacionDetalle'),
+        ),
+        migrations.CreateModel(
+            name='RecaudacionDetalle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('cedula', models.CharField(max_length=20, verbose_name='Cédula')),
+                ('matricula', models.CharField(max_length=20, verbose_name='Matrícula')),
+                ('tipo_vehiculo', models.CharField(max_length=20, verbose_name='Tipo de vehículo')),
+                ('fecha_entrada', models.DateTimeField(blank=True, null=True, verbose_name='Entrada')),
+                ('fecha_salida', models.DateTimeField(blank=True, null=True, verbose_name='Salida')),
+                ('tiempo_parking', models.CharField(max_length=30, verbose_name='Tiempo')),
+                ('costo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Costo')),
+                ('tarifa_plena', models.BooleanField(default=False, verbose_name='Tarifa plena')),
+                ('cliente', models.ForeignKey(blank=True, help_text='Registro original (queda vacío si el cliente se elimina)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_page.cliente', verbose_name='Cliente')),
+                ('recaudacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='app_page.recaudacion', verbose_name='Corte')),
+            ],
+            options={
+                'verbose_name': 'Detalle de recaudación',
+                'verbose_name_plural': 'Detalles de recaudación',
+                'ordering': ['fecha_salida', 'id'],
+                'indexes': [models.Index(fields=['recaudacion', 'fecha_salida', 'id'], name='detalle_corte_salida_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recaudacion', 'cliente'), name='detalle_corte_cliente_unico')],
+            },
+        ),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from PIL import Image, ImageDraw, ImageFont
-import qrcode
-from io import BytesIO
+from django.db.models.functions import Coalesce
 from django.core.files.base import ContentFile
+from decimal import Decimal
+from django.urls import reverse
+from app_qr.render import LAYOUT_CON_DATOS, generar_qr_png, lineas_cliente, renderizar_png
+from .tarifas import get_tarifas, formatear_costo
+from .salidas import normalizar_matricula
+from . import formatos
 
 class Cliente(models.Model):
 	TIPO_VEHICULO_CHOICES = [
@@ -18,11 +22,25 @@ class Cliente(models.Model):
 	torre = models.CharField(max_length=10, blank=True, null=True, help_text='Torre del apartamento')
 	apartamento = models.CharField(max_length=10, blank=True, null=True, help_text='Número de apartamento')
 	matricula = models.CharField(max_length=20)
+	# Matrícula sin separadores para buscar el vehículo en la salida (la mantiene save)
+	matricula_normalizada = models.CharField(max_length=20, blank=True, default='', editable=False)
 	tipo_vehiculo = models.CharField(max_length=10, choices=TIPO_VEHICULO_CHOICES, default='Auto')
 	tiempo_parking = models.PositiveIntegerField(null=True, blank=True, help_text='Tiempo en minutos')
 	fecha_entrada = models.DateTimeField(null=True, blank=True)
 	fecha_salida = models.DateTimeField(null=True, blank=True)
 	qr_image = models.ImageField(upload_to='qr_codes/', null=True, blank=True)
+	# Cobro congelado al registrar la salida (no cambia si después cambian las tarifas)
+	monto_cobrado = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text='Monto cobrado al registrar la salida')
+	minutos_cobrados = models.PositiveIntegerField(null=True, blank=True, help_text='Minutos facturados al registrar la salida')
+	tarifa_aplicada = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text='Costo por minuto o costo fijo usado en el cobro')
+	tarifa_plena_aplicada = models.BooleanField(null=True, blank=True, help_text='Indica si el cobro se hizo con tarifa plena')
+
+	def save(self, *args, **kwargs):
+		self.matricula_normalizada = normalizar_matricula(self.matricula)
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None and 'matricula' in update_fields:
+			kwargs['update_fields'] = {*update_fields, 'matricula_normalizada'}
+		super().save(*args, **kwargs)
 
 	def generate_qr_with_data(self):
 		"""Genera un QR con datos adicionales integrados en la imagen"""
@@ -30,109 +48,9 @@ class Cliente(models.Model):
 			return False
 			
 		try:
-			# Crear QR con el ID del cliente
-			qr_data = str(self.id)
-			qr_img = qrcode.QRCode(
-				version=1,
-				error_correction=qrcode.constants.ERROR_CORRECT_L,
-				box_size=10,
-				border=4,
-			)
-			qr_img.add_data(qr_data)
-			qr_img.make(fit=True)
-			
-			# Crear imagen del QR
-			qr_image = qr_img.make_image(fill_color="black", back_color="white")
-			# Convertir a RGB si no está en RGB
-			if qr_image.mode != 'RGB':
-				qr_image = qr_image.convert('RGB')
-			
-			# Crear imagen más grande para agregar datos
-			width, height = qr_image.size
-			extra_height = 140 if ubicacion_str else 120  # Espacio extra si hay ubicación
-			new_height = height + extra_height
-			new_width = max(width, 400)  # Ancho mínimo
-			
-			# Crear imagen final
-			final_img = Image.new('RGB', (new_width, new_height), 'white')
-			
-			# Centrar QR en la imagen
-			qr_x = (new_width - width) // 2
-			final_img.paste(qr_image, (qr_x, 0))
-			
-			# Agregar texto con información
-			draw = ImageDraw.Draw(final_img)
-			
-			try:
-				# Intentar cargar fuente
-				font_large = ImageFont.truetype("arial.ttf", 16)
-				font_small = ImageFont.truetype("arial.ttf", 12)
-			except:
-				# Fuente por defecto si no encuentra arial
-				font_large = ImageFont.load_default()
-				font_small = ImageFont.load_default()
-			
-			# Datos a mostrar
-			fecha_str = self.fecha_entrada.strftime('%d/%m/%Y %H:%M')
-			matricula_str = f"Matrícula: {self.matricula}"
-			hora_str = f"Entrada: {fecha_str}"
-			id_str = f"ID: {self.id}"
-			
-			# Información de torre y apartamento
-			ubicacion_str = ""
-			if self.torre or self.apartamento:
-				torre = self.torre or ""
-				apartamento = self.apartamento or ""
-				if torre and apartamento:
-					ubicacion_str = f"Torre {torre} - Apt {apartamento}"
-				elif torre:
-					ubicacion_str = f"Torre {torre}"
-				elif apartamento:
-					ubicacion_str = f"Apartamento {apartamento}"
-			
-			# Posiciones del texto
-			text_y = height + 10
-			line_height = 20
-			
-			# Centrar texto (compatible con versiones anteriores de Pillow)
-			# Calcular ancho del texto para centrarlo manualmente
-			current_y = text_y
-			
-			id_bbox = draw.textbbox((0, 0), id_str, font=font_large)
-			id_width = id_bbox[2] - id_bbox[0]
-			draw.text(((new_width - id_width) // 2, current_y), id_str, fill='black', font=font_large)
-			current_y += line_height
-			
-			matricula_bbox = draw.textbbox((0, 0), matricula_str, font=font_small)
-			matricula_width = matricula_bbox[2] - matricula_bbox[0]
-			draw.text(((new_width - matricula_width) // 2, current_y), matricula_str, fill='black', font=font_small)
-			current_y += line_height
-			
-			# Agregar información de ubicación si existe
-			if ubicacion_str:
-				ubicacion_bbox = draw.textbbox((0, 0), ubicacion_str, font=font_small)
-				ubicacion_width = ubicacion_bbox[2] - ubicacion_bbox[0]
-				draw.text(((new_width - ubicacion_width) // 2, current_y), ubicacion_str, fill='black', font=font_small)
-				current_y += line_height
-			
-			hora_bbox = draw.textbbox((0, 0), hora_str, font=font_small)
-			hora_width = hora_bbox[2] - hora_bbox[0]
-			draw.text(((new_width - hora_width) // 2, current_y), hora_str, fill='black', font=font_small)
-			current_y += line_height
-			
-			tipo_text = f"Tipo: {self.get_tipo_vehiculo_display()}"
-			tipo_bbox = draw.textbbox((0, 0), tipo_text, font=font_small)
-			tipo_width = tipo_bbox[2] - tipo_bbox[0]
-			draw.text(((new_width - tipo_width) // 2, current_y), tipo_text, fill='black', font=font_small)
-			
-			# Guardar imagen
-			buf = BytesIO()
-			final_img.save(buf, format='PNG')
-			buf.seek(0)
-			
+			png = renderizar_png(str(self.id), LAYOUT_CON_DATOS, lineas_cliente(self))
 			filename = f"qr_data_{self.id}_{self.fecha_entrada.strftime('%Y%m%d%H%M%S')}.png"
-			self.qr_image.save(filename, ContentFile(buf.read()), save=False)
-			
+			self.qr_image.save(filename, ContentFile(png), save=False)
 			return True
 			
 		except Exception as e:
@@ -140,42 +58,26 @@ class Cliente(models.Model):
 			return False
 
 	def generate_clean_qr(self):
-		"""Genera un QR limpio sin información adicional"""
+		"""Guarda en ``qr_image`` el QR limpio (solo para exportar; la app usa ``qr_url``)"""
 		if not self.fecha_entrada:
 			return False
 			
 		try:
-			# Crear QR con el ID del cliente
-			qr_data = str(self.id)
-			qr_img = qrcode.QRCode(
-				version=1,
-				error_correction=qrcode.constants.ERROR_CORRECT_L,
-				box_size=10,
-				border=4,
-			)
-			qr_img.add_data(qr_data)
-			qr_img.make(fit=True)
-			
-			# Crear imagen del QR limpia
-			qr_image = qr_img.make_image(fill_color="black", back_color="white")
-			# Convertir a RGB si no está en RGB
-			if qr_image.mode != 'RGB':
-				qr_image = qr_image.convert('RGB')
-			
-			# Guardar imagen directamente sin agregar texto
-			buf = BytesIO()
-			qr_image.save(buf, format='PNG')
-			buf.seek(0)
-			
 			filename = f"qr_{self.id}_{self.fecha_entrada.strftime('%Y%m%d%H%M%S')}.png"
-			self.qr_image.save(filename, ContentFile(buf.read()), save=False)
-			
+			self.qr_image.save(filename, ContentFile(generar_qr_png(str(self.id))), save=False)
 			return True
 			
 		except Exception as e:
 			print(f"Error generando QR limpio para cliente {self.id}: {e}")
 			return False
 
+	@property
+	def qr_url(self):
+		"""URL del QR generado al vuelo a partir del id"""
+		if not self.id:
+			return None
+		return reverse('qr_cliente', args=[self.id])
+
 	def get_display_name(self):
 		"""Devuelve el nombre del cliente o un valor por defecto"""
 		return self.nombre or 'Cliente sin nombre'
@@ -203,25 +105,7 @@ class Cliente(models.Model):
 		
 		# Determinar fecha final: salida si existe, sino fecha actual
 		fecha_fin = self.fecha_salida if self.fecha_salida else timezone.now()
-		
-		# Calcular diferencia
-		diferencia = fecha_fin - self.fecha_entrada
-		
-		# Extraer componentes
-		total_segundos = int(diferencia.total_seconds())
-		horas = total_segundos // 3600
-		minutos = (total_segundos % 3600) // 60
-		
-		# Formatear resultado
-		if horas > 0:
-			if minutos > 0:
-				return f"{horas}h {minutos}m"
-			else:
-				return f"{horas}h"
-		elif minutos > 0:
-			return f"{minutos}m"
-		else:
-			return "< 1m"
+		return formatos.tiempo_corto(int((fecha_fin - self.fecha_entrada).total_seconds()))
 	
 	def tiempo_en_minutos(self):
 		"""Devuelve el tiempo total en minutos para cálculos"""
@@ -238,95 +122,66 @@ class Cliente(models.Model):
 			return "Sin fecha de entrada"
 		
 		fecha_fin = self.fecha_salida if self.fecha_salida else timezone.now()
-		diferencia = fecha_fin - self.fecha_entrada
-		
-		total_segundos = int(diferencia.total_seconds())
-		dias = total_segundos // 86400
-		horas = (total_segundos % 86400) // 3600
-		minutos = (total_segundos % 3600) // 60
-		
-		partes = []
-		if dias > 0:
-			partes.append(f"{dias} día{'s' if dias != 1 else ''}")
-		if horas > 0:
-			partes.append(f"{horas} hora{'s' if horas != 1 else ''}")
-		if minutos > 0:
-			partes.append(f"{minutos} minuto{'s' if minutos != 1 else ''}")
-		
-		if not partes:
-			return "Menos de 1 minuto"
-		
-		return ", ".join(partes)
+		return formatos.tiempo_largo(int((fecha_fin - self.fecha_entrada).total_seconds()))
 
-	def calcular_costo(self):
+	def calcular_costo(self, tarifas=None):
 		"""Calcula el costo total basado en el tiempo y tipo de vehículo"""
+		if self.monto_cobrado is not None:
+			return float(self.monto_cobrado)
+		
 		if not self.fecha_entrada:
 			return 0.00
 		
-		# Verificar si la tarifa plena está activa
-		tarifa_plena = TarifaPlena.get_tarifa_actual()
-		
-		if tarifa_plena.activa:
-			# Si la tarifa plena está activa, usar costo fijo
-			return float(tarifa_plena.get_costo_por_tipo(self.tipo_vehiculo))
-		else:
-			# Si no, usar el cálculo por minutos normal
-			costos = Costo.get_costos_actuales()
-			tiempo_minutos = max(1, self.tiempo_en_minutos())
-			costo_por_minuto = costos.get_costo_por_tipo(self.tipo_vehiculo)
-			return float(costo_por_minuto) * tiempo_minutos
+		tarifas = tarifas or get_tarifas()
+		return tarifas.calcular(self.tipo_vehiculo, self.tiempo_en_minutos())
 	
-	def costo_formateado(self):
+	def costo_formateado(self, tarifas=None):
 		"""Devuelve el costo formateado como string"""
-		costo = self.calcular_costo()
-		tarifa_plena = TarifaPlena.get_tarifa_actual()
-		
-		if tarifa_plena.activa:
-			return f"${costo:,.2f} (Tarifa Plena)"
+		return formatear_costo(self.calcular_costo(tarifas), self.es_tarifa_plena(tarifas))
+	
+	def es_tarifa_plena(self, tarifas=None):
+		"""Verifica si este cliente está usando (o pagó con) tarifa plena"""
+		if self.tarifa_plena_aplicada is not None:
+			return self.tarifa_plena_aplicada
+		tarifas = tarifas or get_tarifas()
+		return tarifas.tarifa_plena_activa
+
+	def calcular_cobro(self, tarifas=None):
+		"""Congela en el registro el monto, minutos y tarifa según la fecha de salida actual"""
+		tarifas = tarifas or get_tarifas()
+		if self.fecha_entrada:
+			monto, tarifa, minutos = tarifas.cobro(self.tipo_vehiculo, self.tiempo_en_minutos())
 		else:
-			return f"${costo:,.2f}"
-	
-	def es_tarifa_plena(self):
-		"""Verifica si este cliente está usando tarifa plena"""
-		tarifa_plena = TarifaPlena.get_tarifa_actual()
-		return tarifa_plena.activa
+			monto, tarifa, minutos = Decimal('0.00'), None, 0
+		self.monto_cobrado = monto
+		self.minutos_cobrados = minutos
+		self.tarifa_aplicada = tarifa
+		self.tarifa_plena_aplicada = tarifas.tarifa_plena_activa
+
+	def registrar_salida(self, fecha_salida=None, tarifas=None):
+		"""Marca la salida y guarda el cobro final (no llama a save)"""
+		self.fecha_salida = fecha_salida or timezone.now()
+		self.calcular_cobro(tarifas)
 
 	def costo_por_tiempo(self):
 		"""Calcula el costo por minuto del tipo de vehículo"""
 		if not hasattr(self, '_costo_por_tiempo'):
-			costos = Costo.get_costos_actuales()
-			self._costo_por_tiempo = costos.get_costo_por_tipo(self.tipo_vehiculo)
+			self._costo_por_tiempo = get_tarifas().costo_por_minuto(self.tipo_vehiculo)
 		return float(self._costo_por_tiempo)
 	
-	def calcular_costo_temporal(self, fecha_salida_temporal):
+	def calcular_costo_temporal(self, fecha_salida_temporal, tarifas=None):
 		"""Calcula el costo total basado en una fecha de salida temporal (sin modificar el registro)"""
 		if not self.fecha_entrada:
 			return 0.00
 		
-		# Verificar si la tarifa plena está activa
-		tarifa_plena = TarifaPlena.get_tarifa_actual()
-		
-		if tarifa_plena.activa:
-			# Si la tarifa plena está activa, usar costo fijo
-			return float(tarifa_plena.get_costo_por_tipo(self.tipo_vehiculo))
-		else:
-			# Si no, usar el cálculo por minutos normal
-			costos = Costo.get_costos_actuales()
-			# Calcular minutos temporalmente
-			delta = fecha_salida_temporal - self.fecha_entrada
-			tiempo_minutos = max(1, int(delta.total_seconds() // 60))
-			costo_por_minuto = costos.get_costo_por_tipo(self.tipo_vehiculo)
-			return float(costo_por_minuto) * tiempo_minutos
-	
-	def costo_formateado_temporal(self, fecha_salida_temporal):
+		tarifas = tarifas or get_tarifas()
+		delta = fecha_salida_temporal - self.fecha_entrada
+		return tarifas.calcular(self.tipo_vehiculo, int(delta.total_seconds() // 60))
+	
+	def costo_formateado_temporal(self, fecha_salida_temporal, tarifas=None):
 		"""Devuelve el costo temporal formateado como string"""
-		costo = self.calcular_costo_temporal(fecha_salida_temporal)
-		tarifa_plena = TarifaPlena.get_tarifa_actual()
-		
-		if tarifa_plena.activa:
-			return f"${costo:,.2f} (Tarifa Plena)"
-		else:
-			return f"${costo:,.2f}"
+		tarifas = tarifas or get_tarifas()
+		return tarifas.formatear(self.calcular_costo_temporal(fecha_salida_temporal, tarifas))
 	
 	def tiempo_por_costo(self):
 		"""Calcula la relación tiempo transcurrido dividido por el costo total"""
@@ -346,16 +201,7 @@ class Cliente(models.Model):
 		if not self.fecha_entrada:
 			return "Sin entrada"
 		
-		relacion = self.tiempo_por_costo()
-		if relacion == 0:
-			return "0 min/$"
-		
-		if relacion >= 1:
-			return f"{relacion:.1f} min/$"
-		else:
-			# Si es menos de 1 minuto por peso, mostrar como centavos por minuto
-			costo_por_minuto = 1 / relacion if relacion > 0 else 0
-			return f"${costo_por_minuto:.0f}/min"
+		return formatos.relacion_tiempo_costo(self.tiempo_en_minutos(), self.calcular_costo())
 	
 	def tarifa_completa(self):
 		"""Devuelve una tarifa completa con costo total y eficiencia"""
@@ -377,6 +223,20 @@ class Cliente(models.Model):
 		cedula = self.cedula or f'ID:{self.id}'
 		return f"{nombre} ({cedula}) - {self.matricula}"
 
+	class Meta:
+		indexes = [
+			# Vehículos en el parking (contadores, búsqueda de salida)
+			models.Index(fields=['fecha_entrada'], condition=models.Q(fecha_salida__isnull=True), name='cliente_activos_idx'),
+			# Salida por cédula: cedula=? AND fecha_salida IS NULL ORDER BY fecha_entrada DESC
+			models.Index(fields=['cedula', 'fecha_salida', 'fecha_entrada'], name='cliente_cedula_salida_idx'),
+			# Salida por matrícula (solo vehículos en el parking)
+			models.Index(fields=['matricula_normalizada', 'fecha_entrada'], condition=models.Q(fecha_salida__isnull=True), name='cliente_matricula_activa_idx'),
+			# Recaudación desde el último corte (solo vehículos que ya salieron)
+			models.Index(fields=['fecha_salida'], condition=models.Q(fecha_salida__isnull=False), name='cliente_fecha_salida_idx'),
+			# Entradas del día y listado ordenado por entrada
+			models.Index(fields=['fecha_entrada'], name='cliente_fecha_entrada_idx'),
+		]
+
 
 class Perfil(models.Model):
 	ROLES_CHOICES = [
@@ -480,6 +340,9 @@ class Visitante(models.Model):
 		verbose_name = 'Visitante'
 		verbose_name_plural = 'Visitantes'
 		ordering = ['-fecha_registro']
+		indexes = [
+			models.Index(fields=['fecha_registro'], name='visitante_fecha_registro_idx'),
+		]
 
 
 class Costo(models.Model):
@@ -597,6 +460,99 @@ class TarifaPlena(models.Model):
 		verbose_name_plural = 'Tarifa Plena'
 
 
+class ParqueaderoLleno(Exception):
+	"""No quedan cupos para el tipo de vehículo solicitado"""
+
+
+class CapacidadParqueadero(models.Model):
+	"""Capacidad y ocupación actual del parqueadero por tipo de vehículo"""
+	tipo_vehiculo = models.CharField(
+		max_length=10,
+		choices=Cliente.TIPO_VEHICULO_CHOICES,
+		unique=True,
+		verbose_name="Tipo de vehículo"
+	)
+	capacidad = models.PositiveIntegerField(
+		null=True,
+		blank=True,
+		verbose_name="Capacidad",
+		help_text="Cantidad máxima de vehículos de este tipo. Vacío = sin límite"
+	)
+	ocupados = models.PositiveIntegerField(
+		default=0,
+		verbose_name="Cupos ocupados",
+		help_text="Se actualiza automáticamente con cada entrada y salida"
+	)
+	fecha_actualizacion = models.DateTimeField(auto_now=True)
+	
+	def __str__(self):
+		capacidad = self.capacidad if self.capacidad is not None else '∞'
+		return f"{self.tipo_vehiculo}: {self.ocupados}/{capacidad}"
+	
+	def disponibles(self):
+		"""Cupos libres (None si no hay límite)"""
+		if self.capacidad is None:
+			return None
+		return max(0, self.capacidad - self.ocupados)
+	
+	def esta_lleno(self):
+		return self.capacidad is not None and self.ocupados >= self.capacidad
+	
+	@classmethod
+	def ocupar(cls, tipo_vehiculo):
+		"""Reserva un cupo con un UPDATE condicional; devuelve False si no hay cupo"""
+		actualizados = cls.objects.filter(tipo_vehiculo=tipo_vehiculo).filter(
+			models.Q(capacidad__isnull=True) | models.Q(ocupados__lt=models.F('capacidad'))
+		).update(ocupados=models.F('ocupados') + 1)
+		if actualizados:
+			return True
+		# Un tipo sin configuración no tiene límite
+		return not cls.objects.filter(tipo_vehiculo=tipo_vehiculo).exists()
+	
+	@classmethod
+	def liberar(cls, tipo_vehiculo):
+		"""Libera un cupo al registrar la salida de un vehículo"""
+		cls.objects.filter(tipo_vehiculo=tipo_vehiculo, ocupados__gt=0).update(
+			ocupados=models.F('ocupados') - 1
+		)
+	
+	@classmethod
+	def sincronizar(cls):
+		"""Recalcula la ocupación contando los vehículos activos (corrige desvíos)"""
+		activos = dict(
+			Cliente.objects.filter(fecha_salida__isnull=True)
+			.values_list('tipo_vehiculo')
+			.annotate(total=models.Count('id'))
+		)
+		for tipo, _ in Cliente.TIPO_VEHICULO_CHOICES:
+			cls.objects.update_or_create(
+				tipo_vehiculo=tipo,
+				defaults={'ocupados': activos.get(tipo, 0)}
+			)
+	
+	@classmethod
+	def estado(cls):
+		"""Ocupación de todos los tipos de vehículo lista para serializar"""
+		tipos = []
+		for capacidad in cls.objects.order_by('tipo_vehiculo'):
+			tipos.append({
+				'tipo_vehiculo': capacidad.tipo_vehiculo,
+				'capacidad': capacidad.capacidad,
+				'ocupados': capacidad.ocupados,
+				'disponibles': capacidad.disponibles(),
+				'lleno': capacidad.esta_lleno(),
+			})
+		return tipos
+	
+	class Meta:
+		verbose_name = 'Capacidad del Parqueadero'
+		verbose_name_plural = 'Capacidad del Parqueadero'
+
+
+# Clave del lock de PostgreSQL (pg_advisory_xact_lock) que serializa los cortes
+LOCK_CORTE = 20250904
+
+
 class Recaudacion(models.Model):
 	"""Modelo para registrar los cortes de recaudación del parking"""
 	usuario = models.ForeignKey(
@@ -635,6 +591,11 @@ class Recaudacion(models.Model):
 		verbose_name="Observaciones",
 		help_text="Observaciones adicionales sobre el corte"
 	)
+	detalle_guardado = models.BooleanField(
+		default=False,
+		editable=False,
+		help_text="Si las líneas del corte ya están guardadas en RecaudacionDetalle"
+	)
 	
 	def __str__(self):
 		return f"Corte {self.id} - ${self.monto_recaudado:,.2f} ({self.fecha_corte.strftime('%d/%m/%Y %H:%M')})"
@@ -658,13 +619,16 @@ class Recaudacion(models.Model):
 		if fecha_ultimo_corte:
 			clientes_query = clientes_query.filter(fecha_salida__gt=fecha_ultimo_corte)
 		
-		# Calcular el total recaudado
-		total_recaudado = 0
-		numero_clientes = 0
-		
-		for cliente in clientes_query:
-			total_recaudado += cliente.calcular_costo()
-			numero_clientes += 1
+		# Calcular el total recaudado en la base de datos (una sola consulta)
+		# Los clientes con cobro registrado suman el monto guardado; los antiguos sin
+		# cobro (aún no migrados con backfill_cobros) se calculan con las tarifas vigentes
+		costo = Coalesce('monto_cobrado', get_tarifas().expresion_costo())
+		totales = clientes_query.aggregate(
+			total=models.Sum(costo),
+			numero_clientes=models.Count('id'),
+		)
+		total_recaudado = float(totales['total'] or 0)
+		numero_clientes = totales['numero_clientes']
 		
 		fecha_inicio = fecha_ultimo_corte or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
 		
@@ -676,31 +640,147 @@ class Recaudacion(models.Model):
 			'clientes': clientes_query
 		}
 	
+	@classmethod
+	def realizar_corte(cls, usuario, observaciones=''):
+		"""Crea el corte de lo recaudado desde el último y guarda su detalle (None si no hay nada que cortar)"""
+		from . import metricas
+		with transaction.atomic():
+			# Un corte a la vez: en SQLite lo asegura la transacción IMMEDIATE y en
+			# PostgreSQL un lock de la transacción, para no cortar dos veces el mismo período
+			if connection.vendor == 'postgresql':
+				with connection.cursor() as cursor:
+					cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_CORTE])
+			datos = cls.calcular_recaudacion_actual()
+			if datos['monto_total'] <= 0:
+				return None
+			
+			corte = cls.objects.create(
+				usuario=usuario,
+				monto_recaudado=datos['monto_total'],
+				fecha_inicio=datos['fecha_inicio'],
+				fecha_fin=datos['fecha_actual'],
+				numero_clientes=datos['numero_clientes'],
+				observaciones=observaciones
+			)
+			detalles = corte.guardar_detalles(datos['clientes'].filter(fecha_salida__lte=corte.fecha_fin))
+			
+			# El encabezado cuadra con las líneas guardadas aunque alguien salga mientras tanto
+			corte.monto_recaudado = sum((detalle.costo for detalle in detalles), Decimal('0'))
+			corte.numero_clientes = len(detalles)
+			corte.save(update_fields=['monto_recaudado', 'numero_clientes'])
+			transaction.on_commit(lambda: metricas.contar_corte(corte))
+		return corte
+	
+	def guardar_detalles(self, clientes=None):
+		"""Guarda una línea por cliente del período con el tiempo y el costo de ese momento"""
+		if clientes is None:
+			clientes = Cliente.objects.filter(
+				fecha_salida__gte=self.fecha_inicio,
+				fecha_salida__lte=self.fecha_fin
+			)
+		
+		with transaction.atomic():
+			# Los cortes antiguos se completan al verlos (un GET): con el corte bloqueado
+			# dos vistas simultáneas no duplican líneas, y si algo falla no queda a medias.
+			# En SQLite la transacción IMMEDIATE ya serializa y select_for_update no aplica
+			bloqueado = Recaudacion.objects.select_for_update().only('detalle_guardado').get(pk=self.pk)
+			if bloqueado.detalle_guardado:
+				self.detalle_guardado = True
+				return list(self.detalles.all())
+			
+			tarifas = get_tarifas()
+			detalles = []
+			for cliente in clientes.order_by('fecha_salida', 'id').defer('qr_image').iterator(chunk_size=1000):
+				# El cobro guardado en la salida; los registros sin cobro usan las tarifas de este momento
+				costo = Decimal(str(cliente.calcular_costo(tarifas))).quantize(Decimal('0.01'))
+				detalles.append(RecaudacionDetalle(
+					recaudacion=self,
+					cliente=cliente,
+					nombre=cliente.get_display_name(),
+					cedula=cliente.get_display_cedula(),
+					matricula=cliente.matricula,
+					tipo_vehiculo=cliente.get_tipo_vehiculo_display(),
+					fecha_entrada=cliente.fecha_entrada,
+					fecha_salida=cliente.fecha_salida,
+					tiempo_parking=cliente.tiempo_formateado(),
+					costo=costo,
+					tarifa_plena=cliente.es_tarifa_plena(tarifas),
+				))
+			
+			RecaudacionDetalle.objects.bulk_create(detalles, batch_size=500)
+			Recaudacion.objects.filter(pk=self.pk).update(detalle_guardado=True)
+		self.detalle_guardado = True
+		return detalles
+	
 	def get_clientes_atendidos(self):
 		"""Obtiene los clientes atendidos en el período de este corte"""
-		clientes = Cliente.objects.filter(
-			fecha_salida__gte=self.fecha_inicio,
-			fecha_salida__lte=self.fecha_fin
-		).order_by('fecha_salida')
-		
-		clientes_data = []
-		for cliente in clientes:
-			clientes_data.append({
-				'id': cliente.id,
-				'nombre': cliente.get_display_name(),
-				'cedula': cliente.get_display_cedula(),
-				'matricula': cliente.matricula,
-				'tipo_vehiculo': cliente.get_tipo_vehiculo_display(),
-				'fecha_entrada': cliente.fecha_entrada.strftime('%d/%m/%Y %H:%M') if cliente.fecha_entrada else 'No registrada',
-				'fecha_salida': cliente.fecha_salida.strftime('%d/%m/%Y %H:%M') if cliente.fecha_salida else 'No registrada',
-				'tiempo_parking': cliente.tiempo_formateado(),
-				'costo': float(cliente.calcular_costo()),
-				'costo_formateado': cliente.costo_formateado(),
-			})
-		
-		return clientes_data
+		if not self.detalle_guardado:
+			# Cortes anteriores al detalle: se calcula y guarda la primera vez
+			self.guardar_detalles()
+		return [detalle.como_dict() for detalle in self.detalles.all()]
 	
 	class Meta:
 		verbose_name = 'Recaudación'
 		verbose_name_plural = 'Recaudaciones'
 		ordering = ['-fecha_corte']
+
+
+class RecaudacionDetalle(models.Model):
+	"""Línea de un corte: el cliente atendido tal como quedó cobrado al hacer el corte"""
+	recaudacion = models.ForeignKey(
+		Recaudacion,
+		on_delete=models.CASCADE,
+		related_name='detalles',
+		verbose_name="Corte"
+	)
+	cliente = models.ForeignKey(
+		Cliente,
+		on_delete=models.SET_NULL,
+		null=True,
+		blank=True,
+		related_name='+',
+		verbose_name="Cliente",
+		help_text="Registro original (queda vacío si el cliente se elimina)"
+	)
+	nombre = models.CharField(max_length=100, verbose_name="Nombre")
+	cedula = models.CharField(max_length=20, verbose_name="Cédula")
+	matricula = models.CharField(max_length=20, verbose_name="Matrícula")
+	tipo_vehiculo = models.CharField(max_length=20, verbose_name="Tipo de vehículo")
+	fecha_entrada = models.DateTimeField(null=True, blank=True, verbose_name="Entrada")
+	fecha_salida = models.DateTimeField(null=True, blank=True, verbose_name="Salida")
+	tiempo_parking = models.CharField(max_length=30, verbose_name="Tiempo")
+	costo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Costo")
+	tarifa_plena = models.BooleanField(default=False, verbose_name="Tarifa plena")
+	
+	def __str__(self):
+		return f"{self.matricula} - ${self.costo:,.2f} (corte {self.recaudacion_id})"
+	
+	def como_dict(self):
+		"""Datos de la línea para las respuestas JSON"""
+		def fecha(valor):
+			return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else 'No registrada'
+		
+		return {
+			'id': self.cliente_id,
+			'nombre': self.nombre,
+			'cedula': self.cedula,
+			'matricula': self.matricula,
+			'tipo_vehiculo': self.tipo_vehiculo,
+			'fecha_entrada': fecha(self.fecha_entrada),
+			'fecha_salida': fecha(self.fecha_salida),
+			'tiempo_parking': self.tiempo_parking,
+			'costo': float(self.costo),
+			'costo_formateado': formatear_costo(float(self.costo), self.tarifa_plena),
+		}
+	
+	class Meta:
+		verbose_name = 'Detalle de recaudación'
+		verbose_name_plural = 'Detalles de recaudación'
+		ordering = ['fecha_salida', 'id']
+		indexes = [
+			models.Index(fields=['recaudacion', 'fecha_salida', 'id'], name='detalle_corte_salida_idx'),
+		]
+		constraints = [
+			# Un cliente aparece una sola vez por corte aunque el detalle se guarde dos veces
+			models.UniqueConstraint(fields=['recaudacion', 'cliente'], name='detalle_corte_cliente_unico'),
+		]
@@ -0,0 +1,150 @@
+"""
+Paginación por cursor (keyset) para las listas de clientes y visitantes.
+
+``Paginator`` cuenta todo el conjunto filtrado y salta filas con ``OFFSET``,
+así que cada página es más lenta que la anterior. Aquí cada página continúa
+desde la última fila de la anterior: ``WHERE (fecha, id) < (?, ?)`` sobre el
+índice de la fecha, y la página 500 cuesta lo mismo que la primera.
+
+El orden es por fecha descendente y luego id. Las filas sin fecha van al
+final, como un tramo aparte que solo se consulta al llegar al fin del
+historial. Los cursores son tokens firmados con la posición y la dirección;
+un token inválido muestra la primera página.
+
+El total es aproximado: se cuentan hasta ``LIMITE_CONTEO`` filas y por encima
+se informa "más de".
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+
+SALT = 'app_page.paginacion'
+
+LIMITE_CONTEO = getattr(settings, 'PAGINACION_LIMITE_CONTEO', 1000)
+
+SIGUIENTE = 's'
+ANTERIOR = 'a'
+
+
+class PaginaCursor:
+    """Página de resultados con los cursores de la siguiente y la anterior"""
+
+    def __init__(self, object_list, siguiente, anterior, total, total_exacto):
+        self.object_list = object_list
+        self.next_cursor = siguiente
+        self.previous_cursor = anterior
+        self.last_cursor = _firmar(ANTERIOR, None, None) if siguiente else None
+        self.total = total
+        self.total_exacto = total_exacto
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _firmar(direccion, valor, pk):
+    return signing.dumps(
+        [direccion, valor.isoformat() if valor is not None else None, pk],
+        salt=SALT, compress=True,
+    )
+
+
+def _leer(cursor):
+    """(dirección, valor, pk) del cursor o None si falta o no es válido"""
+    if not cursor:
+        return None
+    try:
+        direccion, valor, pk = signing.loads(cursor, salt=SALT)
+        if direccion not in (SIGUIENTE, ANTERIOR):
+            return None
+        return direccion, datetime.fromisoformat(valor) if valor else None, pk
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def _tramos(queryset, campo):
+    """(filas con fecha, filas sin fecha o None si el campo no admite NULL)"""
+    if not queryset.model._meta.get_field(campo).null:
+        return queryset, None
+    return queryset.filter(**{f'{campo}__isnull': False}), queryset.filter(**{f'{campo}__isnull': True})
+
+
+def _siguientes(queryset, campo, valor, pk, cantidad):
+    """Hasta ``cantidad`` filas después de (valor, pk) en el orden de la lista"""
+    con_valor, sin_valor = _tramos(queryset, campo)
+    filas = []
+    if valor is not None or pk is None:
+        if pk is not None:
+            # El <= acota el recorrido del índice; el OR solo desempata la misma fecha
+            con_valor = con_valor.filter(
+                Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'pk__lt': pk}),
+                **{f'{campo}__lte': valor},
+            )
+        filas = list(con_valor.order_by(f'-{campo}', '-pk')[:cantidad])
+    if len(filas) < cantidad and sin_valor is not None:
+        if valor is None and pk is not None:
+            sin_valor = sin_valor.filter(pk__lt=pk)
+        filas += list(sin_valor.order_by('-pk')[:cantidad - len(filas)])
+    return filas
+
+
+def _anteriores(queryset, campo, valor, pk, cantidad):
+    """Hasta ``cantidad`` filas antes de (valor, pk); sin posición, las últimas de la lista"""
+    con_valor, sin_valor = _tramos(queryset, campo)
+    filas = []
+    if valor is None and sin_valor is not None:
+        if pk is not None:
+            sin_valor = sin_valor.filter(pk__gt=pk)
+        filas = list(sin_valor.order_by('pk')[:cantidad])
+    if len(filas) < cantidad:
+        if valor is not None:
+            con_valor = con_valor.filter(
+                Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk}),
+                **{f'{campo}__gte': valor},
+            )
+        filas += list(con_valor.order_by(campo, 'pk')[:cantidad - len(filas)])
+    filas.reverse()
+    return filas
+
+
+def paginar(queryset, campo, cursor=None, por_pagina=10):
+    """Página de ``queryset`` ordenada por ``campo`` (descendente) e id a partir de ``cursor``"""
+    posicion = _leer(cursor)
+
+    if posicion and posicion[0] == ANTERIOR:
+        _, valor, pk = posicion
+        filas = _anteriores(queryset, campo, valor, pk, por_pagina + 1)
+        hay_anterior = len(filas) > por_pagina
+        filas = filas[-por_pagina:]
+        # Sin posición es la última página
+        hay_siguiente = pk is not None
+    else:
+        valor, pk = posicion[1:] if posicion else (None, None)
+        filas = _siguientes(queryset, campo, valor, pk, por_pagina + 1)
+        hay_siguiente = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        hay_anterior = posicion is not None
+
+    siguiente = anterior = None
+    if filas:
+        if hay_siguiente:
+            siguiente = _firmar(SIGUIENTE, getattr(filas[-1], campo), filas[-1].pk)
+        if hay_anterior:
+            anterior = _firmar(ANTERIOR, getattr(filas[0], campo), filas[0].pk)
+
+    total = queryset.order_by()[:LIMITE_CONTEO + 1].count()
+    return PaginaCursor(filas, siguiente, anterior, min(total, LIMITE_CONTEO), total <= LIMITE_CONTEO)
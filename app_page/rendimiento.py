@@ -0,0 +1,218 @@
+"""
+Medición de cada petición: consultas, tiempo de BD, de plantillas y tamaño.
+
+``MedicionRendimientoMiddleware`` (activo con ``RENDIMIENTO_ACTIVO``, por
+defecto igual a ``DEBUG``) mide cada petición y:
+
+- agrega el encabezado ``Server-Timing`` (visible en la pestaña de red del
+  navegador) solo a las respuestas del personal (``is_staff``), para no
+  mostrar a cualquiera cuántas consultas y cuánto tarda cada vista: ``bd``
+  con el número de consultas, ``plantilla`` y ``total``. El tiempo de
+  plantilla incluye las consultas que se hacen al renderizar, así que los
+  valores se solapan;
+- registra con ``logger.warning`` las peticiones que pasan alguno de los
+  límites de ``RENDIMIENTO_LIMITES`` (o de ``RENDIMIENTO_LIMITES_POR_VISTA``
+  para un nombre de URL);
+- acumula estadísticas por nombre de URL que muestra ``/rendimiento/``
+  (solo administradores).
+
+Las consultas se cuentan con ``connection.execute_wrapper`` y las plantillas
+envolviendo ``render`` de los backends Django y Jinja2 (solo la plantilla de
+primer nivel, los ``include`` quedan dentro). Las estadísticas viven en la
+memoria del proceso: con varios workers cada uno muestra las peticiones que
+atendió.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LIMITES = {
+    'consultas': 50,
+    'bd_ms': 250,
+    'plantilla_ms': 250,
+    'total_ms': 1000,
+    'bytes': 1_000_000,
+}
+
+_medicion_actual = ContextVar('medicion_rendimiento', default=None)
+
+_estadisticas = {}
+_estadisticas_desde = timezone.now()
+_lock = threading.Lock()
+_plantillas_instaladas = False
+
+
+class Medicion:
+    """Acumuladores de una petición"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.bd = 0.0
+        self.plantilla = 0.0
+        self.profundidad_plantilla = 0
+
+    def medir_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.bd += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _envolver_render(render):
+    def render_medido(self, *args, **kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return render(self, *args, **kwargs)
+        medicion.profundidad_plantilla += 1
+        inicio = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            medicion.profundidad_plantilla -= 1
+            if medicion.profundidad_plantilla == 0:
+                medicion.plantilla += time.perf_counter() - inicio
+    render_medido.medicion_rendimiento = True
+    return render_medido
+
+
+def _instalar_medicion_plantillas():
+    """Envuelve ``Template.render`` de los backends de plantillas (una vez por proceso)"""
+    global _plantillas_instaladas
+    if _plantillas_instaladas:
+        return
+    from django.template.backends import django as backend_django
+    clases = [backend_django.Template]
+    try:
+        from django.template.backends import jinja2 as backend_jinja2
+        clases.append(backend_jinja2.Template)
+    except ImportError:
+        pass
+    for clase in clases:
+        if not getattr(clase.render, 'medicion_rendimiento', False):
+            clase.render = _envolver_render(clase.render)
+    _plantillas_instaladas = True
+
+
+def limites(nombre_url):
+    """Límites de una vista: los generales con los propios de su nombre de URL encima"""
+    generales = {**LIMITES, **getattr(settings, 'RENDIMIENTO_LIMITES', {})}
+    return {**generales, **getattr(settings, 'RENDIMIENTO_LIMITES_POR_VISTA', {}).get(nombre_url, {})}
+
+
+def _acumular(nombre_url, valores, excedida):
+    with _lock:
+        datos = _estadisticas.setdefault(nombre_url, {
+            'peticiones': 0, 'excedidas': 0, 'consultas': 0, 'max_consultas': 0,
+            'bd_ms': 0.0, 'plantilla_ms': 0.0, 'total_ms': 0.0, 'max_total_ms': 0.0, 'bytes': 0,
+        })
+        datos['peticiones'] += 1
+        datos['excedidas'] += int(excedida)
+        datos['consultas'] += valores['consultas']
+        datos['max_consultas'] = max(datos['max_consultas'], valores['consultas'])
+        datos['bd_ms'] += valores['bd_ms']
+        datos['plantilla_ms'] += valores['plantilla_ms']
+        datos['total_ms'] += valores['total_ms']
+        datos['max_total_ms'] = max(datos['max_total_ms'], valores['total_ms'])
+        datos['bytes'] += valores['bytes'] or 0
+
+
+def estadisticas():
+    """Resumen por nombre de URL, las vistas con más tiempo acumulado primero"""
+    with _lock:
+        copia = {nombre: dict(datos) for nombre, datos in _estadisticas.items()}
+    vistas = []
+    for nombre, datos in copia.items():
+        peticiones = datos['peticiones']
+        vistas.append({
+            'vista': nombre,
+            'peticiones': peticiones,
+            'excedidas': datos['excedidas'],
+            'consultas_promedio': round(datos['consultas'] / peticiones, 1),
+            'consultas_max': datos['max_consultas'],
+            'bd_ms_promedio': round(datos['bd_ms'] / peticiones, 1),
+            'plantilla_ms_promedio': round(datos['plantilla_ms'] / peticiones, 1),
+            'total_ms_promedio': round(datos['total_ms'] / peticiones, 1),
+            'total_ms_max': round(datos['max_total_ms'], 1),
+            'total_ms_acumulado': round(datos['total_ms'], 1),
+            'bytes_promedio': round(datos['bytes'] / peticiones),
+        })
+    vistas.sort(key=lambda vista: vista['total_ms_acumulado'], reverse=True)
+    return {'proceso': os.getpid(), 'desde': _estadisticas_desde.isoformat(), 'vistas': vistas}
+
+
+def reiniciar():
+    """Descarta las estadísticas acumuladas"""
+    global _estadisticas_desde
+    with _lock:
+        _estadisticas.clear()
+        _estadisticas_desde = timezone.now()
+
+
+def _ve_server_timing(request):
+    """Solo el personal (``is_staff``) recibe ``Server-Timing``; el usuario ya está cargado, sin otra consulta"""
+    usuario = getattr(request, 'user', None)
+    return usuario is not None and usuario.is_authenticated and usuario.is_staff
+
+
+class MedicionRendimientoMiddleware:
+    """Mide consultas, BD, plantillas y tamaño de cada petición (ver el módulo)"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RENDIMIENTO_ACTIVO', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        _instalar_medicion_plantillas()
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as pila:
+                for connection in connections.all():
+                    pila.enter_context(connection.execute_wrapper(medicion.medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        nombre_url = (match.view_name if match else None) or '<sin ruta>'
+        valores = {
+            'consultas': medicion.consultas,
+            'bd_ms': medicion.bd * 1000,
+            'plantilla_ms': medicion.plantilla * 1000,
+            'total_ms': total * 1000,
+            # Las respuestas en streaming (eventos) no tienen tamaño conocido
+            'bytes': None if response.streaming else len(response.content),
+        }
+
+        excedidos = [
+            f"{clave}={valores[clave]:.0f} (límite {limite})"
+            for clave, limite in limites(nombre_url).items()
+            if limite is not None and valores.get(clave) is not None and valores[clave] > limite
+        ]
+        if excedidos:
+            logger.warning(f"Petición lenta {request.method} {request.path} [{nombre_url}]: {', '.join(excedidos)}")
+        _acumular(nombre_url, valores, bool(excedidos))
+
+        if _ve_server_timing(request):
+            response['Server-Timing'] = (
+                f'bd;dur={valores["bd_ms"]:.1f};desc="{medicion.consultas} consultas", '
+                f'plantilla;dur={valores["plantilla_ms"]:.1f}, '
+                f'total;dur={valores["total_ms"]:.1f}'
+            )
+        return response
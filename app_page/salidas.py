@@ -0,0 +1,96 @@
+"""
+Búsqueda del vehículo en el parking a partir del código leído en la salida.
+
+En la portería se escanea el QR del ticket (el id del cliente) o se digita la
+cédula o la matrícula. Todas las vistas de salida resuelven el código con
+``buscar_cliente_activo``: una sola consulta sobre los vehículos sin salida
+que prueba los tres tipos de código a la vez (una rama por columna, cada una
+sobre su índice). Si el código coincide con varios, gana el id, después la
+cédula y por último la matrícula; entre registros del mismo tipo, la entrada
+más reciente.
+
+La matrícula se compara normalizada (mayúsculas, sin espacios ni guiones),
+así ``abc 123``, ``ABC-123`` y ``abc123`` encuentran el mismo vehículo.
+``Cliente.save`` mantiene la columna ``matricula_normalizada``.
+
+La salida se confirma con ``confirmar_salida``: un ``UPDATE`` condicionado a
+``fecha_salida IS NULL`` que escribe la fecha y el cobro a la vez. Si dos
+guardias confirman el mismo ticket al mismo tiempo, solo una actualización
+afecta la fila; la otra recibe "ya tiene salida" y no pisa la hora ni libera
+el cupo dos veces.
+"""
+
+import re
+
+from django.db import transaction
+from django.db.models import Value
+
+# Ids mayores no caben en un entero de 64 bits (no son un id, pueden ser cédula)
+MAX_DIGITOS_ID = 18
+
+PRIORIDAD_ID = 0
+PRIORIDAD_CEDULA = 1
+PRIORIDAD_MATRICULA = 2
+
+# Columnas que escribe la confirmación de salida (el resto de la fila no se toca)
+CAMPOS_SALIDA = ('fecha_salida', 'monto_cobrado', 'minutos_cobrados', 'tarifa_aplicada', 'tarifa_plena_aplicada')
+
+
+def normalizar_matricula(matricula):
+    """Matrícula en mayúsculas y sin separadores ('abc 123' -> 'ABC123')"""
+    return re.sub(r'[\W_]+', '', (matricula or '').upper())
+
+
+def buscar_cliente_activo(codigo):
+    """Cliente sin salida cuyo id, cédula o matrícula coincide con ``codigo`` (o None)"""
+    from .models import Cliente
+
+    codigo = (codigo or '').strip()
+    if not codigo:
+        return None
+
+    activos = Cliente.objects.filter(fecha_salida__isnull=True)
+    candidatos = [
+        activos.filter(cedula=codigo).annotate(prioridad_salida=Value(PRIORIDAD_CEDULA)),
+    ]
+    if codigo.isascii() and codigo.isdigit() and len(codigo) <= MAX_DIGITOS_ID:
+        candidatos.insert(0, activos.filter(id=int(codigo)).annotate(prioridad_salida=Value(PRIORIDAD_ID)))
+    matricula = normalizar_matricula(codigo)
+    if matricula:
+        candidatos.append(
+            activos.filter(matricula_normalizada=matricula).annotate(prioridad_salida=Value(PRIORIDAD_MATRICULA))
+        )
+
+    # UNION ALL en lugar de OR: con OR SQLite recorre todos los vehículos activos,
+    # con la unión cada rama busca directo en su índice
+    consulta = candidatos[0].union(*candidatos[1:], all=True) if len(candidatos) > 1 else candidatos[0]
+    return consulta.order_by('prioridad_salida', '-fecha_entrada').first()
+
+
+def confirmar_salida(cliente, tarifas=None, fecha_salida=None):
+    """
+    Registra la salida y el cobro de ``cliente`` si sigue en el parking.
+
+    Devuelve True si esta llamada registró la salida. Si otra petición ya la
+    había registrado devuelve False y recarga en ``cliente`` la salida y el
+    cobro guardados.
+    """
+    from . import estadisticas, eventos, metricas
+    from .models import CapacidadParqueadero, Cliente
+
+    cliente.registrar_salida(fecha_salida=fecha_salida, tarifas=tarifas)
+    with transaction.atomic():
+        actualizados = Cliente.objects.filter(pk=cliente.pk, fecha_salida__isnull=True).update(
+            **{campo: getattr(cliente, campo) for campo in CAMPOS_SALIDA}
+        )
+        if actualizados:
+            CapacidadParqueadero.liberar(cliente.tipo_vehiculo)
+            # Igual que en signals.py: si la transacción del llamador se revierte no hubo salida
+            transaction.on_commit(estadisticas.contar_salida)
+            transaction.on_commit(lambda: eventos.publicar_salida(cliente))
+            transaction.on_commit(lambda: metricas.contar_salida(cliente))
+
+    if not actualizados:
+        cliente.refresh_from_db(fields=CAMPOS_SALIDA)
+        return False
+    return True
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, post_migrate
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Perfil
+from .models import Perfil, Costo, TarifaPlena, Cliente, Visitante, CapacidadParqueadero
+from .tarifas import invalidar_tarifas
+from . import busqueda, estadisticas, eventos, metricas
 
 @receiver(post_save, sender=User)
 def crear_perfil_usuario(sender, instance, created, **kwargs):
@@ -14,3 +18,50 @@ def guardar_perfil_usuario(sender, instance, **kwargs):
     """Guardar el perfil cuando se guarda el usuario"""
     if hasattr(instance, 'perfil'):
         instance.perfil.save()
+
+@receiver(post_save, sender=Costo)
+@receiver(post_delete, sender=Costo)
+@receiver(post_save, sender=TarifaPlena)
+@receiver(post_delete, sender=TarifaPlena)
+def invalidar_snapshot_tarifas(sender, **kwargs):
+    """Descartar el snapshot de tarifas cuando cambian costos o tarifa plena"""
+    invalidar_tarifas()
+
+@receiver(post_save, sender=TarifaPlena)
+def notificar_tarifa_plena(sender, instance, **kwargs):
+    """Avisar a los paneles conectados que cambió la tarifa plena"""
+    transaction.on_commit(lambda: eventos.publicar_tarifa_plena(instance))
+
+@receiver(post_save, sender=Cliente)
+def contar_cliente_nuevo(sender, instance, created, **kwargs):
+    """Actualizar los contadores de la barra de navegación al registrar una entrada"""
+    if created:
+        transaction.on_commit(lambda: estadisticas.contar_entrada(instance))
+        transaction.on_commit(lambda: eventos.publicar_entrada(instance))
+        transaction.on_commit(lambda: metricas.contar_entrada(instance))
+
+@receiver(post_delete, sender=Cliente)
+def descontar_cliente_eliminado(sender, instance, **kwargs):
+    """Actualizar los contadores de la barra de navegación al eliminar un cliente"""
+    transaction.on_commit(lambda: estadisticas.descontar_cliente(instance))
+    # Un vehículo activo eliminado deja libre su cupo
+    if instance.fecha_salida is None:
+        CapacidadParqueadero.liberar(instance.tipo_vehiculo)
+        transaction.on_commit(lambda: eventos.publicar_ocupacion(instance.tipo_vehiculo, -1))
+
+@receiver(post_save, sender=Visitante)
+def contar_visitante_nuevo(sender, instance, created, **kwargs):
+    """Actualizar el contador de visitantes del día"""
+    if created:
+        transaction.on_commit(lambda: estadisticas.contar_visitante(instance))
+
+@receiver(post_delete, sender=Visitante)
+def descontar_visitante_eliminado(sender, instance, **kwargs):
+    """Actualizar el contador de visitantes del día al eliminar un visitante"""
+    transaction.on_commit(lambda: estadisticas.contar_visitante(instance, delta=-1))
+
+@receiver(post_migrate)
+def reinstalar_indice_busqueda(sender, using, **kwargs):
+    """Recrea los triggers de búsqueda si una migración reconstruyó la tabla (SQLite)"""
+    if sender.name == 'app_page':
+        busqueda.instalar(connections[using])
@@ -0,0 +1,196 @@
+"""
+Snapshot de tarifas del parking (costos por minuto y tarifa plena).
+
+Los métodos de cálculo de ``Cliente`` se invocan varias veces por fila al
+renderizar listas y al registrar salidas. En lugar de consultar ``Costo`` y
+``TarifaPlena`` en cada llamada, se construye un objeto inmutable con todos
+los valores vigentes y se guarda en memoria del proceso y en el cache de
+Django. Los signals de ``post_save``/``post_delete`` invalidan ambos niveles.
+
+El snapshot lleva la versión de las tarifas (``fecha_actualizacion`` de
+``Costo`` y ``TarifaPlena``). Con varios workers el signal solo invalida el
+proceso que guardó el cambio (y el cache, si es compartido), así que cada
+proceso compara su versión con la de la base de datos cada ``LOCAL_TTL``
+segundos con una consulta liviana y recarga si cambió.
+"""
+
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models.functions import Greatest
+
+CACHE_KEY = 'app_page_tarifas_snapshot'
+
+# Segundos que un proceso reutiliza su copia local sin verificar la versión en
+# la base de datos (lo máximo que tarda otro worker en cobrar con una tarifa nueva)
+LOCAL_TTL = getattr(settings, 'TARIFAS_CACHE_LOCAL_TTL', 5)
+
+_snapshot_local = None
+_snapshot_local_expira = 0.0
+
+
+@dataclass(frozen=True)
+class TarifaSnapshot:
+    """Valores de tarifa vigentes en un momento dado"""
+    costo_auto: Decimal
+    costo_moto: Decimal
+    tarifa_plena_activa: bool
+    costo_fijo_auto: Decimal
+    costo_fijo_moto: Decimal
+
+    def costo_por_minuto(self, tipo_vehiculo):
+        """Costo por minuto según el tipo de vehículo (Auto por defecto)"""
+        if (tipo_vehiculo or '').lower() == 'moto':
+            return self.costo_moto
+        return self.costo_auto
+
+    def costo_fijo(self, tipo_vehiculo):
+        """Costo fijo de tarifa plena según el tipo de vehículo (Auto por defecto)"""
+        if (tipo_vehiculo or '').lower() == 'moto':
+            return self.costo_fijo_moto
+        return self.costo_fijo_auto
+
+    def calcular(self, tipo_vehiculo, minutos):
+        """Calcula el costo para una estadía de ``minutos`` (mínimo 1 minuto)"""
+        if self.tarifa_plena_activa:
+            return float(self.costo_fijo(tipo_vehiculo))
+        return float(self.costo_por_minuto(tipo_vehiculo)) * max(1, minutos)
+
+    def formatear(self, costo):
+        """Formatea un costo indicando si se aplicó tarifa plena"""
+        return formatear_costo(costo, self.tarifa_plena_activa)
+
+    def cobro(self, tipo_vehiculo, minutos):
+        """Devuelve (monto, tarifa aplicada, minutos facturados) como Decimal/int"""
+        minutos_cobrados = max(1, minutos)
+        if self.tarifa_plena_activa:
+            tarifa = self.costo_fijo(tipo_vehiculo)
+            monto = tarifa
+        else:
+            tarifa = self.costo_por_minuto(tipo_vehiculo)
+            monto = tarifa * minutos_cobrados
+        return monto.quantize(Decimal('0.01')), tarifa, minutos_cobrados
+
+    def expresion_costo(self):
+        """Expresión SQL equivalente a ``calcular`` para usar en anotaciones/agregados"""
+        salida = models.DecimalField(max_digits=14, decimal_places=2)
+
+        def por_tipo(costo_auto, costo_moto):
+            return models.Case(
+                models.When(tipo_vehiculo__iexact='moto', then=models.Value(costo_moto)),
+                default=models.Value(costo_auto),
+                output_field=salida,
+            )
+
+        if self.tarifa_plena_activa:
+            costo = por_tipo(self.costo_fijo_auto, self.costo_fijo_moto)
+        else:
+            minutos = Greatest(MinutosEstadia('fecha_entrada', 'fecha_salida'), models.Value(1))
+            costo = models.ExpressionWrapper(
+                minutos * por_tipo(self.costo_auto, self.costo_moto),
+                output_field=salida,
+            )
+
+        return models.Case(
+            models.When(fecha_entrada__isnull=True, then=models.Value(Decimal('0.00'))),
+            default=costo,
+            output_field=salida,
+        )
+
+
+class MinutosEstadia(models.Func):
+    """Minutos completos entre entrada y salida, truncados igual que ``Cliente.tiempo_en_minutos``"""
+    output_field = models.IntegerField()
+    arity = 2
+
+    # Plantillas por motor; reciben la salida y la entrada ya compiladas
+    plantillas = {
+        'sqlite': '(django_timestamp_diff({salida}, {entrada}) / 60000000)',
+        'postgresql': 'FLOOR(EXTRACT(EPOCH FROM ({salida} - {entrada})) / 60)::integer',
+        'mysql': '(TIMESTAMPDIFF(MICROSECOND, {entrada}, {salida}) DIV 60000000)',
+    }
+
+    def as_sql(self, compiler, connection, **extra_context):
+        plantilla = self.plantillas.get(connection.vendor)
+        if plantilla is None:
+            raise NotImplementedError(f"MinutosEstadia no soporta el motor {connection.vendor}")
+        entrada, salida = self.get_source_expressions()
+        entrada_sql, entrada_params = compiler.compile(entrada)
+        salida_sql, salida_params = compiler.compile(salida)
+        # Los parámetros se ordenan según la posición de cada fecha en la plantilla
+        if plantilla.index('{salida}') < plantilla.index('{entrada}'):
+            params = (*salida_params, *entrada_params)
+        else:
+            params = (*entrada_params, *salida_params)
+        return plantilla.format(salida=salida_sql, entrada=entrada_sql), params
+
+
+def formatear_costo(costo, tarifa_plena):
+    """Formatea un costo indicando si corresponde a tarifa plena"""
+    if tarifa_plena:
+        return f"${costo:,.2f} (Tarifa Plena)"
+    return f"${costo:,.2f}"
+
+
+def _cargar_snapshot():
+    """Construye el snapshot leyendo los registros únicos de Costo y TarifaPlena; devuelve (versión, snapshot)"""
+    from .models import Costo, TarifaPlena
+
+    costos = Costo.get_costos_actuales()
+    tarifa_plena = TarifaPlena.get_tarifa_actual()
+    snapshot = TarifaSnapshot(
+        costo_auto=Decimal(costos.costo_auto),
+        costo_moto=Decimal(costos.costo_moto),
+        tarifa_plena_activa=tarifa_plena.activa,
+        costo_fijo_auto=Decimal(tarifa_plena.costo_fijo_auto),
+        costo_fijo_moto=Decimal(tarifa_plena.costo_fijo_moto),
+    )
+    return (costos.fecha_actualizacion, tarifa_plena.fecha_actualizacion), snapshot
+
+
+def _version_actual():
+    """Versión de las tarifas en la base de datos, en una sola consulta"""
+    from .models import Costo, TarifaPlena
+
+    costo = Costo.objects.filter(id=1).annotate(origen=models.Value(0)).values_list('origen', 'fecha_actualizacion')
+    plena = TarifaPlena.objects.filter(id=1).annotate(origen=models.Value(1)).values_list('origen', 'fecha_actualizacion')
+    fechas = dict(costo.union(plena, all=True))
+    return fechas.get(0), fechas.get(1)
+
+
+def get_tarifas():
+    """Devuelve el snapshot de tarifas vigente (memoria local -> cache -> BD)"""
+    global _snapshot_local, _snapshot_local_expira
+
+    ahora = time.monotonic()
+    if _snapshot_local is not None and ahora < _snapshot_local_expira:
+        return _snapshot_local
+
+    guardado = cache.get(CACHE_KEY)
+    if guardado is None:
+        guardado = _cargar_snapshot()
+        cache.set(CACHE_KEY, guardado, None)
+    else:
+        # El cache puede ser de este proceso (LocMemCache) y no enterarse de
+        # cambios guardados por otro worker: se confirma la versión en la BD
+        version = _version_actual()
+        if guardado[0] != version:
+            guardado = _cargar_snapshot()
+            cache.set(CACHE_KEY, guardado, None)
+
+    _snapshot_local = guardado[1]
+    _snapshot_local_expira = ahora + LOCAL_TTL
+    return _snapshot_local
+
+
+def invalidar_tarifas():
+    """Descarta el snapshot local y el compartido para forzar una recarga"""
+    global _snapshot_local, _snapshot_local_expira
+
+    _snapshot_local = None
+    _snapshot_local_expira = 0.0
+    cache.delete(CACHE_KEY)
@@ -11,6 +11,8 @@ urlpatterns = [
     
     # URLs para parking
     path('parking/', views.dashboard_parking, name='dashboard_parking'),
+    path('parking/ocupacion/', views.ocupacion_parking, name='ocupacion_parking'),
+    path('parking/eventos/', views.eventos_parking, name='eventos_parking'),
     
     # URLs para visitantes
     path('visitantes/', views.dashboard_visitante, name='dashboard_visitante'),
@@ -24,6 +26,7 @@ urlpatterns = [
     path('clientes/editar/<int:pk>/', views.editar_cliente, name='editar_cliente'),
     path('clientes/eliminar/<int:pk>/', views.eliminar_cliente, name='eliminar_cliente'),
     path('clientes/registro/<int:pk>/', views.ver_registro, name='ver_registro'),
+    path('api/clientes/', views.api_clientes, name='api_clientes'),
     
     # URLs para configuración
     path('configurar-costos/', views.configurar_costos, name='configurar_costos'),
@@ -32,5 +35,12 @@ urlpatterns = [
     # URLs para recaudación
     path('resumen-recaudacion/', views.resumen_recaudacion, name='resumen_recaudacion'),
     path('corte-recaudacion/', views.realizar_corte_recaudacion, name='corte_recaudacion'),
+    path('corte-recaudacion/<int:pk>/detalle/', views.detalle_corte_recaudacion, name='detalle_corte_recaudacion'),
+    
+    # Estadísticas del middleware de rendimiento
+    path('rendimiento/', views.estadisticas_rendimiento, name='estadisticas_rendimiento'),
+    
+    # Métricas para Prometheus (sin barra final, la ruta que espera el scraper)
+    path('metrics', views.metricas_prometheus, name='metricas'),
 ]
 
@@ -1,20 +1,27 @@
+import hmac
 import os
 from io import BytesIO
 import qrcode
 import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import require_GET
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django import forms
-from django.db import models
+from django.db import transaction
 from django.core.files.base import ContentFile
-from .models import Cliente, Costo, Visitante, TarifaPlena, Recaudacion
-from .decorators import require_edit_permission, require_delete_permission, require_view_list_permission, get_user_profile
+from .models import Cliente, Costo, Visitante, TarifaPlena, Recaudacion, CapacidadParqueadero, ParqueaderoLleno
+from .tarifas import get_tarifas
+from .fechas import rango_dia
+from .salidas import buscar_cliente_activo, confirmar_salida
+from . import busqueda, estadisticas, eventos, formatos, metricas, paginacion, rendimiento
+from .decorators import require_admin, require_edit_permission, require_delete_permission, require_view_list_permission, get_user_profile
 
 # Importar el servicio de impresión
 try:
@@ -37,25 +44,21 @@ def procesar_confirmacion_salida(request, is_ajax):
 				'mensaje': 'ID de cliente no proporcionado.'
 			})
 		
-		try:
-			cliente = Cliente.objects.get(id=cliente_id, fecha_salida__isnull=True)
-		except Cliente.DoesNotExist:
+		cliente = Cliente.objects.filter(id=cliente_id).first()
+		if not cliente:
 			return JsonResponse({
 				'success': False,
 				'mensaje': 'Cliente no encontrado o ya tiene salida registrada.'
 			})
-		except Cliente.MultipleObjectsReturned:
-			# Si hay múltiples, tomar el más reciente
-			cliente = Cliente.objects.filter(id=cliente_id, fecha_salida__isnull=True).order_by('-fecha_entrada').first()
-			if not cliente:
-				return JsonResponse({
-					'success': False,
-					'mensaje': 'Cliente no encontrado o ya tiene salida registrada.'
-				})
 		
-		# Ahora sí registrar la salida
-		cliente.fecha_salida = timezone.now()
-		cliente.save()
+		# Registrar la salida junto con el cobro final; solo una confirmación gana
+		if cliente.fecha_salida or not confirmar_salida(cliente, tarifas=get_tarifas()):
+			hora_salida = timezone.localtime(cliente.fecha_salida).strftime('%d/%m/%Y %H:%M')
+			return JsonResponse({
+				'success': False,
+				'ya_registrada': True,
+				'mensaje': f'La salida de {cliente.get_display_name()} ya fue registrada el {hora_salida}.'
+			})
 		
 		# Calcular tiempo en parking
 		if cliente.fecha_entrada:
@@ -65,7 +68,7 @@ def procesar_confirmacion_salida(request, is_ajax):
 		else:
 			tiempo_str = "Tiempo no disponible"
 		
-		# Calcular costo total final
+		# Costo total final (el guardado en el registro)
 		costo_total = cliente.calcular_costo()
 		costo_formateado = cliente.costo_formateado()
 		
@@ -150,22 +153,8 @@ def dashboard_parking(request):
 			salida_form = SalidaQRForm(request.POST)
 			if salida_form.is_valid():
 				codigo = salida_form.cleaned_data['codigo'].strip()
-				cliente = None
-				
-				# Buscar por ID (numérico)
-				if codigo.isdigit():
-					try:
-						cliente = Cliente.objects.filter(id=int(codigo), fecha_salida__isnull=True).first()
-					except (Cliente.DoesNotExist, ValueError):
-						pass
-				
-				# Si no se encontró por ID, buscar por cédula
-				if not cliente:
-					try:
-						# Usar filter().first() para obtener el primer cliente activo con esa cédula
-						cliente = Cliente.objects.filter(cedula=codigo, fecha_salida__isnull=True).order_by('-fecha_entrada').first()
-					except Cliente.DoesNotExist:
-						cliente = None
+				# Un solo viaje a la BD: id, cédula o matrícula
+				cliente = buscar_cliente_activo(codigo)
 				
 				if cliente:
 					# NO registrar salida aún, solo calcular información
@@ -180,8 +169,9 @@ def dashboard_parking(request):
 						tiempo_str = "Tiempo no disponible"
 					
 					# Calcular costo total (sin registrar salida)
-					costo_total = cliente.calcular_costo_temporal(fecha_salida_temporal)
-					costo_formateado = cliente.costo_formateado_temporal(fecha_salida_temporal)
+					tarifas = get_tarifas()
+					costo_total = cliente.calcular_costo_temporal(fecha_salida_temporal, tarifas)
+					costo_formateado = tarifas.formatear(costo_total)
 					
 					# Si es petición AJAX, devolver JSON con información para confirmar
 					if is_ajax:
@@ -200,7 +190,7 @@ def dashboard_parking(request):
 								'tiempo_total': tiempo_str,
 								'costo_total': costo_total,
 								'costo_formateado': costo_formateado,
-								'es_tarifa_plena': cliente.es_tarifa_plena()
+								'es_tarifa_plena': tarifas.tarifa_plena_activa
 							}
 						})
 					
@@ -235,28 +225,35 @@ def dashboard_parking(request):
 				try:
 					cliente = registro_form.save(commit=False)
 					cliente.fecha_entrada = timezone.now()
-					cliente.save()
+					# Reservar el cupo y crear el registro en la misma transacción
+					with transaction.atomic():
+						if not CapacidadParqueadero.ocupar(cliente.tipo_vehiculo):
+							raise ParqueaderoLleno(f'No hay cupos disponibles para {cliente.get_tipo_vehiculo_display()}.')
+						cliente.save()
+					# El QR se genera al vuelo en /qr/<id>.png: el registro es un solo INSERT
 					logger.info(f"Cliente saved with ID: {cliente.id}")
 					
-					# Generar QR limpio sin datos adicionales
-					qr_generated = cliente.generate_clean_qr()
-					logger.info(f"QR generation result: {qr_generated}")
-					cliente.save()
-					logger.info("Cliente saved again after QR generation")
-					
-					# Intentar impresión automática del ticket
+					# Encolar el ticket; el worker de impresión lo imprime sin bloquear esta respuesta
 					print_success = False
 					print_message = ""
+					print_job = None
 					
 					if PRINTER_AVAILABLE and printer_service:
 						try:
-							print_success = printer_service.print_qr_ticket(cliente)
-							if print_success:
-								print_message = "Ticket impreso automáticamente"
-								logger.info(f"Ticket printed successfully for client {cliente.id}")
-							else:
+							print_job = printer_service.enqueue_qr_ticket(cliente)
+							if print_job is None:
+								print_message = "No hay impresora configurada"
+								logger.warning(f"No print job created for client {cliente.id}")
+							elif print_job.status == 'FAILED':
 								print_message = "Error al imprimir ticket automáticamente"
 								logger.warning(f"Failed to print ticket for client {cliente.id}")
+							else:
+								print_success = True
+								if print_job.status == 'SUCCESS':
+									print_message = "Ticket impreso automáticamente"
+								else:
+									print_message = f"Ticket enviado a la impresora (trabajo #{print_job.id})"
+								logger.info(f"Print job {print_job.id} {print_job.status} for client {cliente.id}")
 						except Exception as print_error:
 							print_message = f"Error de impresión: {str(print_error)}"
 							logger.error(f"Printing error for client {cliente.id}: {print_error}")
@@ -277,23 +274,35 @@ def dashboard_parking(request):
 								'matricula': cliente.matricula,
 								'tipo_vehiculo': cliente.get_tipo_vehiculo_display(),
 								'fecha_entrada': cliente.fecha_entrada.strftime('%d/%m/%Y %H:%M'),
-								'qr_url': cliente.qr_image.url if cliente.qr_image else None
+								'qr_url': cliente.qr_url
 							},
 							'print_result': {
 								'success': print_success,
-								'message': print_message
+								'message': print_message,
+								'job_id': print_job.id if print_job else None,
+								'status': print_job.status if print_job else None,
+								'status_url': reverse('print_job_status', args=[print_job.id]) if print_job else None
 							}
 						}
 						return JsonResponse(response_data)
 					
 					# Para requests normales, agregar mensaje de impresión
 					if print_success:
-						message_success = 'Cliente registrado correctamente. Ticket impreso.'
+						message_success = f'Cliente registrado correctamente. {print_message}.'
 					else:
 						message_success = f'Cliente registrado correctamente. {print_message}'
 					
 					registro_form = ClienteForm()  # Limpiar formulario
 					logger.info("Registration completed successfully")
+				except ParqueaderoLleno as e:
+					logger.warning(f"Registration rejected: {e}")
+					if is_ajax:
+						return JsonResponse({
+							'success': False,
+							'parqueadero_lleno': True,
+							'mensaje': str(e)
+						})
+					registro_form.add_error('tipo_vehiculo', str(e))
 				except Exception as e:
 					logger.error(f"Error during client registration: {str(e)}")
 					if is_ajax:
@@ -325,6 +334,32 @@ def dashboard_parking(request):
 		'perfil': perfil,
 	})
 
+# --- OCUPACIÓN DEL PARQUEADERO ---
+@login_required
+def ocupacion_parking(request):
+	"""Estado de ocupación por tipo de vehículo (pensado para sondeo frecuente de las porterías)"""
+	tipos = CapacidadParqueadero.estado()
+	return JsonResponse({
+		'success': True,
+		'ocupacion': tipos,
+		'total_ocupados': sum(tipo['ocupados'] for tipo in tipos),
+	})
+
+# --- EVENTOS EN VIVO (SSE) ---
+@login_required
+async def eventos_parking(request):
+	"""Stream de Server-Sent Events con entradas, salidas, ocupación y tarifa plena"""
+	if not eventos.disponibles(request):
+		# Bajo WSGI el stream ocuparía un worker sin enviar nada; 204 hace que el navegador no reintente
+		return HttpResponse(status=204)
+	# Al reconectar el navegador envía el último id recibido; si no, solo eventos nuevos
+	ultimo = request.headers.get('Last-Event-ID', '')
+	ultimo = int(ultimo) if ultimo.isdigit() else await sync_to_async(eventos.ultimo_numero)()
+	response = StreamingHttpResponse(eventos.transmitir(ultimo), content_type='text/event-stream')
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'
+	return response
+
 # --- VISTA PARA VER REGISTRO Y QR ---
 @login_required
 def ver_registro(request, pk):
@@ -349,7 +384,7 @@ def ver_registro(request, pk):
 			'tipo_vehiculo': cliente.get_tipo_vehiculo_display(),
 			'fecha_entrada': cliente.fecha_entrada.strftime('%d/%m/%Y %H:%M') if cliente.fecha_entrada else None,
 			'fecha_salida': cliente.fecha_salida.strftime('%d/%m/%Y %H:%M') if cliente.fecha_salida else None,
-			'qr_url': cliente.qr_image.url if cliente.qr_image else None,
+			'qr_url': cliente.qr_url,
 		}
 		return JsonResponse(data)
 	
@@ -404,7 +439,7 @@ class ClienteForm(forms.ModelForm):
 		return instance
 
 class SalidaQRForm(forms.Form):
-	codigo = forms.CharField(label='Escanee el código de barras/QR o ingrese la cédula o ID')
+	codigo = forms.CharField(label='Escanee el código de barras/QR o ingrese la cédula, matrícula o ID')
 
 # --- VISTAS ---
 def login_view(request):
@@ -430,16 +465,31 @@ class LoginForm(forms.Form):
 	username = forms.CharField(max_length=150, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Usuario'}))
 	password = forms.CharField(widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': 'Contraseña'}))
 
-# Lista de clientes con paginación y filtros AJAX
-@login_required
-def lista_clientes(request):
-	# Obtener parámetros de filtro
+def _filtros_sin_cursor(request):
+	"""Querystring de los filtros actuales para armar los enlaces de paginación"""
+	filtros = request.GET.copy()
+	filtros.pop('cursor', None)
+	filtros.pop('formato', None)
+	return filtros.urlencode()
+
+def _datos_pagina(page_obj):
+	"""Cursores y total aproximado de una página para las respuestas JSON"""
+	return {
+		'siguiente': page_obj.next_cursor,
+		'anterior': page_obj.previous_cursor,
+		'ultima': page_obj.last_cursor,
+		'total': page_obj.total,
+		'total_exacto': page_obj.total_exacto,
+	}
+
+def _clientes_filtrados(request):
+	"""Clientes según los filtros de la lista: estado, búsqueda, tipo de vehículo y rango de fechas"""
 	estado = request.GET.get('estado', 'todos')
 	buscar = request.GET.get('buscar', '')
+	tipo = request.GET.get('tipo', '')
 	fecha_inicio = request.GET.get('fecha_inicio', '')
 	fecha_fin = request.GET.get('fecha_fin', '')
 	
-	# Filtrar clientes
 	clientes = Cliente.objects.all().order_by('-fecha_entrada')
 	
 	# Filtro por estado
@@ -448,16 +498,12 @@ def lista_clientes(request):
 	elif estado == 'salidos':
 		clientes = clientes.filter(fecha_salida__isnull=False)
 	
-	# Filtro por búsqueda
+	# Filtro por búsqueda (índice de texto en nombre, cédula, matrícula, torre, apartamento y teléfono)
 	if buscar:
-		clientes = clientes.filter(
-			models.Q(nombre__icontains=buscar) |
-			models.Q(cedula__icontains=buscar) |
-			models.Q(matricula__icontains=buscar) |
-			models.Q(torre__icontains=buscar) |
-			models.Q(apartamento__icontains=buscar) |
-			models.Q(telefono__icontains=buscar)
-		)
+		clientes = busqueda.buscar(clientes, buscar)
+	
+	if tipo:
+		clientes = clientes.filter(tipo_vehiculo__iexact=tipo)
 	
 	# Filtro por rango de fechas
 	if fecha_inicio:
@@ -476,29 +522,53 @@ def lista_clientes(request):
 		except ValueError:
 			pass
 	
-	# Paginación
-	paginator = Paginator(clientes, 10)
-	page_number = request.GET.get('page', 1)
-	page_obj = paginator.get_page(page_number)
-	
+	return clientes
+
+# Lista de clientes: la tabla se dibuja en el navegador con /api/clientes/
+@login_required
+def lista_clientes(request):
 	# Obtener perfil del usuario
 	perfil = get_user_profile(request.user)
 	
-	# Obtener configuración de tarifa plena
-	tarifa_plena = TarifaPlena.get_tarifa_actual()
-	
 	context = {
-		'page_obj': page_obj,
-		'estado': estado,
-		'buscar': buscar,
-		'fecha_inicio': fecha_inicio,
-		'fecha_fin': fecha_fin,
+		'filtros': _filtros_sin_cursor(request),
+		'estado': request.GET.get('estado', 'todos'),
+		'buscar': request.GET.get('buscar', ''),
+		'tipo': request.GET.get('tipo', ''),
+		'fecha_inicio': request.GET.get('fecha_inicio', ''),
+		'fecha_fin': request.GET.get('fecha_fin', ''),
 		'perfil': perfil,
-		'tarifa_plena': tarifa_plena,
+		# Estado de la tarifa plena para el panel de control
+		'tarifas': get_tarifas(),
 	}
 	
 	return render(request, 'app_page/lista_clientes.html', context)
 
+@login_required
+@require_GET
+def api_clientes(request):
+	"""Página de la lista de clientes con los campos derivados ya calculados"""
+	clientes = _clientes_filtrados(request).only(*formatos.CAMPOS_FILA_CLIENTE)
+	page_obj = paginacion.paginar(clientes, 'fecha_entrada', request.GET.get('cursor'), 10)
+	
+	perfil = get_user_profile(request.user)
+	con_costos = perfil.es_administrador()
+	
+	# Una sola hora y un solo snapshot de tarifas para todas las filas
+	ahora = timezone.now()
+	tarifas = get_tarifas()
+	
+	return JsonResponse({
+		'success': True,
+		'clientes': [formatos.fila_cliente(cliente, ahora, tarifas, con_costos) for cliente in page_obj],
+		'permisos': {
+			'ver_costos': con_costos,
+			'editar': perfil.puede_editar_cliente(),
+			'eliminar': perfil.puede_eliminar_cliente(),
+		},
+		**_datos_pagina(page_obj),
+	})
+
 # Editar cliente
 @require_edit_permission
 def editar_cliente(request, pk):
@@ -632,27 +702,14 @@ def salida_qr(request):
 		form = SalidaQRForm(request.POST)
 		if form.is_valid():
 			codigo = form.cleaned_data['codigo'].strip()
-			cliente = None
+			# Un solo viaje a la BD: id, cédula o matrícula
+			cliente = buscar_cliente_activo(codigo)
 			
-			# Buscar por ID (numérico)
-			if codigo.isdigit():
-				try:
-					cliente = Cliente.objects.filter(id=int(codigo), fecha_salida__isnull=True).first()
-				except (Cliente.DoesNotExist, ValueError):
-					pass
-			
-			# Si no se encontró por ID, buscar por cédula
-			if not cliente:
-				try:
-					# Usar filter().first() para obtener el primer cliente activo con esa cédula
-					cliente = Cliente.objects.filter(cedula=codigo, fecha_salida__isnull=True).order_by('-fecha_entrada').first()
-				except Cliente.DoesNotExist:
-					cliente = None
+			# Si otra petición registró la salida primero, se informa como no encontrado
+			if cliente and not confirmar_salida(cliente, tarifas=get_tarifas()):
+				cliente = None
 			
 			if cliente:
-				from django.utils import timezone
-				cliente.fecha_salida = timezone.now()
-				cliente.save()
 				
 				# Calcular tiempo en parking
 				if cliente.fecha_entrada:
@@ -662,7 +719,7 @@ def salida_qr(request):
 				else:
 					tiempo_str = "Tiempo no disponible"
 				
-				# Calcular costo total
+				# Costo total final (el guardado en el registro)
 				costo_total = cliente.calcular_costo()
 				costo_formateado = cliente.costo_formateado()
 				
@@ -801,8 +858,8 @@ def configurar_costos(request):
 def portal_opciones(request):
 	"""Vista del portal de opciones principal"""
 	# Contar clientes registrados hoy
-	hoy = timezone.now().date()
-	conteo_hoy = Cliente.objects.filter(fecha_entrada__date=hoy).count()
+	inicio_dia, fin_dia = rango_dia()
+	conteo_hoy = Cliente.objects.filter(fecha_entrada__gte=inicio_dia, fecha_entrada__lt=fin_dia).count()
 	
 	# Obtener últimos 5 registros
 	ultimos = Cliente.objects.all().order_by('-fecha_entrada')[:5]
@@ -843,8 +900,8 @@ def dashboard_visitante(request):
 					mensaje_error = f'Error al registrar visitante: {str(e)}'
 
 	# Obtener estadísticas
-	hoy = timezone.now().date()
-	visitantes_hoy = Visitante.objects.filter(fecha_registro__date=hoy).count()
+	inicio_dia, fin_dia = rango_dia()
+	visitantes_hoy = Visitante.objects.filter(fecha_registro__gte=inicio_dia, fecha_registro__lt=fin_dia).count()
 	total_visitantes = Visitante.objects.count()
 	
 	# Obtener últimos visitantes
@@ -875,31 +932,49 @@ def lista_visitantes(request):
 	# Filtrar visitantes
 	visitantes = Visitante.objects.all().order_by('-fecha_registro')
 	
-	# Aplicar filtros
+	# Aplicar filtros (cada uno sobre su columna del índice de texto)
 	if cedula_buscar:
-		visitantes = visitantes.filter(cedula__icontains=cedula_buscar)
+		visitantes = busqueda.buscar(visitantes, cedula_buscar, campos=['cedula'])
 	
 	if nombre_buscar:
-		visitantes = visitantes.filter(nombre__icontains=nombre_buscar)
+		visitantes = busqueda.buscar(visitantes, nombre_buscar, campos=['nombre'])
 	
 	if torre_buscar:
-		visitantes = visitantes.filter(torre__icontains=torre_buscar)
+		visitantes = busqueda.buscar(visitantes, torre_buscar, campos=['torre'])
 	
 	if apartamento_buscar:
-		visitantes = visitantes.filter(apartamento__icontains=apartamento_buscar)
+		visitantes = busqueda.buscar(visitantes, apartamento_buscar, campos=['apartamento'])
 	
-	# Paginación
-	paginator = Paginator(visitantes, 20)
-	page_number = request.GET.get('page', 1)
-	page_obj = paginator.get_page(page_number)
+	# Paginación por cursor
+	page_obj = paginacion.paginar(visitantes, 'fecha_registro', request.GET.get('cursor'), 20)
+	
+	# Variante JSON para scroll infinito
+	if request.GET.get('formato') == 'json':
+		return JsonResponse({
+			'success': True,
+			'visitantes': [
+				{
+					'id': visitante.id,
+					'cedula': visitante.cedula,
+					'nombre': visitante.nombre,
+					'telefono': visitante.telefono,
+					'torre': visitante.torre,
+					'apartamento': visitante.apartamento,
+					'fecha_registro': visitante.fecha_registro.isoformat(),
+				}
+				for visitante in page_obj
+			],
+			**_datos_pagina(page_obj),
+		})
 	
 	# Estadísticas
-	hoy = timezone.now().date()
-	inicio_semana = hoy - timezone.timedelta(days=hoy.weekday())
+	hoy = timezone.localdate()
+	inicio_dia, fin_dia = rango_dia(hoy)
+	inicio_semana, _ = rango_dia(hoy - timezone.timedelta(days=hoy.weekday()))
 	
 	total_visitantes = Visitante.objects.count()
-	visitantes_hoy = Visitante.objects.filter(fecha_registro__date=hoy).count()
-	visitantes_semana = Visitante.objects.filter(fecha_registro__date__gte=inicio_semana).count()
+	visitantes_hoy = Visitante.objects.filter(fecha_registro__gte=inicio_dia, fecha_registro__lt=fin_dia).count()
+	visitantes_semana = Visitante.objects.filter(fecha_registro__gte=inicio_semana).count()
 	torres_activas = Visitante.objects.exclude(torre__isnull=True).exclude(torre='').values('torre').distinct().count()
 	
 	# Obtener perfil del usuario
@@ -907,6 +982,7 @@ def lista_visitantes(request):
 	
 	context = {
 		'visitantes': page_obj,
+		'filtros': _filtros_sin_cursor(request),
 		'total_visitantes': total_visitantes,
 		'visitantes_hoy': visitantes_hoy,
 		'visitantes_semana': visitantes_semana,
@@ -1105,11 +1181,10 @@ def resumen_recaudacion(request):
 		# Obtener datos de recaudación actual
 		datos_recaudacion = Recaudacion.calcular_recaudacion_actual()
 		
-		# Obtener historial de cortes recientes (últimos 10)
-		historial_cortes = Recaudacion.objects.all()[:10]
-		
-		# Debug logging
-		logger.info(f"Número de cortes encontrados: {historial_cortes.count()}")
+		# Historial de cortes recientes (últimos 10): solo encabezados, el detalle
+		# de cada corte se pide aparte a detalle_corte_recaudacion
+		historial_cortes = Recaudacion.objects.select_related('usuario')[:10]
+		incluir_detalles = request.GET.get('detalles') == '1'
 		
 		response_data = {
 			'success': True,
@@ -1125,21 +1200,19 @@ def resumen_recaudacion(request):
 		
 		# Agregar historial de cortes
 		for corte in historial_cortes:
-			try:
-				clientes_atendidos = corte.get_clientes_atendidos()
-				logger.info(f"Corte {corte.id}: {len(clientes_atendidos)} clientes")
-				response_data['historial'].append({
-					'id': corte.id,
-					'monto': float(corte.monto_recaudado),
-					'monto_formateado': f"${corte.monto_recaudado:,.2f}",
-					'fecha_corte': corte.fecha_corte.strftime('%d/%m/%Y %H:%M'),
-					'numero_clientes': corte.numero_clientes,
-					'usuario': corte.usuario.get_full_name() or corte.usuario.username,
-					'periodo': f"{corte.fecha_inicio.strftime('%d/%m/%Y %H:%M')} - {corte.fecha_fin.strftime('%d/%m/%Y %H:%M')}",
-					'clientes_atendidos': clientes_atendidos
-				})
-			except Exception as e:
-				logger.error(f"Error procesando corte {corte.id}: {str(e)}")
+			datos_corte = {
+				'id': corte.id,
+				'monto': float(corte.monto_recaudado),
+				'monto_formateado': f"${corte.monto_recaudado:,.2f}",
+				'fecha_corte': corte.fecha_corte.strftime('%d/%m/%Y %H:%M'),
+				'numero_clientes': corte.numero_clientes,
+				'usuario': corte.usuario.get_full_name() or corte.usuario.username,
+				'periodo': f"{corte.fecha_inicio.strftime('%d/%m/%Y %H:%M')} - {corte.fecha_fin.strftime('%d/%m/%Y %H:%M')}",
+				'detalle_url': reverse('detalle_corte_recaudacion', args=[corte.id]),
+			}
+			if incluir_detalles:
+				datos_corte['clientes_atendidos'] = corte.get_clientes_atendidos()
+			response_data['historial'].append(datos_corte)
 		
 		logger.info(f"Respuesta final: {len(response_data['historial'])} cortes en historial")
 		return JsonResponse(response_data)
@@ -1170,32 +1243,22 @@ def realizar_corte_recaudacion(request):
 				'mensaje': 'No tienes permisos para realizar cortes de recaudación.'
 			})
 		
-		# Obtener datos de recaudación actual
-		datos_recaudacion = Recaudacion.calcular_recaudacion_actual()
+		# Obtener observaciones del formulario
+		observaciones = request.POST.get('observaciones', '').strip()
+		
+		# Crear el corte con el detalle de los clientes atendidos
+		corte = Recaudacion.realizar_corte(request.user, observaciones)
 		
 		# Verificar que hay algo que cortar
-		if datos_recaudacion['monto_total'] <= 0:
+		if corte is None:
 			return JsonResponse({
 				'success': False,
 				'mensaje': 'No hay recaudación para realizar el corte.'
 			})
 		
-		# Obtener observaciones del formulario
-		observaciones = request.POST.get('observaciones', '').strip()
-		
-		# Crear el registro de corte
-		corte = Recaudacion.objects.create(
-			usuario=request.user,
-			monto_recaudado=datos_recaudacion['monto_total'],
-			fecha_inicio=datos_recaudacion['fecha_inicio'],
-			fecha_fin=datos_recaudacion['fecha_actual'],
-			numero_clientes=datos_recaudacion['numero_clientes'],
-			observaciones=observaciones
-		)
-		
 		return JsonResponse({
 			'success': True,
-			'mensaje': f'Corte de recaudación realizado exitosamente. Total: ${datos_recaudacion["monto_total"]:,.2f}',
+			'mensaje': f'Corte de recaudación realizado exitosamente. Total: ${corte.monto_recaudado:,.2f}',
 			'corte': {
 				'id': corte.id,
 				'monto': float(corte.monto_recaudado),
@@ -1212,3 +1275,53 @@ def realizar_corte_recaudacion(request):
 			'success': False,
 			'mensaje': 'Error al realizar el corte de recaudación.'
 		})
+
+
+@login_required
+@require_GET
+def detalle_corte_recaudacion(request, pk):
+	"""Clientes atendidos en un corte, 50 por página, desde el detalle guardado al hacer el corte"""
+	corte = Recaudacion.objects.filter(pk=pk).first()
+	if corte is None:
+		return JsonResponse({
+			'success': False,
+			'mensaje': 'Corte no encontrado.'
+		}, status=404)
+	
+	if not corte.detalle_guardado:
+		# Cortes anteriores al detalle: se calcula y guarda la primera vez
+		corte.guardar_detalles()
+	
+	page_obj = paginacion.paginar(corte.detalles.all(), 'fecha_salida', request.GET.get('cursor'), 50)
+	return JsonResponse({
+		'success': True,
+		'corte': corte.id,
+		'clientes_atendidos': [detalle.como_dict() for detalle in page_obj],
+		**_datos_pagina(page_obj),
+	})
+
+
+@require_admin
+@require_GET
+def estadisticas_rendimiento(request):
+	"""Consultas, tiempos y tamaño promedio por vista que acumula el middleware de rendimiento de este proceso"""
+	return JsonResponse({
+		'success': True,
+		'activo': getattr(settings, 'RENDIMIENTO_ACTIVO', False),
+		'limites': rendimiento.limites(None),
+		**rendimiento.estadisticas(),
+	})
+
+
+@require_GET
+def metricas_prometheus(request):
+	"""Métricas en formato Prometheus; no consulta la base de datos"""
+	token = getattr(settings, 'METRICAS_TOKEN', '')
+	if token:
+		if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+			return HttpResponse('No autorizado', status=401)
+	elif not (settings.DEBUG or request.user.is_staff):
+		# Sin token solo el personal (o en desarrollo): exponen recaudación y ocupación
+		return HttpResponse('Defina METRICAS_TOKEN para el scraper', status=403)
+	contenido, tipo = metricas.exportar()
+	return HttpResponse(contenido, content_type=tipo)
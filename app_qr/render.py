@@ -0,0 +1,137 @@
+"""
+Dibujo de los códigos QR de los clientes.
+
+El QR solo codifica el id del cliente, así que se genera al vuelo en lugar de
+guardar un PNG por registro en ``media/qr_codes/``. Los PNG generados se
+guardan en un LRU del proceso.
+
+Hay dos diseños: ``limpio`` (solo el QR) y ``con_datos`` (el QR con el id, la
+matrícula, la ubicación, la entrada y el tipo debajo). Las fuentes se cargan
+una vez por proceso, las medidas de cada texto se cachean y el lienzo en
+blanco de cada tamaño se copia en lugar de crearse de nuevo.
+"""
+
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+# Cambiar si cambia el dibujo del QR, para que los navegadores descarten la copia guardada
+VERSION_QR = 1
+
+LAYOUT_LIMPIO = 'limpio'
+LAYOUT_CON_DATOS = 'con_datos'
+
+# Fuentes probadas en orden (Windows trae Arial; Linux suele traer DejaVu)
+FUENTES = ('arial.ttf', 'DejaVuSans.ttf')
+TAMANO_GRANDE = 16
+TAMANO_PEQUENO = 12
+ALTO_LINEA = 20
+ANCHO_MINIMO = 400
+
+@lru_cache(maxsize=None)
+def fuente(tamano):
+	"""Fuente TrueType del tamaño pedido, cargada una sola vez por proceso"""
+	for nombre in FUENTES:
+		try:
+			return ImageFont.truetype(nombre, tamano)
+		except OSError:
+			continue
+	# Fuente por defecto si no hay ninguna instalada
+	try:
+		return ImageFont.load_default(tamano)
+	except TypeError:
+		return ImageFont.load_default()
+
+@lru_cache(maxsize=4096)
+def ancho_texto(texto, tamano):
+	"""Ancho en píxeles de ``texto`` con la fuente de ``tamano``"""
+	izquierda, _, derecha, _ = fuente(tamano).getbbox(texto)
+	return derecha - izquierda
+
+@lru_cache(maxsize=32)
+def _lienzo(ancho, alto):
+	return Image.new('RGB', (ancho, alto), 'white')
+
+def lienzo(ancho, alto):
+	"""Lienzo blanco del tamaño pedido (copia de una plantilla cacheada)"""
+	return _lienzo(ancho, alto).copy()
+
+def imagen_qr(datos, box_size=10, border=4, lado=None):
+	"""QR de ``datos`` en 1 bit; con ``lado`` se elige el módulo entero que más se acerque a ese tamaño"""
+	qr = qrcode.QRCode(
+		version=1,
+		error_correction=qrcode.constants.ERROR_CORRECT_L,
+		box_size=box_size,
+		border=border,
+	)
+	qr.add_data(datos)
+	qr.make(fit=True)
+	if lado:
+		qr.box_size = max(1, lado // (qr.modules_count + 2 * border))
+	return qr.make_image(fill_color="black", back_color="white").get_image().convert('1')
+
+def lineas_cliente(cliente):
+	"""Líneas de texto del diseño ``con_datos``: [(texto, tamaño)]"""
+	lineas = [
+		(f"ID: {cliente.id}", TAMANO_GRANDE),
+		(f"Matrícula: {cliente.matricula}", TAMANO_PEQUENO),
+	]
+
+	# Información de torre y apartamento
+	if cliente.torre and cliente.apartamento:
+		lineas.append((f"Torre {cliente.torre} - Apt {cliente.apartamento}", TAMANO_PEQUENO))
+	elif cliente.torre:
+		lineas.append((f"Torre {cliente.torre}", TAMANO_PEQUENO))
+	elif cliente.apartamento:
+		lineas.append((f"Apartamento {cliente.apartamento}", TAMANO_PEQUENO))
+
+	if cliente.fecha_entrada:
+		lineas.append((f"Entrada: {cliente.fecha_entrada.strftime('%d/%m/%Y %H:%M')}", TAMANO_PEQUENO))
+	lineas.append((f"Tipo: {cliente.get_tipo_vehiculo_display()}", TAMANO_PEQUENO))
+	return lineas
+
+def renderizar(datos, layout=LAYOUT_LIMPIO, lineas=()):
+	"""Imagen del QR de ``datos``; en ``con_datos`` agrega ``lineas`` centradas debajo"""
+	qr = imagen_qr(datos)
+	if layout == LAYOUT_LIMPIO:
+		return qr.convert('RGB')
+
+	ancho_qr, alto_qr = qr.size
+	ancho = max(ancho_qr, ANCHO_MINIMO)
+	imagen = lienzo(ancho, alto_qr + 20 + ALTO_LINEA * len(lineas))
+	imagen.paste(qr, ((ancho - ancho_qr) // 2, 0))
+
+	draw = ImageDraw.Draw(imagen)
+	y = alto_qr + 10
+	for texto, tamano in lineas:
+		draw.text(((ancho - ancho_texto(texto, tamano)) // 2, y), texto, fill='black', font=fuente(tamano))
+		y += ALTO_LINEA
+	return imagen
+
+def renderizar_png(datos, layout=LAYOUT_LIMPIO, lineas=()):
+	"""Igual que ``renderizar`` pero devuelve los bytes PNG"""
+	buf = BytesIO()
+	renderizar(datos, layout, lineas).save(buf, format='PNG')
+	return buf.getvalue()
+
+@lru_cache(maxsize=getattr(settings, 'QR_CACHE_TAMANO', 1024))
+def generar_qr_png(datos):
+	"""PNG del QR limpio para ``datos`` (mismo dibujo que los tickets); se guarda en un LRU"""
+	return renderizar_png(datos, LAYOUT_LIMPIO)
+
+def guardar_qr(cliente_id, nombre):
+	"""Dibuja el QR del cliente y lo escribe en ``nombre`` del storage; devuelve (id, nombre guardado)
+
+	Es una función de módulo sin dependencias de modelos para poder ejecutarse en
+	los procesos de ``ProcessPoolExecutor`` (también con el arranque ``spawn`` de Windows).
+	"""
+	from django.core.files.base import ContentFile
+	from django.core.files.storage import default_storage
+
+	# Regenerar reemplaza el archivo en lugar de acumular copias con sufijo
+	if default_storage.exists(nombre):
+		default_storage.delete(nombre)
+	return cliente_id, default_storage.save(nombre, ContentFile(generar_qr_png(str(cliente_id))))
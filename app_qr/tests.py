@@ -1,3 +1,52 @@
+from io import BytesIO
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+
+from app_page.models import Cliente
+from app_qr import render
+
+
+class QrClienteTests(TestCase):
+	"""El QR del cliente se genera al vuelo y el navegador lo guarda en cache"""
+
+	def setUp(self):
+		User.objects.create_user(username='guardia', password='testpass')
+		self.client.login(username='guardia', password='testpass')
+
+	def test_png_con_etag_y_cache(self):
+		url = reverse('qr_cliente', args=[42])
+		with self.assertNumQueries(2):  # solo sesión y usuario
+			response = self.client.get(url)
+		self.assertEqual(response['Content-Type'], 'image/png')
+		self.assertIn('immutable', response['Cache-Control'])
+		self.assertEqual(Image.open(BytesIO(response.content)).format, 'PNG')
+
+		revalidacion = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+		self.assertEqual(revalidacion.status_code, 304)
+		self.assertNotEqual(self.client.get(reverse('qr_cliente', args=[43]))['ETag'], response['ETag'])
+
+	def test_requiere_sesion(self):
+		self.client.logout()
+		self.assertEqual(self.client.get(reverse('qr_cliente', args=[42])).status_code, 302)
+
+
+class RenderQrTests(TestCase):
+	"""Las fuentes y medidas del diseño con datos se calculan una vez por proceso"""
+
+	def test_con_datos_reutiliza_fuentes_y_medidas(self):
+		cliente = Cliente(id=7, matricula='ABC-123', tipo_vehiculo='Auto', torre='5')
+		lineas = render.lineas_cliente(cliente)
+		self.assertIn(('Torre 5', render.TAMANO_PEQUENO), lineas)
+
+		render.fuente.cache_clear()
+		render.ancho_texto.cache_clear()
+		primera = render.renderizar(str(cliente.id), render.LAYOUT_CON_DATOS, lineas)
+		segunda = render.renderizar(str(cliente.id), render.LAYOUT_CON_DATOS, lineas)
 
-# Create your tests here.
+		self.assertEqual(primera.tobytes(), segunda.tobytes())
+		self.assertEqual(primera.width, render.ANCHO_MINIMO)
+		self.assertEqual(render.fuente.cache_info().currsize, 2)
+		self.assertEqual(render.ancho_texto.cache_info().hits, len(lineas))
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('test/', views.test_barcode, name='test_barcode'),
+    path('<int:cliente_id>.png', views.qr_cliente, name='qr_cliente'),
 ]
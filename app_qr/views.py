@@ -1,7 +1,21 @@
+from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_GET
+
+from .render import VERSION_QR, generar_qr_png
 
 def test_barcode(request):
 	return HttpResponse('Prueba de lector de código de barras OK')
-from django.shortcuts import render
 
-# Create your views here.
+def _etag_qr(request, cliente_id):
+	# El QR solo depende del id: se responde 304 sin volver a dibujarlo
+	return f"qr-{VERSION_QR}-{cliente_id}"
+
+@require_GET
+@login_required
+@cache_control(private=True, max_age=60 * 60 * 24 * 365, immutable=True)
+@etag(_etag_qr)
+def qr_cliente(request, cliente_id):
+	"""Imagen del QR de un cliente, generada a partir de su id sin leer la BD ni el disco"""
+	return HttpResponse(generar_qr_png(str(cliente_id)), content_type='image/png')
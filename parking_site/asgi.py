@@ -3,6 +3,15 @@ ASGI config for parking_site project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live dashboard stream (``app_page.views.eventos_parking``) is an async
+Server-Sent Events view: serve the project with an ASGI server so each open
+connection costs a coroutine instead of a worker thread, e.g.
+
+    uvicorn parking_site.asgi:application --workers 2
+
+With several workers, configure a shared cache (Redis/Memcached) so events
+published by one worker reach connections held by the others.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -1,4 +1,8 @@
+import os
 from pathlib import Path
+
+from . import basedatos
+
 # Media files (debe ir después de BASE_DIR)
 # ...
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también las consultas de sesión y autenticación
+    'app_page.rendimiento.MedicionRendimientoMiddleware',
+    'app_page.metricas.LatenciaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,11 +99,10 @@ WSGI_APPLICATION = 'parking_site.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Motor según DATABASE_URL (SQLite del proyecto o PostgreSQL con pool de
+# conexiones); ver parking_site/basedatos.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': basedatos.configurar(BASE_DIR),
 }
 
 
@@ -146,6 +152,33 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Medición de rendimiento por petición (app_page/rendimiento.py): encabezado
+# Server-Timing (solo al personal, is_staff), aviso en el log de las peticiones que
+# pasan algún límite y estadísticas por vista en /rendimiento/ (solo
+# administradores). Por defecto solo en desarrollo
+RENDIMIENTO_ACTIVO = DEBUG
+RENDIMIENTO_LIMITES = {
+    'consultas': 50,
+    'bd_ms': 250,
+    'plantilla_ms': 250,
+    'total_ms': 1000,
+    'bytes': 1_000_000,
+}
+# Límites propios por nombre de URL, ej. {'api_clientes': {'consultas': 5}}
+RENDIMIENTO_LIMITES_POR_VISTA = {}
+
+# Eventos en vivo (Server-Sent Events, app_page/eventos.py). None: solo cuando
+# la petición llega por ASGI; con WSGI el stream bloquearía un worker por pestaña
+EVENTOS_EN_VIVO = None
+
+# Métricas Prometheus en /metrics (app_page/metricas.py). Con METRICAS_TOKEN
+# definido se exige el encabezado "Authorization: Bearer <token>"; sin él solo
+# responde al personal (is_staff) o con DEBUG
+# Con varios workers conviene un cache compartido en CACHES (Redis, Memcached o
+# DatabaseCache): con el LocMemCache por defecto los totales globales se
+# recalculan con una consulta en cada entrada y salida
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
 # Logging configuration
 LOGGING = {
     'version': 1,